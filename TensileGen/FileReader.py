@@ -27,44 +27,55 @@ import xml.sax
 import copy
 import sys
 import os
+import multiprocessing
+import hashlib
+import cPickle
+import glob
+import gzip
+import mmap
+import itertools
+try:
+  import lzma
+except ImportError:
+  try:
+    from backports import lzma
+  except ImportError:
+    lzma = None
 
-def addTimeToMap( psMap, exactMatch, problem, solution, time ):
-  #print "prob" + str(problem.getSizeType()) + " - " + str(problem)
-  if exactMatch.deviceProfile not in psMap:
-    #print "XML Parser: b.adding %s" % exactMatch.deviceProfile.libString()
-    psMap[exactMatch.deviceProfile] = {}
-  if exactMatch not in psMap[exactMatch.deviceProfile]:
-    #print "XML Parser:   b.adding %s" % exactMatch.libString()
-    psMap[exactMatch.deviceProfile][exactMatch] = [{},{}]
-  if problem not in psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()]:
-    #print "XML Parser:     b.adding %s" % str(problem)
-    psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()][problem] = {}
-  if solution not in psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()][problem]:
-    #print "XML Parser:       b.adding %s" % str(solution)
-    psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()][problem][solution] = Structs.SolutionBenchmark()
-  #print "XML Parser:       b.adding %f" % str(time)
-  psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()][problem][solution].times.append(time)
-  #print "size = ", len(psMap[exactMatch.deviceProfile][exactMatch][0]), len(psMap[exactMatch.deviceProfile][exactMatch][1])
+################################################################################
+# getSolutionBenchmark - find or create entry psMap[dp][em][sizeType][p][s]
+################################################################################
+def getSolutionBenchmark( psMap, exactMatch, problem, solution ):
+  exactMatches = psMap.get(exactMatch.deviceProfile)
+  if exactMatches is None:
+    exactMatches = {}
+    psMap[exactMatch.deviceProfile] = exactMatches
+  sizeTypes = exactMatches.get(exactMatch)
+  if sizeTypes is None:
+    sizeTypes = [{},{}]
+    exactMatches[exactMatch] = sizeTypes
+  problems = sizeTypes[problem.getSizeType()]
+  solutions = problems.get(problem)
+  if solutions is None:
+    solutions = {}
+    problems[problem] = solutions
+  solutionBenchmark = solutions.get(solution)
+  if solutionBenchmark is None:
+    solutionBenchmark = Structs.SolutionBenchmark()
+    solutions[solution] = solutionBenchmark
+  return solutionBenchmark
+
+def addTimeToMap( psMap, exactMatch, problem, solution, time, numSamples=1 ):
+  solutionBenchmark = getSolutionBenchmark( psMap, exactMatch, problem, solution )
+  solutionBenchmark.addTime(time, numSamples)
 
 def addValidationToMap( psMap, exactMatch, problem, solution, validationStatus ):
-  if exactMatch.deviceProfile not in psMap:
-    #print "XML Parser: v.adding %s" % exactMatch.deviceProfile.libString()
-    psMap[exactMatch.deviceProfile] = {}
-  if exactMatch not in psMap[exactMatch.deviceProfile]:
-    #print "XML Parser:   v.adding %s" % exactMatch.libString()
-    psMap[exactMatch.deviceProfile][exactMatch] = [{},{}]
-  if problem not in psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()]:
-    #print "XML Parser:     v.adding %s" % str(problem)
-    psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()][problem] = {}
-  if solution not in psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()][problem]:
-    #print "XML Parser:       v.adding %s" % str(solution)
-    psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()][problem][solution] = Structs.SolutionBenchmark()
-
-  if psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()][problem][solution].validationStatus == 0:
-    psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()][problem][solution].validationStatus = validationStatus
-  elif psMap[exactMatch.deviceProfile][exactMatch][problem.getSizeType()][problem][solution].validationStatus != validationStatus:
+  solutionBenchmark = getSolutionBenchmark( psMap, exactMatch, problem, solution )
+  if solutionBenchmark.validationStatus == 0:
+    solutionBenchmark.validationStatus = validationStatus
+  elif solutionBenchmark.validationStatus != validationStatus:
     print "ERROR: conflicting validation reports"
-  
+
 def addProblemToTree( tree, exactMatch, problem ):
   if exactMatch.deviceProfile not in tree:
     #print "XML Parser: t.adding %s" % exactMatch.deviceProfile.libString()
@@ -76,6 +87,171 @@ def addProblemToTree( tree, exactMatch, problem ):
 
 
 
+################################################################################
+# getKernelKey - what the kernels of a LazySolution take from its problem
+# - index assignments depend only on problem, so they key kernels too
+################################################################################
+def getKernelKey( problem ):
+  indexAssignments = SolutionCandidateGenerator.getIndexAssignments(problem)
+  return ( \
+      problem.tensorC.dataType.value, \
+      problem.tensorA.dataType.value, \
+      problem.tensorB.dataType.value, \
+      problem.operation.alphaType.value, \
+      problem.operation.betaType.value, \
+      problem.operation.type.value, \
+      tuple(problem.operation.indexAssignmentsA), \
+      tuple(problem.operation.indexAssignmentsB), \
+      tuple(indexAssignments.indexOrderC), \
+      tuple(indexAssignments.indexOrderSummation), \
+      indexAssignments.indexAssignmentDim0, \
+      indexAssignments.indexAssignmentDim1, \
+      indexAssignments.unrollDimStrideGreaterThanTileDimStrideA, \
+      indexAssignments.unrollDimStrideLessThanTileDimStrideB )
+
+
+################################################################################
+# LazySolution
+# - solution read from a log; only the raw <K> parameters and the interned
+#   problem are kept, and the Kernels (with their index assignments) are only
+#   built the first time solution.kernels is used, since most solutions read
+#   never get written into the backend; selection only needs their tile
+#   attributes and names (Structs.Solution.getTileAttributes, getNameKernel)
+# - numBuilt counts the solutions whose kernels were built, see
+#   TensileGenBackend.GenBackendFromFiles
+# - hashes like Structs.Solution but without needing kernels, and two lazy
+#   solutions with the same problem index assignments and raw parameters are
+#   equal without building them
+################################################################################
+class LazySolution( Structs.Solution ):
+  __slots__ = [ "problem", "kernelKey", "kernelParameters" ]
+  frozenNames = () # kernels are frozen when built, see __getattr__
+  numBuilt = 0
+  kernelParameterNames = [ "i", "wG0", "wG1", "mT0", "mT1", "b0", "b1", \
+      "nlpaA", "lspaA", "tspaA", "nlpeA", "lspeA", "tspeA", \
+      "nlpaB", "lspaB", "tspaB", "nlpeB", "lspeB", "tspeB", "u0", "u1" ]
+
+  def __init__(self):
+    # no Solution.__init__; kernels is filled in by __getattr__
+    self.kernelGrid = ( -1, -1, -1 )
+    self.branch = ( Structs.BranchType.get(-1), Structs.BranchType.get(-1) )
+    self.ppdOffsets = 0
+    self.ppdLeadingStrides = 0
+    self.ppdAll = 0
+    self.problem = None
+    self.kernelKey = None
+    self.kernelParameters = ()
+
+  def __getattr__(self, name):
+    if name != "kernels":
+      raise AttributeError(name)
+    LazySolution.numBuilt += 1
+    # the hash is of the raw parameters, so a frozen solution may build too
+    kernels = self.buildKernels()
+    if self.frozen:
+      for kernel in kernels:
+        if kernel is not None:
+          kernel.freeze()
+    Structs.setSlot(self, "kernels", kernels)
+    return kernels
+
+  # the first kernel, built without keeping it unless kernels already are
+  def getNameKernel(self):
+    try:
+      return object.__getattribute__(self, "kernels")[0]
+    except AttributeError:
+      return self.buildKernels(firstOnly=True)[0]
+
+  # new kernels, so they're set with Structs.setSlot
+  def buildKernels(self, firstOnly=False):
+    setSlot = Structs.setSlot
+    problem = self.problem
+    kernels = [ None, None, None, None ]
+    for parameters in self.kernelParameters:
+      if firstOnly and parameters[0] != 0:
+        continue
+      (i, wG0, wG1, mT0, mT1, b0, b1, \
+          nlpaA, lspaA, tspaA, nlpeA, lspeA, tspeA, \
+          nlpaB, lspaB, tspaB, nlpeB, lspeB, tspeB, u0, u1) = parameters
+      kernel = Structs.Kernel()
+      tile = kernel.tile
+      setSlot(tile, "workGroup", (wG0, wG1))
+      setSlot(tile, "microTile", (mT0, mT1))
+      setSlot(tile, "branch", \
+          ( Structs.BranchType.get(b0), Structs.BranchType.get(b1) ))
+      setSlot(kernel, "numLoadsParaA", nlpaA)
+      setSlot(kernel, "loadSizeParaA", lspaA)
+      setSlot(kernel, "totalLoadSizeParaA", tspaA)
+      setSlot(kernel, "numLoadsPerpA", nlpeA)
+      setSlot(kernel, "loadSizePerpA", lspeA)
+      setSlot(kernel, "totalLoadSizePerpA", tspeA)
+      setSlot(kernel, "numLoadsParaB", nlpaB)
+      setSlot(kernel, "loadSizeParaB", lspaB)
+      setSlot(kernel, "totalLoadSizeParaB", tspaB)
+      setSlot(kernel, "numLoadsPerpB", nlpeB)
+      setSlot(kernel, "loadSizePerpB", lspeB)
+      setSlot(kernel, "totalLoadSizePerpB", tspeB)
+      setSlot(kernel, "unrolls", ( u0, u1 ) if u1 > 0 else ( u0, ))
+      # pull data from problem and solution
+      setSlot(kernel, "dataTypeC", problem.tensorC.dataType)
+      setSlot(kernel, "dataTypeA", problem.tensorA.dataType)
+      setSlot(kernel, "dataTypeB", problem.tensorB.dataType)
+      setSlot(kernel, "dataTypeAlpha", problem.operation.alphaType)
+      setSlot(kernel, "dataTypeBeta", problem.operation.betaType)
+      setSlot(kernel, "problem", problem)
+      setSlot(kernel, "ppdOffsets", self.ppdOffsets)
+      setSlot(kernel, "ppdLeadingStrides", self.ppdLeadingStrides)
+      setSlot(kernel, "ppdAll", self.ppdAll)
+      # make index assignments (rather than storing in xml)
+      SolutionCandidateGenerator.makeIndexAssignments(kernel, problem)
+      kernels[i] = kernel
+    return tuple(kernels)
+
+  def getHashAttributes(self):
+    kernelTiles = [ None, None, None, None ]
+    for parameters in self.kernelParameters:
+      (i, wG0, wG1, mT0, mT1, b0, b1) = parameters[0:7]
+      (u0, u1) = parameters[19:21]
+      kernelTiles[i] = ( wG0, wG1, mT0, mT1, b0, b1, (u0, u1) if u1 > 0 else (u0,) )
+    return ( \
+        tuple(kernelTiles), \
+        self.kernelGrid[0], \
+        self.kernelGrid[1], \
+        self.branch[0].value, \
+        self.branch[1].value, \
+        self.ppdOffsets, \
+        self.ppdLeadingStrides, \
+        self.ppdAll )
+
+  def __eq__(self, other):
+    if isinstance(other, LazySolution):
+      if self.kernelKey == other.kernelKey \
+          and self.kernelParameters == other.kernelParameters \
+          and self.getHashAttributes() == other.getHashAttributes():
+        return True
+      if self.getHashAttributes() != other.getHashAttributes():
+        return False
+    # same raw parameters on problems with different index assignments
+    return Structs.Solution.__eq__(self, other)
+
+  # copies are ordinary solutions so callers may edit their kernels
+  def __deepcopy__(self, memo):
+    solution = Structs.Solution()
+    solution.kernelGrid = self.kernelGrid
+    solution.branch = self.branch
+    solution.kernels = copy.deepcopy(self.kernels, memo)
+    solution.ppdOffsets = self.ppdOffsets
+    solution.ppdLeadingStrides = self.ppdLeadingStrides
+    solution.ppdAll = self.ppdAll
+    return solution
+
+  # pickle without built kernels; they are rebuilt on demand after loading
+  def __getstate__(self):
+    state = Structs.Solution.__getstate__(self)
+    state.pop("kernels", None)
+    return state
+
+
 ################################################################################
 # TensileHandler
 ################################################################################
@@ -97,66 +273,70 @@ class TensileHandler( xml.sax.ContentHandler ):
     # for reading solutions
     self.solution = Structs.Solution()
 
+    # interned objects; a trace log repeats the same few problems and
+    # solutions many times, so each distinct one is only built once and
+    # looked up afterwards by a key made from its raw xml attributes
+    self.problemKey = []
+    self.problemCache = {} # problemKey -> (problem, kernelKey)
+    self.kernelKey = None # index assignments of current problem
+    self.solutionKey = []
+    self.solutionCache = {} # (kernelKey, solutionKey) -> solution
+    self.exactMatchCache = {} # (problem, ppd) -> exactMatch
+
   def startElement(self, tag, attributes):
     if self.dbgPrint:
       print "XML Parser: startElement(%s)" % tag
     if tag == "P": # DONE
       self.problem = Structs.Problem()
+      self.problemKey = []
 
     elif tag == "TC": # DONE
-      self.problem.tensorC.dataType.value = int(attributes["t"])
-      n = int(attributes["n"])
-      for i in range(0,n):
-        dim = Structs.Dimension()
-        dim.stride = int(attributes["st"+str(i)])
-        dim.size = int(attributes["sz"+str(i)])
-        self.problem.tensorC.dimensions.append(dim)
+      self.problemKey.append( (tag, tuple(attributes.items())) )
+      self.problem.tensorC.dataType = Structs.DataType.get(int(attributes["t"]))
+      self.problem.tensorC.dimensions = self.getDimensions(attributes)
 
     elif tag == "TA": # DONE
-      self.problem.tensorA.dataType.value = int(attributes["t"])
-      n = int(attributes["n"])
-      for i in range(0,n):
-        dim = Structs.Dimension()
-        dim.stride = int(attributes["st"+str(i)])
-        dim.size = int(attributes["sz"+str(i)])
-        self.problem.tensorA.dimensions.append(dim)
+      self.problemKey.append( (tag, tuple(attributes.items())) )
+      self.problem.tensorA.dataType = Structs.DataType.get(int(attributes["t"]))
+      self.problem.tensorA.dimensions = self.getDimensions(attributes)
 
     elif tag == "TB": # DONE
-      self.problem.tensorB.dataType.value = int(attributes["t"])
-      n = int(attributes["n"])
-      for i in range(0,n):
-        dim = Structs.Dimension()
-        dim.stride = int(attributes["st"+str(i)])
-        dim.size = int(attributes["sz"+str(i)])
-        self.problem.tensorB.dimensions.append(dim)
+      self.problemKey.append( (tag, tuple(attributes.items())) )
+      self.problem.tensorB.dataType = Structs.DataType.get(int(attributes["t"]))
+      self.problem.tensorB.dimensions = self.getDimensions(attributes)
 
     elif tag == "O":
-      self.problem.operation.type.value = int(attributes["t"])
+      self.problemKey.append( (tag, tuple(attributes.items())) )
+      self.problem.operation.type = Structs.OperationType.get(int(attributes["t"]))
       if self.optimizeAlpha:
-        self.problem.operation.alphaType.value = int(attributes["a"])
+        self.problem.operation.alphaType = Structs.DataType.get(int(attributes["a"]))
       else:
-        self.problem.operation.alphaType.value = self.problem.tensorC.dataType.value
+        self.problem.operation.alphaType = self.problem.tensorC.dataType
       if self.optimizeBeta:
-        self.problem.operation.betaType.value = int(attributes["b"])
+        self.problem.operation.betaType = Structs.DataType.get(int(attributes["b"]))
       else:
-        self.problem.operation.betaType.value = self.problem.tensorC.dataType.value
+        self.problem.operation.betaType = self.problem.tensorC.dataType
       self.problem.operation.useOffsets = int(attributes["o"])
       self.problem.operation.numIndicesFree = int(attributes["nF"])
       self.problem.operation.numIndicesBatch = int(attributes["nB"])
       self.problem.operation.numIndicesSummation = int(attributes["nS"])
       
     elif tag == "IA":
+      self.problemKey.append( (tag, tuple(attributes.items())) )
       n = int(attributes["n"])
-      for i in range(0,n):
-        self.problem.operation.indexAssignmentsA.append(int(attributes["i"+str(i)]))
+      self.problem.operation.indexAssignmentsA = tuple( \
+          int(attributes["i"+str(i)]) for i in range(0,n) )
       
     elif tag == "IB":
+      self.problemKey.append( (tag, tuple(attributes.items())) )
       n = int(attributes["n"])
-      for i in range(0,n):
-        self.problem.operation.indexAssignmentsB.append(int(attributes["i"+str(i)]))
+      self.problem.operation.indexAssignmentsB = tuple( \
+          int(attributes["i"+str(i)]) for i in range(0,n) )
       
     elif tag == "DP":
+      self.problemKey.append( (tag, tuple(attributes.items())) )
       n = int(attributes["n"])
+      devices = []
       for i in range(0,n):
         name = attributes["d"+str(i)]
         for j in range(0,len(name)):
@@ -165,67 +345,26 @@ class TensileHandler( xml.sax.ContentHandler ):
         numComputeUnits = int(attributes["CU"+str(i)])
         clockFrequency = int(attributes["MHz"+str(i)])
         flopsPerClock = int(attributes["FPC"+str(i)])
-        self.problem.deviceProfile.devices.append(Structs.Device( name, numComputeUnits, clockFrequency, flopsPerClock ))
+        devices.append(Structs.Device.get( name, numComputeUnits, clockFrequency, flopsPerClock ))
+      self.problem.deviceProfile = Structs.DeviceProfile.get(tuple(devices))
       
     elif tag == "ID" and self.readSolutions:
-      self.solution.kernels = []
-      for i in range(0,4):
-        self.solution.kernels.append(None)
-      self.solution.kernelGrid = [ int(attributes["kG0"]), int(attributes["kG1"]), int(attributes["kG2"]) ]
-      self.solution.branch = [ Structs.BranchType(int(attributes["b0"])), Structs.BranchType(int(attributes["b1"])) ]
-      self.solution.ppdOffsets = int(attributes["ppdO"])
-      self.solution.ppdLeadingStrides = int(attributes["ppdLS"])
-      self.solution.ppdAll = int(attributes["ppdAll"])
-      
+      # kernels are only built at </ID> if solution hasn't been seen before
+      self.solutionKey = [ attributes ]
+
     elif tag == "K" and self.readSolutions:
-      # read data from xml
-      i = int(attributes["i"])
-      self.solution.kernels[i] = Structs.Kernel()
-      self.solution.kernels[i].tile.workGroup = [int(attributes["wG0"]), int(attributes["wG1"])]
-      self.solution.kernels[i].tile.microTile = [int(attributes["mT0"]), int(attributes["mT1"])]
-      self.solution.kernels[i].tile.branch = [ Structs.BranchType(int(attributes["b0"])), Structs.BranchType(int(attributes["b1"])) ]
-      self.solution.kernels[i].numLoadsParaA        = int(attributes["nlpaA"])
-      self.solution.kernels[i].loadSizeParaA        = int(attributes["lspaA"])
-      self.solution.kernels[i].totalLoadSizeParaA   = int(attributes["tspaA"])
-      self.solution.kernels[i].numLoadsPerpA        = int(attributes["nlpeA"])
-      self.solution.kernels[i].loadSizePerpA        = int(attributes["lspeA"])
-      self.solution.kernels[i].totalLoadSizePerpA   = int(attributes["tspeA"])
-      self.solution.kernels[i].numLoadsParaB        = int(attributes["nlpaB"])
-      self.solution.kernels[i].loadSizeParaB        = int(attributes["lspaB"])
-      self.solution.kernels[i].totalLoadSizeParaB   = int(attributes["tspaB"])
-      self.solution.kernels[i].numLoadsPerpB        = int(attributes["nlpeB"])
-      self.solution.kernels[i].loadSizePerpB        = int(attributes["lspeB"])
-      self.solution.kernels[i].totalLoadSizePerpB   = int(attributes["tspeB"])
-      self.solution.kernels[i].unrolls = [ int(attributes["u0"]) ]
-      secondUnroll = int(attributes["u1"])
-      if secondUnroll > 0:
-        self.solution.kernels[i].unrolls.append( secondUnroll )
-      # pull data from problem and solution
-      self.solution.kernels[i].dataTypeC = self.problem.tensorC.dataType
-      self.solution.kernels[i].dataTypeA = self.problem.tensorA.dataType
-      self.solution.kernels[i].dataTypeB = self.problem.tensorB.dataType
-      self.solution.kernels[i].dataTypeAlpha = self.problem.operation.alphaType
-      self.solution.kernels[i].dataTypeBeta = self.problem.operation.betaType
-      #kernel.operation = self.problem.operation
-      self.solution.kernels[i].problem = self.problem
-      self.solution.kernels[i].ppdOffsets = self.solution.ppdOffsets
-      self.solution.kernels[i].ppdLeadingStrides = self.solution.ppdLeadingStrides
-      self.solution.kernels[i].ppdAll = self.solution.ppdAll
-      # make index assignments (rather than storing in xml)
-      SolutionCandidateGenerator.makeIndexAssignments(self.solution.kernels[i], self.problem)
+      self.solutionKey.append( attributes )
 
     elif tag == "B" and self.readSolutions:
       # basically end of TraceEntry
+      # n, if present, is the number of samples the time stands for
       time = float(attributes["t"])
-      exactMatch = Structs.ExactMatch()
-      self.assignExactMatch(exactMatch)
-      addTimeToMap( self.data, exactMatch, copy.deepcopy(self.problem), copy.deepcopy(self.solution), time )
+      numSamples = int(attributes.get("n", "1"))
+      addTimeToMap( self.data, self.getExactMatch(), self.problem, self.solution, time, numSamples )
 
     elif tag == "V" and self.readSolutions:
       valid = 1 if attributes["s"] == "P" else -1
-      exactMatch = Structs.ExactMatch()
-      self.assignExactMatch(exactMatch)
-      addValidationToMap( self.data, exactMatch, copy.deepcopy(self.problem), copy.deepcopy(self.solution), valid )
+      addValidationToMap( self.data, self.getExactMatch(), self.problem, self.solution, valid )
 
   def endElement(self, tag):
     if self.dbgPrint:
@@ -238,14 +377,81 @@ class TensileHandler( xml.sax.ContentHandler ):
         exactMatch.ppdOffsets = 0
         exactMatch.ppdLeadingStrides = 0
         exactMatch.ppdAll = 0
-        addProblemToTree( self.data, exactMatch, copy.deepcopy(self.problem) )
+        # new problem object created for every <P>, so no need to copy
+        addProblemToTree( self.data, exactMatch, self.problem )
         self.numProblemsAdded += 1
+      else:
+        self.internProblem()
+    elif tag == "ID" and self.readSolutions:
+      self.internSolution()
     elif tag == "T": # DONE
       pass
 
   def characters(self, content):
     pass
 
+  # the Dimensions of a <TC>, <TA> or <TB>
+  def getDimensions(self, attributes):
+    dimensions = []
+    for i in range(0,int(attributes["n"])):
+      dim = Structs.Dimension.__new__(Structs.Dimension)
+      Structs.setSlot(dim, "stride", int(attributes["st"+str(i)]))
+      Structs.setSlot(dim, "size", int(attributes["sz"+str(i)]))
+      dimensions.append(dim)
+    return tuple(dimensions)
+
+  ##############################################################################
+  # internProblem - swap current problem for the first identical one parsed
+  ##############################################################################
+  def internProblem(self):
+    problemKey = tuple(self.problemKey)
+    if problemKey in self.problemCache:
+      (self.problem, self.kernelKey) = self.problemCache[problemKey]
+      return
+    self.kernelKey = getKernelKey(self.problem)
+    self.problemCache[problemKey] = (self.problem, self.kernelKey)
+
+  ##############################################################################
+  # internSolution - build solution from <ID>,<K> attributes if not yet seen
+  ##############################################################################
+  def internSolution(self):
+    solutionKey = (self.kernelKey, tuple( \
+        tuple(attributes.items()) for attributes in self.solutionKey ))
+    solution = self.solutionCache.get(solutionKey)
+    if solution is None:
+      solution = self.buildSolution(self.solutionKey[0], self.solutionKey[1:])
+      self.solutionCache[solutionKey] = solution
+    self.solution = solution
+
+  # a new solution, so it's set with Structs.setSlot
+  def buildSolution(self, idAttributes, kernelAttributes):
+    setSlot = Structs.setSlot
+    solution = LazySolution.__new__(LazySolution)
+    setSlot(solution, "kernelGrid", ( int(idAttributes["kG0"]), int(idAttributes["kG1"]), int(idAttributes["kG2"]) ))
+    setSlot(solution, "branch", ( Structs.BranchType.get(int(idAttributes["b0"])), Structs.BranchType.get(int(idAttributes["b1"])) ))
+    setSlot(solution, "ppdOffsets", int(idAttributes["ppdO"]))
+    setSlot(solution, "ppdLeadingStrides", int(idAttributes["ppdLS"]))
+    setSlot(solution, "ppdAll", int(idAttributes["ppdAll"]))
+    setSlot(solution, "problem", self.problem)
+    setSlot(solution, "kernelKey", self.kernelKey)
+    setSlot(solution, "kernelParameters", tuple( tuple( \
+        int(attributes[name]) for name in LazySolution.kernelParameterNames ) \
+        for attributes in kernelAttributes ))
+    return solution
+
+  ##############################################################################
+  # getExactMatch - one shared ExactMatch per interned problem and ppd
+  ##############################################################################
+  def getExactMatch(self):
+    exactMatchKey = ( id(self.problem), self.solution.ppdOffsets, \
+        self.solution.ppdLeadingStrides, self.solution.ppdAll )
+    exactMatch = self.exactMatchCache.get(exactMatchKey)
+    if exactMatch is None:
+      exactMatch = Structs.ExactMatch()
+      self.assignExactMatch(exactMatch)
+      self.exactMatchCache[exactMatchKey] = exactMatch
+    return exactMatch
+
   def assignExactMatch(self, exactMatch):
     exactMatch.deviceProfile = self.problem.deviceProfile
     exactMatch.numIndicesFree = len(self.problem.tensorC.dimensions)
@@ -263,6 +469,36 @@ class TensileHandler( xml.sax.ContentHandler ):
 
 
 
+################################################################################
+# Compressed XML Files
+# - logs may be stored as .xml, .xml.gz or .xml.xz; compressed files are
+#   decoded as a stream so they are never fully decompressed in memory/on disk
+# - getXMLFiles lists them sorted, so every tool reads them in the same order
+################################################################################
+xmlFileSuffixes = [ ".xml", ".xml.gz", ".xml.xz" ]
+
+def getXMLFiles( inputPath ):
+  inputFiles = []
+  for suffix in xmlFileSuffixes:
+    inputFiles += glob.glob( inputPath + "/*" + suffix )
+  return sorted(inputFiles)
+
+def openXMLFile( path, mode="rb" ):
+  if path.endswith(".gz"):
+    return gzip.open( path, mode )
+  if path.endswith(".xz"):
+    if lzma is None:
+      raise IOError("%s is xz compressed; install backports.lzma to read/write it" % path)
+    return lzma.LZMAFile( path, mode )
+  return open( path, mode )
+
+def parseXMLFile( parser, inputFile ):
+  xmlFile = openXMLFile( inputFile )
+  try:
+    parser.parse( xmlFile )
+  finally:
+    xmlFile.close()
+
 ################################################################################
 # getProblemsFromXML
 ################################################################################
@@ -273,7 +509,7 @@ def getProblemsFromXML( inputFile, problemTree, optimizeAlpha, optimizeBeta ):
   appProblemsHandler = TensileHandler(problemTree, readSolutions, optimizeAlpha, optimizeBeta)
   parser.setContentHandler( appProblemsHandler )
   #try:
-  parser.parse( inputFile )
+  parseXMLFile( parser, inputFile )
   print "  + " + str(appProblemsHandler.numProblemsAdded) \
       + " problem(s) from " + os.path.basename(inputFile)
   #except:
@@ -290,10 +526,285 @@ def getSolutionsFromXML( inputFile, psMap, optimizeAlpha, optimizeBeta ):
   parser.setContentHandler( solutionsHandler )
   #try:
   #print "XML Parser: parsing %s" % str(inputFile)
-  parser.parse( inputFile )
+  parseXMLFile( parser, inputFile )
   #except:
   #  print inputFile + " error"
-  
+
+
+################################################################################
+# mergeSolutionMaps - fold psMap read by another process into psMap
+################################################################################
+def mergeSolutionMaps( psMap, otherMap ):
+  for deviceProfile, exactMatches in otherMap.iteritems():
+    if deviceProfile not in psMap:
+      psMap[deviceProfile] = {}
+    for exactMatch, sizeTypes in exactMatches.iteritems():
+      if exactMatch not in psMap[deviceProfile]:
+        psMap[deviceProfile][exactMatch] = [{},{}]
+      for sizeType in range(0, len(sizeTypes)):
+        problems = psMap[deviceProfile][exactMatch][sizeType]
+        for problem, solutions in sizeTypes[sizeType].iteritems():
+          if problem not in problems:
+            problems[problem] = {}
+          for solution, otherBenchmark in solutions.iteritems():
+            if solution not in problems[problem]:
+              problems[problem][solution] = otherBenchmark
+              continue
+            solutionBenchmark = problems[problem][solution]
+            solutionBenchmark.merge(otherBenchmark)
+            if solutionBenchmark.validationStatus == 0:
+              solutionBenchmark.validationStatus = otherBenchmark.validationStatus
+            elif otherBenchmark.validationStatus != 0 \
+                and solutionBenchmark.validationStatus != otherBenchmark.validationStatus:
+              print "ERROR: conflicting validation reports"
+
+def getExactMatchesInMap( psMap ):
+  exactMatches = set()
+  for deviceProfile, deviceExactMatches in psMap.iteritems():
+    exactMatches.update( deviceExactMatches.keys() )
+  return exactMatches
+
+################################################################################
+# mergeProblemTrees - fold problemTree read by another process into tree
+################################################################################
+def mergeProblemTrees( tree, otherTree ):
+  for deviceProfile, exactMatches in otherTree.iteritems():
+    if deviceProfile not in tree:
+      tree[deviceProfile] = {}
+    for exactMatch, problemSet in exactMatches.iteritems():
+      if exactMatch not in tree[deviceProfile]:
+        tree[deviceProfile][exactMatch] = set()
+      tree[deviceProfile][exactMatch].update(problemSet)
+
+################################################################################
+# Parsed-Results Cache
+# - sidecar file next to each solution xml holding the psMap decoded from it
+# - header records size, mtime and sha1 of the xml it was made from; size and
+#   mtime must match, or else sha1 must match (e.g. xml was copied/touched)
+################################################################################
+cacheFileSuffix = ".tcache"
+cacheFileTag = "TensileParsedXML"
+cacheFileVersion = 5
+
+def getFileHash( inputFile ):
+  sha = hashlib.sha1()
+  f = open(inputFile, "rb")
+  try:
+    while True:
+      block = f.read(1<<20)
+      if not block:
+        break
+      sha.update(block)
+  finally:
+    f.close()
+  return sha.hexdigest()
+
+def readSolutionsCache( inputFile, optimizeAlpha, optimizeBeta ):
+  cachePath = inputFile + cacheFileSuffix
+  if not os.path.exists(cachePath):
+    return None
+  try:
+    cacheFile = open(cachePath, "rb")
+    try:
+      header = cPickle.load(cacheFile)
+      if header[0] != cacheFileTag or header[1] != cacheFileVersion:
+        return None
+      (size, mtime, fileHash, cachedAlpha, cachedBeta) = header[2:]
+      if cachedAlpha != optimizeAlpha or cachedBeta != optimizeBeta:
+        return None
+      stat = os.stat(inputFile)
+      if stat.st_size != size:
+        return None
+      if stat.st_mtime != mtime and getFileHash(inputFile) != fileHash:
+        return None
+      return cPickle.load(cacheFile)
+    finally:
+      cacheFile.close()
+  except Exception as e:
+    print "TensileGen: ignoring unreadable cache %s (%s)" % (cachePath, str(e))
+    return None
+
+def writeSolutionsCache( inputFile, psMap, optimizeAlpha, optimizeBeta ):
+  cachePath = inputFile + cacheFileSuffix
+  stat = os.stat(inputFile)
+  header = ( cacheFileTag, cacheFileVersion, stat.st_size, stat.st_mtime, \
+      getFileHash(inputFile), optimizeAlpha, optimizeBeta )
+  tmpPath = cachePath + ".tmp" + str(os.getpid())
+  try:
+    cacheFile = open(tmpPath, "wb")
+    try:
+      cPickle.dump(header, cacheFile, cPickle.HIGHEST_PROTOCOL)
+      cPickle.dump(psMap, cacheFile, cPickle.HIGHEST_PROTOCOL)
+    finally:
+      cacheFile.close()
+    os.rename(tmpPath, cachePath)
+  except (IOError, OSError) as e:
+    print "TensileGen: couldn't write cache %s (%s)" % (cachePath, str(e))
+    if os.path.exists(tmpPath):
+      os.remove(tmpPath)
+
+################################################################################
+# readSolutionsFromXMLFile - psMap of a single file, from cache if valid
+################################################################################
+def readSolutionsFromXMLFile( inputFile, optimizeAlpha, optimizeBeta, useCache ):
+  if useCache:
+    psMap = readSolutionsCache( inputFile, optimizeAlpha, optimizeBeta )
+    if psMap is not None:
+      return psMap
+  psMap = {}
+  getSolutionsFromXML( inputFile, psMap, optimizeAlpha, optimizeBeta )
+  if useCache:
+    writeSolutionsCache( inputFile, psMap, optimizeAlpha, optimizeBeta )
+  return psMap
+
+################################################################################
+# Splitting Large XML Files
+# - a plain log larger than splitFileMinBytes is cut into byte ranges which
+#   each begin at a <TE>; every range is parsed separately as the body of its
+#   own <TensileLog> so several processes can share one file
+################################################################################
+splitFileMinBytes = 64*1024*1024
+splitEntryTag = "<TE>"
+splitLogEndTag = "</TensileLog>"
+
+def getXMLFileRanges( inputFile, numRanges ):
+  size = os.path.getsize(inputFile)
+  if numRanges <= 1 or size < splitFileMinBytes or not inputFile.endswith(".xml"):
+    return [ (None, None) ]
+  xmlFile = open(inputFile, "rb")
+  try:
+    fileMap = mmap.mmap( xmlFile.fileno(), 0, access=mmap.ACCESS_READ )
+  finally:
+    xmlFile.close()
+  try:
+    end = fileMap.rfind( splitLogEndTag )
+    starts = []
+    for i in range(0, numRanges):
+      start = fileMap.find( splitEntryTag, i*size/numRanges, end )
+      if start < 0:
+        break
+      if len(starts) == 0 or start > starts[-1]:
+        starts.append(start)
+  finally:
+    fileMap.close()
+  if len(starts) == 0 or end < 0:
+    return [ (None, None) ]
+  return zip( starts, starts[1:] + [end] )
+
+def getSolutionsFromXMLRange( inputFile, psMap, optimizeAlpha, optimizeBeta, start, end ):
+  parser = xml.sax.make_parser()
+  parser.setFeature(xml.sax.handler.feature_namespaces, 0)
+  readSolutions = True
+  solutionsHandler = TensileHandler(psMap, readSolutions, optimizeAlpha, optimizeBeta)
+  parser.setContentHandler( solutionsHandler )
+  xmlFile = open(inputFile, "rb")
+  try:
+    fileMap = mmap.mmap( xmlFile.fileno(), 0, access=mmap.ACCESS_READ )
+  finally:
+    xmlFile.close()
+  try:
+    parser.feed( "<TensileLog>\n" )
+    blockSize = 1<<20
+    for blockStart in range(start, end, blockSize):
+      parser.feed( fileMap[blockStart:min(blockStart+blockSize, end)] )
+    parser.feed( splitLogEndTag + "\n" )
+    parser.close()
+  finally:
+    fileMap.close()
+
+# worker entry points; module level so multiprocessing can pickle them
+def readSolutionsWorker( args ):
+  (inputFile, optimizeAlpha, optimizeBeta, useCache, start, end) = args
+  if start is None:
+    return readSolutionsFromXMLFile( inputFile, optimizeAlpha, optimizeBeta, useCache )
+  psMap = {}
+  getSolutionsFromXMLRange( inputFile, psMap, optimizeAlpha, optimizeBeta, start, end )
+  return psMap
+
+def readProblemsWorker( args ):
+  (inputFile, optimizeAlpha, optimizeBeta) = args
+  problemTree = {}
+  getProblemsFromXML( inputFile, problemTree, optimizeAlpha, optimizeBeta )
+  return problemTree
+
+################################################################################
+# getSolutionsFromXMLFiles
+# - each file (or each range of a large file) parsed by its own process into
+#   its own map, then merged in input order so the result doesn't depend on
+#   which worker finished first
+################################################################################
+def getSolutionsFromXMLFiles( inputFiles, psMap, optimizeAlpha, optimizeBeta, numProcesses, useCache=False, \
+    exactMatchesByFile=None ):
+  if numProcesses <= 1:
+    for inputFile in inputFiles:
+      print "TensileGen: Reading " + os.path.basename(inputFile)
+      fileMap = readSolutionsFromXMLFile( inputFile, optimizeAlpha, optimizeBeta, useCache )
+      if exactMatchesByFile is not None:
+        exactMatchesByFile[inputFile] = getExactMatchesInMap( fileMap )
+      mergeSolutionMaps( psMap, fileMap )
+    return
+
+  # split large files unless they are already cached
+  workerArgs = []
+  fileTasks = [] # per file: (cached psMap, number of ranges)
+  for inputFile in inputFiles:
+    ranges = getXMLFileRanges( inputFile, numProcesses )
+    if len(ranges) > 1 and useCache:
+      cachedMap = readSolutionsCache( inputFile, optimizeAlpha, optimizeBeta )
+      if cachedMap is not None:
+        fileTasks.append( (cachedMap, 0) )
+        continue
+    for start, end in ranges:
+      workerArgs.append( (inputFile, optimizeAlpha, optimizeBeta, useCache, start, end) )
+    fileTasks.append( (None, len(ranges)) )
+  pool = None
+  if len(workerArgs) > 1:
+    pool = multiprocessing.Pool( min(numProcesses, len(workerArgs)) )
+    results = pool.imap( readSolutionsWorker, workerArgs )
+  else:
+    results = itertools.imap( readSolutionsWorker, workerArgs )
+  try:
+    for inputFile, (cachedMap, numRanges) in zip(inputFiles, fileTasks):
+      if cachedMap is not None:
+        print "TensileGen: Read " + os.path.basename(inputFile) + " from cache"
+        if exactMatchesByFile is not None:
+          exactMatchesByFile[inputFile] = getExactMatchesInMap( cachedMap )
+        mergeSolutionMaps( psMap, cachedMap )
+        continue
+      if numRanges == 1:
+        fileMap = results.next()
+      else:
+        fileMap = {}
+        for i in range(0, numRanges):
+          mergeSolutionMaps( fileMap, results.next() )
+        if useCache:
+          writeSolutionsCache( inputFile, fileMap, optimizeAlpha, optimizeBeta )
+      print "TensileGen: Read " + os.path.basename(inputFile)
+      if exactMatchesByFile is not None:
+        exactMatchesByFile[inputFile] = getExactMatchesInMap( fileMap )
+      mergeSolutionMaps( psMap, fileMap )
+  finally:
+    if pool is not None:
+      pool.close()
+      pool.join()
+
+################################################################################
+# getProblemsFromXMLFiles
+################################################################################
+def getProblemsFromXMLFiles( inputFiles, problemTree, optimizeAlpha, optimizeBeta, numProcesses ):
+  if numProcesses <= 1 or len(inputFiles) <= 1:
+    for inputFile in inputFiles:
+      getProblemsFromXML( inputFile, problemTree, optimizeAlpha, optimizeBeta )
+    return
+  pool = multiprocessing.Pool( min(numProcesses, len(inputFiles)) )
+  try:
+    workerArgs = [ (inputFile, optimizeAlpha, optimizeBeta) for inputFile in inputFiles ]
+    for fileTree in pool.imap( readProblemsWorker, workerArgs ):
+      mergeProblemTrees( problemTree, fileTree )
+  finally:
+    pool.close()
+    pool.join()
+
 
 ################################################################################
 # Main
@@ -21,10 +21,36 @@
 
 import os
 import Structs
+import FileReader
 import KernelWriter
 import SolutionWriter
 import SolutionSelectionWriter
 
+################################################################################
+# GeneratedFile - write-only file which only touches disk if contents changed
+# - unchanged generated sources keep their timestamps so builds skip them
+################################################################################
+class GeneratedFile:
+  def __init__( self, path ):
+    self.path = path
+    self.strings = []
+
+  def write( self, s ):
+    self.strings.append(s)
+
+  def close( self ):
+    contents = "".join(self.strings)
+    if os.path.exists(self.path):
+      existingFile = open(self.path, "rb")
+      existing = existingFile.read()
+      existingFile.close()
+      if existing == contents:
+        return
+    outputFile = open(self.path, "wb")
+    outputFile.write(contents)
+    outputFile.close()
+
+
 ################################################################################
 # File Writer
 ################################################################################
@@ -98,10 +124,11 @@ class FileWriter:
   ##############################################################################
   # constructor
   ##############################################################################
-  def __init__( self, outputPath, backend, forBenchmark ):
+  def __init__( self, outputPath, backend, forBenchmark, minimumXMLCompression="" ):
     print "FileWriter(%s, %s, %s)" % (outputPath, backend, forBenchmark)
     self.outputPath = outputPath
     self.backend = backend
+    self.minimumXMLCompression = minimumXMLCompression # "", "gz" or "xz"
     self.kernelWriter = KernelWriter.KernelWriter(backend)
     self.solutionWriter = SolutionWriter.SolutionWriter(self.backend)
 
@@ -130,9 +157,9 @@ class FileWriter:
         + "TensileKernels.cmake"
     allKernelsHeaderFilePath = self.outputPath + self.kernelSubdirectory \
         + "TensileKernels.h"
-    kernelsCMakeFile = open(kernelsCMakeFilePath, "w")
+    kernelsCMakeFile = GeneratedFile(kernelsCMakeFilePath)
     kernelsCMakeFile.write(self.cmakeHeader)
-    allKernelsHeaderFile = open(allKernelsHeaderFilePath, "w")
+    allKernelsHeaderFile = GeneratedFile(allKernelsHeaderFilePath)
     allKernelsHeaderFile.write(self.cHeader)
 
     if self.forBenchmark:
@@ -141,7 +168,8 @@ class FileWriter:
       kernelsCMakeFile.write("\nset( TensileLib_KernelFiles_GENERATED_DYNAMIC\n")
 
 
-    for kernel in kernelSet:
+    # sorted so listings don't depend on set order
+    for kernel in sorted(kernelSet, key=self.kernelWriter.getName):
       # open .inl,.h files
       kernelName = self.kernelWriter.getName(kernel)
       kernelSourceFileName = kernelName + ".cpp"
@@ -150,9 +178,9 @@ class FileWriter:
           kernelSourceFileName
       kernelHeaderFilePath = self.outputPath + self.kernelSubdirectory + \
           kernelHeaderFileName
-      kernelSourceFile = open(kernelSourceFilePath, "w")
+      kernelSourceFile = GeneratedFile(kernelSourceFilePath)
       kernelSourceFile.write(self.cHeader)
-      kernelHeaderFile = open(kernelHeaderFilePath, "w")
+      kernelHeaderFile = GeneratedFile(kernelHeaderFilePath)
       kernelHeaderFile.write(self.cHeader)
 
       # get kernel file string
@@ -193,9 +221,9 @@ class FileWriter:
         + "TensileSolutions.cmake"
     allSolutionsHeaderFilePath = self.outputPath + self.solutionSubdirectory \
         + "TensileSolutions.h"
-    solutionsCMakeFile = open(solutionsCMakeFilePath, "w")
+    solutionsCMakeFile = GeneratedFile(solutionsCMakeFilePath)
     solutionsCMakeFile.write(self.cmakeHeader)
-    allSolutionsHeaderFile = open(allSolutionsHeaderFilePath, "w")
+    allSolutionsHeaderFile = GeneratedFile(allSolutionsHeaderFilePath)
     allSolutionsHeaderFile.write(self.cHeader)
 
     if self.forBenchmark:
@@ -203,7 +231,7 @@ class FileWriter:
     else:
       solutionsCMakeFile.write("set( TensileLib_SolutionFiles_GENERATED_DYNAMIC\n")
 
-    for solution in solutionSet:
+    for solution in sorted(solutionSet, key=self.solutionWriter.getName):
       # open file
       solutionName = self.solutionWriter.getName(solution)
       solutionSourceFileName = solutionName + ".cpp"
@@ -212,9 +240,9 @@ class FileWriter:
           solutionSourceFileName
       solutionHeaderFilePath = self.outputPath + self.solutionSubdirectory + \
           solutionHeaderFileName
-      solutionSourceFile = open(solutionSourceFilePath, "w")
+      solutionSourceFile = GeneratedFile(solutionSourceFilePath)
       solutionSourceFile.write(self.cHeader)
-      solutionHeaderFile = open(solutionHeaderFilePath, "w")
+      solutionHeaderFile = GeneratedFile(solutionHeaderFilePath)
       solutionHeaderFile.write(self.cHeader)
 
       # get solution file string
@@ -263,26 +291,31 @@ class FileWriter:
     tensorSizeMaxB = 0
     solutionEndIdx = -1
 
-    for deviceProfile, exactMatches in problemTree.iteritems():
-      for exactMatch, problemSet in exactMatches.iteritems():
+    # sorted so listings and indices don't depend on dict and set order
+    exactMatchProblemLists = [] # (exactMatch, problemList) in written order
+    for deviceProfile in sorted(problemTree.keys(), key=lambda dp: dp.libString()):
+      exactMatches = problemTree[deviceProfile]
+      for exactMatch in sorted(exactMatches.keys(), key=lambda em: em.libString()):
+        problemSet = exactMatches[exactMatch]
         print "ExactMatch: " + str(exactMatch)
 
         benchmarkExactMatchNames.append(str(exactMatch))
         benchmarkExactMatchNumProblems.append(len(problemSet))
         benchmarkNumExactMatches += 1
 
-        problemList = list(problemSet)
+        problemList = sorted(problemSet, key=str)
+        exactMatchProblemLists.append( (exactMatch, problemList) )
         # initializeSolutionCandidates(&problem, &solutionCandidates, exactMatchIdx, problemIdx);
 
         exactMatchName = str(exactMatch)
         exactMatchFileNameBase = "init_" + exactMatchName + "_candidates"
         exactMatchSourcePath = self.outputPath + self.otherSubdirectory \
             + exactMatchFileNameBase + ".cpp"
-        exactMatchSourceFile = open(exactMatchSourcePath, "w")
+        exactMatchSourceFile = GeneratedFile(exactMatchSourcePath)
         exactMatchSourceFile.write(self.cHeader)
         exactMatchHeaderPath = self.outputPath + self.otherSubdirectory \
             + exactMatchFileNameBase + ".h"
-        exactMatchHeaderFile = open(exactMatchHeaderPath, "w")
+        exactMatchHeaderFile = GeneratedFile(exactMatchHeaderPath)
         exactMatchHeaderFile.write(self.cHeader)
 
         s = "" # source file string
@@ -334,11 +367,11 @@ class FileWriter:
           problemFileNameBase = "init_" + problemName + "_candidates"
           problemSourcePath = self.outputPath + self.otherSubdirectory \
               + problemFileNameBase + ".cpp"
-          problemSourceFile = open(problemSourcePath, "w")
+          problemSourceFile = GeneratedFile(problemSourcePath)
           problemSourceFile.write(self.cHeader)
           problemHeaderPath = self.outputPath + self.otherSubdirectory \
               + problemFileNameBase + ".h"
-          problemHeaderFile = open(problemHeaderPath, "w")
+          problemHeaderFile = GeneratedFile(problemHeaderPath)
           problemHeaderFile.write(self.cHeader)
 
           s = "" # source file string
@@ -437,9 +470,11 @@ class FileWriter:
           s += "  tensileStatusCheck(status);\n"
           s += "\n"
 
+          # sorted so listings don't depend on set order
+          solutionList = sorted(solutionSet, key=self.solutionWriter.getName)
           idx = 0
-          numSolutions = len(solutionSet)
-          for solution in solutionSet:
+          numSolutions = len(solutionList)
+          for solution in solutionList:
             s += "  solutionCandidates->push_back( new Tensile::" \
                 + self.solutionWriter.getName(solution)+self.solutionWriter.getTemplateArgList(solution)+"( *((*problem)->pimpl) ) ); // " \
                 + str(idx) + "/" + str(numSolutions) + "\n"
@@ -480,7 +515,7 @@ class FileWriter:
           h += "#include \"Solution.h\"\n"
           h += "#include <vector>\n"
           h += "\n"
-          for solution in solutionSet:
+          for solution in solutionList:
             h += "#include \""+ self.solutionWriter.getName(solution) + ".h\"\n"
           h += "\n"
           h += "void init_" + problemName + "_candidates(TensileDeviceProfile & deviceProfile, TensileProblem * problem, std::vector<Tensile::Solution *> *solutionCandidates);\n"
@@ -493,7 +528,7 @@ class FileWriter:
     # top level benchmark file
     benchmarkSourcePath = self.outputPath + self.otherSubdirectory \
       + "TensileSolutionCandidates.cpp"
-    benchmarkSourceFile = open(benchmarkSourcePath, "w")
+    benchmarkSourceFile = GeneratedFile(benchmarkSourcePath)
     benchmarkSourceFile.write(self.cHeader)
     s = ""
     s += "#include \"TensileSolutionCandidates.h\"\n"
@@ -501,21 +536,19 @@ class FileWriter:
     s += "\n"
     # include candidates
 
-    for deviceProfile, exactMatches in problemTree.iteritems():
-      for exactMatch, problemSet in exactMatches.iteritems():
-        exactMatchName = str(exactMatch)
-        exactMatchFileNameBase = "init_" + exactMatchName + "_candidates"
-        s += "#include \"" + exactMatchFileNameBase + ".h\"\n"
+    for exactMatch, problemList in exactMatchProblemLists:
+      exactMatchName = str(exactMatch)
+      exactMatchFileNameBase = "init_" + exactMatchName + "_candidates"
+      s += "#include \"" + exactMatchFileNameBase + ".h\"\n"
     # init function
     s += "\n"
     s += "void initializeSolutionCandidates(TensileDeviceProfile & deviceProfile, TensileProblem * problem, std::vector<Tensile::Solution *> *solutionCandidates, size_t exactMatchIndex, size_t problemIndex) {\n"
     s += "  switch( exactMatchIndex ) {\n"
     exactMatchIdx = 0
-    for deviceProfile, exactMatches in problemTree.iteritems():
-      for exactMatch, problemSet in exactMatches.iteritems():
-        exactMatchName = str(exactMatch)
-        s += "  case " + str(exactMatchIdx) + ": init_" + exactMatchName + "_candidates(deviceProfile, problem, solutionCandidates, problemIndex); break;\n"
-        exactMatchIdx += 1
+    for exactMatch, problemList in exactMatchProblemLists:
+      exactMatchName = str(exactMatch)
+      s += "  case " + str(exactMatchIdx) + ": init_" + exactMatchName + "_candidates(deviceProfile, problem, solutionCandidates, problemIndex); break;\n"
+      exactMatchIdx += 1
     s += "  default: printf(\"Oops: index too large.\\n\");\n"
     s += "  }\n"
     s += "}\n"
@@ -526,7 +559,7 @@ class FileWriter:
     # top level benchmark header file
     benchmarkHeaderPath = self.outputPath + self.otherSubdirectory \
         + "TensileSolutionCandidates.h"
-    benchmarkHeaderFile = open(benchmarkHeaderPath, "w")
+    benchmarkHeaderFile = GeneratedFile(benchmarkHeaderPath)
     benchmarkHeaderFile.write(self.cHeader)
     h = "#ifndef TENSILE_SOLUTION_CANDIDATES_H\n"
     h += "#define TENSILE_SOLUTION_CANDIDATES_H\n"
@@ -556,13 +589,6 @@ class FileWriter:
 
 
     # write device profile
-    for deviceProfile, exactMatches in problemTree.iteritems():
-      for exactMatch, problemSet in exactMatches.iteritems():
-        for p in problemSet:
-          problem = p
-          break
-        break
-      break
     problem = problemList[0]
     dp = problem.deviceProfile
     h += "\n"
@@ -584,7 +610,7 @@ class FileWriter:
     # write TensileBenchmark.cmake
     benchmarkCMakePath = self.outputPath + self.otherSubdirectory \
         + "TensileBenchmark.cmake"
-    benchmarkCMakeFile = open(benchmarkCMakePath, "w")
+    benchmarkCMakeFile = GeneratedFile(benchmarkCMakePath)
     benchmarkCMakeFile.write(self.cmakeHeader)
     s = "# TensileBenchmark.cmake\n"
     s += "\n"
@@ -592,17 +618,16 @@ class FileWriter:
     # s += "include( ${TensileBenchmark_SolutionFiles_CMAKE_DYNAMIC} )\n"
     s += "\n"
     s += "set( TensileBenchmark_SRC_GENERATED_DYNAMIC\n"
-    for deviceProfile, exactMatches in problemTree.iteritems():
-      for exactMatch, problemSet in exactMatches.iteritems():
-        exactMatchName = str(exactMatch)
-        exactMatchFileNameBase = "init_" + exactMatchName + "_candidates"
-        s += "  ${TensileBenchmark_DIR_GENERATED}" + self.otherSubdirectory + exactMatchFileNameBase + ".cpp\n"
-        s += "  ${TensileBenchmark_DIR_GENERATED}" + self.otherSubdirectory + exactMatchFileNameBase + ".h\n"
-        for problem in problemSet:
-          problemName = str(problem)
-          problemFileNameBase = "init_" + problemName + "_candidates"
-          s += "  ${TensileBenchmark_DIR_GENERATED}" + self.otherSubdirectory + problemFileNameBase + ".cpp\n"
-          s += "  ${TensileBenchmark_DIR_GENERATED}" + self.otherSubdirectory + problemFileNameBase + ".h\n"
+    for exactMatch, problemList in exactMatchProblemLists:
+      exactMatchName = str(exactMatch)
+      exactMatchFileNameBase = "init_" + exactMatchName + "_candidates"
+      s += "  ${TensileBenchmark_DIR_GENERATED}" + self.otherSubdirectory + exactMatchFileNameBase + ".cpp\n"
+      s += "  ${TensileBenchmark_DIR_GENERATED}" + self.otherSubdirectory + exactMatchFileNameBase + ".h\n"
+      for problem in problemList:
+        problemName = str(problem)
+        problemFileNameBase = "init_" + problemName + "_candidates"
+        s += "  ${TensileBenchmark_DIR_GENERATED}" + self.otherSubdirectory + problemFileNameBase + ".cpp\n"
+        s += "  ${TensileBenchmark_DIR_GENERATED}" + self.otherSubdirectory + problemFileNameBase + ".h\n"
     s += ")\n"
     s += "\n"
     s += "source_group(TensileGen\\\\Benchmark FILES\n"
@@ -673,17 +698,21 @@ class FileWriter:
 
   ##############################################################################
   # write backend files
+  # - unchangedSolutionSets maps ExactMatches whose files are already up to
+  #   date to the solutions they use; those still appear in psTimes (with no
+  #   psps) so device/top-level selection includes them, but aren't rewritten
+  # - returns the solutions used by every ExactMatch
   ##############################################################################
-  def writeBackendFiles( self, psTimes ):
+  def writeBackendFiles( self, psTimes, unchangedSolutionSets=None ):
     #print "status: writing backend files"
      # (1) Write Top-Level Solution Selection files
     sslw = SolutionSelectionWriter.SolutionSelectionWriter(psTimes, self.backend)
     baseName = "TensileGetSolution"
     sslSourcePath = self.outputPath + self.otherSubdirectory + baseName + ".cpp"
-    sslSourceFile = open(sslSourcePath, "w")
+    sslSourceFile = GeneratedFile(sslSourcePath)
     sslSourceFile.write(self.cHeader)
     sslHeaderPath = self.outputPath + self.otherSubdirectory + baseName + ".h"
-    sslHeaderFile = open(sslHeaderPath, "w")
+    sslHeaderFile = GeneratedFile(sslHeaderPath)
     sslHeaderFile.write(self.cHeader)
     sslSourceString, sslHeaderString = sslw.writeGetSolutionTop() # match device
     sslSourceFile.write(sslSourceString)
@@ -691,17 +720,21 @@ class FileWriter:
     sslHeaderFile.write(sslHeaderString)
     sslHeaderFile.close()
 
+    if unchangedSolutionSets is None:
+      unchangedSolutionSets = {}
     templateInstantiationSet = set()
+    solutionSets = {}
 
-    for deviceProfile, exactMatches in psTimes.iteritems():
+    for deviceProfile in sorted(psTimes.keys(), key=lambda dp: dp.libString()):
+      exactMatches = psTimes[deviceProfile]
       #print str(deviceProfile)
       # (2) Write Device-Level Solution Selection files
       baseName = "TensileGetSolution_" + deviceProfile.libString()
       sslSourcePath = self.outputPath + self.otherSubdirectory + baseName + ".cpp"
-      sslSourceFile = open(sslSourcePath, "w")
+      sslSourceFile = GeneratedFile(sslSourcePath)
       sslSourceFile.write(self.cHeader)
       sslHeaderPath = self.outputPath + self.otherSubdirectory + baseName + ".h"
-      sslHeaderFile = open(sslHeaderPath, "w")
+      sslHeaderFile = GeneratedFile(sslHeaderPath)
       sslHeaderFile.write(self.cHeader)
       sslSourceString, sslHeaderString = sslw.writeGetSolutionForDevice(deviceProfile, exactMatches) # match exact
       sslSourceFile.write(sslSourceString)
@@ -709,7 +742,14 @@ class FileWriter:
       sslHeaderFile.write(sslHeaderString)
       sslHeaderFile.close()
 
-      for exactMatch, pspTypes in exactMatches.iteritems():
+      for exactMatch in sorted(exactMatches.keys(), key=lambda em: em.libString()):
+        pspTypes = exactMatches[exactMatch]
+        if exactMatch in unchangedSolutionSets:
+          print "TensileGen: Backend for %s is up to date." % str(exactMatch)
+          for solution in unchangedSolutionSets[exactMatch]:
+            sslw.addPSPToSets( [None, solution, None] )
+          solutionSets[exactMatch] = unchangedSolutionSets[exactMatch]
+          continue
         rangePSPs = pspTypes[0]
         exactPSPs = pspTypes[1]
 
@@ -729,7 +769,7 @@ class FileWriter:
         # (7) Write CSV for verification
         if sslw.printStatus: print "%s::writeCSV(%s)" % (str(exactMatch), baseName)
         csvPath = self.outputPath + self.otherSubdirectory + baseName + "_perf.csv"
-        csvFile = open(csvPath, "w")
+        csvFile = GeneratedFile(csvPath)
         s = sslw.writePSPsToCSV(exactMatch, rangePSPs, exactPSPs)
         csvFile.write(s)
         csvFile.close()
@@ -738,14 +778,17 @@ class FileWriter:
 
         # (3) Write Exact-Match-Level Solution Selection files
         sslSourcePath = self.outputPath + self.otherSubdirectory + baseName + ".cpp"
-        sslSourceFile = open(sslSourcePath, "w")
+        sslSourceFile = GeneratedFile(sslSourcePath)
         sslSourceFile.write(self.cHeader)
         sslHeaderPath = self.outputPath + self.otherSubdirectory + baseName + ".h"
-        sslHeaderFile = open(sslHeaderPath, "w")
+        sslHeaderFile = GeneratedFile(sslHeaderPath)
         sslHeaderFile.write(self.cHeader)
         #print "calling writeGetSolutionForExactMatch"
         sslw.pruneSolutions(exactMatch, rangePSPs, exactPSPs)
+        sslw.exactMatchSolutionSet = set()
         sslSourceString, sslHeaderString, fastestPSPs = sslw.writeGetSolutionForExactMatch(exactMatch, rangePSPs, exactPSPs) # match size and mod
+        solutionSets[exactMatch] = sslw.exactMatchSolutionSet
+        sslw.exactMatchSolutionSet = None
         if sslw.printStatus: print "%s::writeMinimumXML()" % str(exactMatch)
         self.writeMinimumXML( exactMatch, fastestPSPs )
         sslSourceFile.write(sslSourceString)
@@ -767,24 +810,25 @@ class FileWriter:
 
     # (6) Write CMake File
     backendCMakePath = self.outputPath + self.otherSubdirectory + "TensileLib.cmake"
-    backendCMakeFile = open(backendCMakePath, "w")
+    backendCMakeFile = GeneratedFile(backendCMakePath)
     backendCMakeFile.write(self.cmakeHeader)
     s = sslw.writeTensileLibCMake(self.otherSubdirectory)
     backendCMakeFile.write(s)
     backendCMakeFile.close()
     self.writeTemplateInstantiations(templateInstantiationSet)
+    return solutionSets
 
   def writeTemplateInstantiations( self, templateInstantiationSet ):
     # explicit template instantiation
     templateInstantiationsPath = self.outputPath + self.solutionSubdirectory \
         + "SolutionTemplateInstantiations.inl"
-    templateInstantiationsFile = open(templateInstantiationsPath, "w")
+    templateInstantiationsFile = GeneratedFile(templateInstantiationsPath)
     templateInstantiationsFile.write(self.cHeader)
     templateInstantiationsFile.write("/* explicit template instantiations for base classes of generated solutions */\n\n")
     if self.backend.isHIP():
       templateInstantiationsFile.write("#pragma clang diagnostic push\n")
       templateInstantiationsFile.write("#pragma clang diagnostic ignored \"-Wweak-template-vtables\"\n")
-    for templateInstantiationStr in templateInstantiationSet:
+    for templateInstantiationStr in sorted(templateInstantiationSet):
       templateInstantiationsFile.write("template class Tensile::SolutionGPU" \
           +templateInstantiationStr + ";\n")
       if self.backend.isOpenCL():
@@ -806,111 +850,137 @@ class FileWriter:
   def writeMinimumXML( self, exactMatch, fastestPSPs ):
     minXMLPath = self.outputPath + self.minimumXMLSubdirectory \
         + str(exactMatch) + ".xml"
-    minXMLFile= open(minXMLPath, "w")
-
-    s = ""
-    s += "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"
-    s += "<TensileLog>\n"
+    if self.minimumXMLCompression:
+      minXMLPath += "." + self.minimumXMLCompression
+    minXMLFile = FileReader.openXMLFile(minXMLPath, "wb")
 
+    minXMLFile.write( "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n" )
+    minXMLFile.write( "<TensileLog>\n" )
     for psp in fastestPSPs:
-      problem = psp[0]
-      solution = psp[1]
-      time = psp[2]
-      s += " <TE>\n"
-      s += "  <S>\n"
-      s += "   <P>\n"
-      # tensorC
-      s += "    <TC t=\"%u\" n=\"%u\" " % (problem.tensorC.dataType.value, len(problem.tensorC.dimensions) )
-      for i in range(0, len(problem.tensorC.dimensions)):
-        dim = problem.tensorC.dimensions[i]
-        s += "st%u=\"%u\" sz%u=\"%u\" " % (i, dim.stride, i, dim.size)
-      s += "/>\n"
-      # tensorA
-      s += "    <TA t=\"%u\" n=\"%u\" " % (problem.tensorA.dataType.value, len(problem.tensorA.dimensions) )
-      for i in range(0, len(problem.tensorA.dimensions)):
-        dim = problem.tensorA.dimensions[i]
-        s += "st%u=\"%u\" sz%u=\"%u\" " % (i, dim.stride, i, dim.size)
-      s += "/>\n"
-      # tensorB
-      s += "    <TB t=\"%u\" n=\"%u\" " % (problem.tensorB.dataType.value, len(problem.tensorB.dimensions) )
-      for i in range(0, len(problem.tensorB.dimensions)):
-        dim = problem.tensorB.dimensions[i]
-        s += "st%u=\"%u\" sz%u=\"%u\" " % (i, dim.stride, i, dim.size)
-      s += "/>\n"
-      # operation
-      s += "    <O t=\"%u\" a=\"%u\" b=\"%u\" o=\"%u\" nF=\"%u\" nB=\"%u\" nS=\"%u\" >\n" % ( \
-          problem.operation.type.value, \
-          problem.operation.alphaType.value, \
-          problem.operation.betaType.value, \
-          problem.operation.useOffsets, \
-          problem.operation.numIndicesFree, \
-          problem.operation.numIndicesBatch, \
-          problem.operation.numIndicesSummation )
-      # indexAssignmentsA
-      s += "     <IA n=\"%u\" " % ( len(problem.operation.indexAssignmentsA) )
-      for i in range(0, len(problem.operation.indexAssignmentsA)):
-        ia = problem.operation.indexAssignmentsA[i]
-        s += "i%u=\"%u\" " % (i, ia)
-      s += "/>\n"
-      # indexAssignmentsB
-      s += "     <IB n=\"%u\" " % ( len(problem.operation.indexAssignmentsB) )
-      for i in range(0, len(problem.operation.indexAssignmentsB)):
-        ia = problem.operation.indexAssignmentsB[i]
-        s += "i%u=\"%u\" " % (i, ia)
-      s += "/>\n"
-      s += "    </O>\n"
-      # device profile
-      s += "    <DP n=\"%u\" " % ( len(problem.deviceProfile.devices) )
-      for i in range(0, len(problem.deviceProfile.devices)):
-        device = problem.deviceProfile.devices[i]
-        s += "d%u=\"%s\" CU%u=\"%u\" MHz%u=\"%u\" FPC%u=\"%u\" " % (\
-            i, device.name, \
-            i, device.numComputeUnits, \
-            i, device.clockFrequency, \
-            i, device.flopsPerClock )
-      s += "/>\n"
-      s += "   </P>\n"
-      # implementation details
-      s += "   <ID kG0=\"%u\" kG1=\"%u\" kG2=\"%u\" b0=\"%u\" b1=\"%u\" ppdO=\"%u\" ppdLS=\"%u\" ppdAll=\"%u\" >\n" % ( \
-          solution.kernelGrid[0], \
-          solution.kernelGrid[1], \
-          solution.kernelGrid[2], \
-          solution.branch[0].value, \
-          solution.branch[1].value, \
-          solution.ppdOffsets, \
-          solution.ppdLeadingStrides, \
-          solution.ppdAll )
-      for i in range(0, len(solution.kernels)):
-        kernel = solution.kernels[i]
-        if kernel == None:
-          continue
-        s += "    <K i=\"%u\" wG0=\"%u\" wG1=\"%u\" mT0=\"%u\" mT1=\"%u\" b0=\"%u\" b1=\"%u\" nlpaA=\"%u\" lspaA=\"%u\" tspaA=\"%u\" nlpeA=\"%u\" lspeA=\"%u\" tspeA=\"%u\" nlpaB=\"%u\" lspaB=\"%u\" tspaB=\"%u\" nlpeB=\"%u\" lspeB=\"%u\" tspeB=\"%u\" u0=\"%u\" u1=\"%u\" />\n" % ( \
-            i,
-            kernel.tile.workGroup[0], \
-            kernel.tile.workGroup[1], \
-            kernel.tile.microTile[0], \
-            kernel.tile.microTile[1], \
-            kernel.tile.branch[0].value, \
-            kernel.tile.branch[1].value, \
-            kernel.numLoadsParaA, \
-            kernel.loadSizeParaA, \
-            kernel.totalLoadSizeParaA, \
-            kernel.numLoadsPerpA, \
-            kernel.loadSizePerpA, \
-            kernel.totalLoadSizePerpA, \
-            kernel.numLoadsParaB, \
-            kernel.loadSizeParaB, \
-            kernel.totalLoadSizeParaB, \
-            kernel.numLoadsPerpB, \
-            kernel.loadSizePerpB, \
-            kernel.totalLoadSizePerpB, \
-            kernel.unrolls[0], \
-            0 if len(kernel.unrolls)<2 else kernel.unrolls[1] )
-      s += "   </ID>\n"
-      s += "  </S>\n"
-      s += "  <B t=\"%f\" u=\"ms\" />\n" % (time)
-      s += " </TE>\n"
-
-    s += "</TensileLog>\n"
-    minXMLFile.write( s )
+      # stream out each entry rather than building the whole log in memory
+      minXMLFile.write( getTraceEntryXML( psp[0], psp[1], [ psp[2] ] ) )
+    minXMLFile.write( "</TensileLog>\n" )
     minXMLFile.close()
+
+
+################################################################################
+# getTraceEntryXML - <TE> for one problem/solution in TensileLib Logger format
+# - validationStatus 0 writes no <V>; -1/+1 write failed/passed
+# - numSamples, if given, holds the number of samples each time stands for
+################################################################################
+def getTraceEntryXML( problem, solution, times, validationStatus=0, numSamples=None ):
+  s = ""
+  s += " <TE>\n"
+  s += "  <S>\n"
+  s += "   <P>\n"
+  # tensorC
+  s += "    <TC t=\"%u\" n=\"%u\" " % (problem.tensorC.dataType.value, len(problem.tensorC.dimensions) )
+  for i in range(0, len(problem.tensorC.dimensions)):
+    dim = problem.tensorC.dimensions[i]
+    s += "st%u=\"%u\" sz%u=\"%u\" " % (i, dim.stride, i, dim.size)
+  s += "/>\n"
+  # tensorA
+  s += "    <TA t=\"%u\" n=\"%u\" " % (problem.tensorA.dataType.value, len(problem.tensorA.dimensions) )
+  for i in range(0, len(problem.tensorA.dimensions)):
+    dim = problem.tensorA.dimensions[i]
+    s += "st%u=\"%u\" sz%u=\"%u\" " % (i, dim.stride, i, dim.size)
+  s += "/>\n"
+  # tensorB
+  s += "    <TB t=\"%u\" n=\"%u\" " % (problem.tensorB.dataType.value, len(problem.tensorB.dimensions) )
+  for i in range(0, len(problem.tensorB.dimensions)):
+    dim = problem.tensorB.dimensions[i]
+    s += "st%u=\"%u\" sz%u=\"%u\" " % (i, dim.stride, i, dim.size)
+  s += "/>\n"
+  # operation
+  s += "    <O t=\"%u\" a=\"%u\" b=\"%u\" o=\"%u\" nF=\"%u\" nB=\"%u\" nS=\"%u\" >\n" % ( \
+      problem.operation.type.value, \
+      problem.operation.alphaType.value, \
+      problem.operation.betaType.value, \
+      problem.operation.useOffsets, \
+      problem.operation.numIndicesFree, \
+      problem.operation.numIndicesBatch, \
+      problem.operation.numIndicesSummation )
+  # indexAssignmentsA
+  s += "     <IA n=\"%u\" " % ( len(problem.operation.indexAssignmentsA) )
+  for i in range(0, len(problem.operation.indexAssignmentsA)):
+    ia = problem.operation.indexAssignmentsA[i]
+    s += "i%u=\"%u\" " % (i, ia)
+  s += "/>\n"
+  # indexAssignmentsB
+  s += "     <IB n=\"%u\" " % ( len(problem.operation.indexAssignmentsB) )
+  for i in range(0, len(problem.operation.indexAssignmentsB)):
+    ia = problem.operation.indexAssignmentsB[i]
+    s += "i%u=\"%u\" " % (i, ia)
+  s += "/>\n"
+  s += "    </O>\n"
+  # device profile
+  s += "    <DP n=\"%u\" " % ( len(problem.deviceProfile.devices) )
+  for i in range(0, len(problem.deviceProfile.devices)):
+    device = problem.deviceProfile.devices[i]
+    s += "d%u=\"%s\" CU%u=\"%u\" MHz%u=\"%u\" FPC%u=\"%u\" " % (\
+        i, device.name, \
+        i, device.numComputeUnits, \
+        i, device.clockFrequency, \
+        i, device.flopsPerClock )
+  s += "/>\n"
+  s += "   </P>\n"
+  # implementation details
+  s += "   <ID kG0=\"%u\" kG1=\"%u\" kG2=\"%u\" b0=\"%u\" b1=\"%u\" ppdO=\"%u\" ppdLS=\"%u\" ppdAll=\"%u\" >\n" % ( \
+      solution.kernelGrid[0], \
+      solution.kernelGrid[1], \
+      solution.kernelGrid[2], \
+      solution.branch[0].value, \
+      solution.branch[1].value, \
+      solution.ppdOffsets, \
+      solution.ppdLeadingStrides, \
+      solution.ppdAll )
+  for i in range(0, len(solution.kernels)):
+    kernel = solution.kernels[i]
+    if kernel == None:
+      continue
+    s += "    <K i=\"%u\" wG0=\"%u\" wG1=\"%u\" mT0=\"%u\" mT1=\"%u\" b0=\"%u\" b1=\"%u\" nlpaA=\"%u\" lspaA=\"%u\" tspaA=\"%u\" nlpeA=\"%u\" lspeA=\"%u\" tspeA=\"%u\" nlpaB=\"%u\" lspaB=\"%u\" tspaB=\"%u\" nlpeB=\"%u\" lspeB=\"%u\" tspeB=\"%u\" u0=\"%u\" u1=\"%u\" />\n" % ( \
+        i,
+        kernel.tile.workGroup[0], \
+        kernel.tile.workGroup[1], \
+        kernel.tile.microTile[0], \
+        kernel.tile.microTile[1], \
+        kernel.tile.branch[0].value, \
+        kernel.tile.branch[1].value, \
+        kernel.numLoadsParaA, \
+        kernel.loadSizeParaA, \
+        kernel.totalLoadSizeParaA, \
+        kernel.numLoadsPerpA, \
+        kernel.loadSizePerpA, \
+        kernel.totalLoadSizePerpA, \
+        kernel.numLoadsParaB, \
+        kernel.loadSizeParaB, \
+        kernel.totalLoadSizeParaB, \
+        kernel.numLoadsPerpB, \
+        kernel.loadSizePerpB, \
+        kernel.totalLoadSizePerpB, \
+        kernel.unrolls[0], \
+        0 if len(kernel.unrolls)<2 else kernel.unrolls[1] )
+  s += "   </ID>\n"
+  s += "  </S>\n"
+  if validationStatus != 0:
+    s += "  <V s=\"%s\" />\n" % ("P" if validationStatus > 0 else "F")
+  for i in range(0, len(times)):
+    if numSamples is None:
+      s += "  <B t=\"%f\" u=\"ms\" />\n" % (times[i])
+    else:
+      s += "  <B t=\"%f\" u=\"ms\" n=\"%u\" />\n" % (times[i], numSamples[i])
+  s += " </TE>\n"
+  return s
+
+
+################################################################################
+# getNumBenchmarkFiles - files writeKernelFiles, writeSolutionFiles and
+#   writeBenchmarkFiles write for these numbers of kernels, solutions,
+#   ExactMatches and problems: a .cpp and .h for each, plus the listings
+################################################################################
+def getNumBenchmarkFiles( numKernels, numSolutions, numExactMatches, numProblems ):
+  numKernelFiles = 2*numKernels + 2 # TensileKernels.cmake,h
+  numSolutionFiles = 2*numSolutions + 2 # TensileSolutions.cmake,h
+  numOtherFiles = 2*numExactMatches + 2*numProblems \
+      + 4 # TensileSolutionCandidates.cpp,h, TensileBenchmark.cmake, template instantiations
+  return numKernelFiles + numSolutionFiles + numOtherFiles
@@ -22,7 +22,6 @@
 import os
 import sys
 import argparse
-import copy
 
 import Structs
 
@@ -226,7 +225,7 @@ class KernelWriter:
   def getSignature(self, kernel ):
 
     # determine chars for fast access
-    indexChars = copy.deepcopy(self.indexChars)
+    indexChars = list(self.indexChars)
     indexChars[kernel.indexAssignmentDim0] \
         = "0" + indexChars[kernel.indexAssignmentDim0]
     indexChars[kernel.indexAssignmentDim1] \
@@ -320,7 +319,7 @@ class KernelWriter:
   def getBody( self, kernel ):
 
     # determine chars for fast access
-    indexChars = copy.deepcopy(self.indexChars)
+    indexChars = list(self.indexChars)
     indexChars[kernel.indexAssignmentDim0] \
         = "0" + indexChars[kernel.indexAssignmentDim0]
     indexChars[kernel.indexAssignmentDim1] \
@@ -750,7 +749,7 @@ class KernelWriter:
           + " // d1, tensor" + tensorChar1 + self.endLine
 
     # other free indices
-    nonTileFreeIndices = copy.deepcopy(kernel.indexOrderC)
+    nonTileFreeIndices = list(kernel.indexOrderC)
     nonTileFreeIndices.remove(kernel.indexAssignmentDim0)
     nonTileFreeIndices.remove(kernel.indexAssignmentDim1)
     for i in range(0, len(nonTileFreeIndices)):
@@ -0,0 +1,202 @@
+################################################################################
+# Copyright (C) 2016 Advanced Micro Devices, Inc. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell cop-
+# ies of the Software, and to permit persons to whom the Software is furnished
+# to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IM-
+# PLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNE-
+# CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+################################################################################
+
+import math
+
+import SolutionCandidateGenerator
+
+
+################################################################################
+# Performance Model
+# - estimates the time a solution takes for a problem from the device's
+#   compute units, clock and flops per clock alone, so candidates can be
+#   ranked before they are benchmarked
+# - a kernel's work-groups are spread over the compute units; each compute
+#   unit runs as many at once as its registers, local memory and wavefront
+#   slots allow (counted as SolutionCandidateGenerator counts them), in
+#   rounds, so a partly filled last round costs a full one
+# - a round runs at the compute unit's peak scaled down for low occupancy,
+#   for macro-tiles whose arithmetic intensity (flops per byte loaded) is
+#   below the machine balance, and for the guards of branched kernels
+# - every work-group computes its whole macro-tile, so edge tiles waste the
+#   part outside the problem; multiple kernel solutions launch the edge
+#   kernels separately, each with its own rounds and launch overhead
+# - the constants are rough figures for GCN devices; only the ranking of one
+#   problem's candidates matters
+################################################################################
+
+# compute unit resources
+wavefrontSize = 64
+maxWavefrontsPerComputeUnit = 40
+maxWorkGroupsPerComputeUnit = 16
+numRegistersPerComputeUnit = 4*64*256 # 4 SIMDs x 64 lanes x 256 registers
+numRegistersOverhead = 16 # per work-item, for addresses and counters
+localMemoryBytesPerComputeUnit = 65536
+
+# device assumed when a problem's device profile is empty
+defaultNumComputeUnits = 44
+defaultClockFrequency = 1000 # MHz
+defaultFlopsPerClock = 128 # per compute unit
+
+# efficiency
+numWavefrontsForPeak = 8 # per compute unit, to hide latency
+machineBalance = 16.0 # flops per byte loaded needed to not wait on loads
+unrollOverhead = 2.0 # per unrolled loop iteration, in summation steps
+branchedOverhead = 1.1 # branched kernels guard every load and store
+launchOverhead = 5e-6 # seconds per kernel launch
+
+
+################################################################################
+# getDevice - (numComputeUnits, flops per second per compute unit)
+################################################################################
+def getDevice( problem ):
+  if len(problem.deviceProfile.devices) > 0:
+    device = problem.deviceProfile.devices[0]
+    numComputeUnits = device.numComputeUnits
+    clockFrequency = device.clockFrequency
+    flopsPerClock = device.flopsPerClock
+  else:
+    numComputeUnits = defaultNumComputeUnits
+    clockFrequency = defaultClockFrequency
+    flopsPerClock = defaultFlopsPerClock
+  return (numComputeUnits, 1e6*clockFrequency*flopsPerClock)
+
+################################################################################
+# getNumSummationSteps - summation steps of one work-item, in units of one
+#   multiply-add per element of its micro-tile, including loop overhead
+################################################################################
+def getNumSummationSteps( problem, kernel ):
+  (size0, size1, sizeU) = problem.getSize01U()
+  flopsPerStep = 2 if problem.tensorA.dataType.isReal() else 8
+  numSteps = problem.getNumFlops() / problem.getSizeFree() / flopsPerStep
+  unroll = kernel.unrolls[0]
+  if len(kernel.unrolls) > 1: # remainder loop
+    numStepsU = (sizeU / unroll) * (unroll + unrollOverhead) \
+        + (sizeU % unroll) * (kernel.unrolls[1] + unrollOverhead)
+  else:
+    numStepsU = int(math.ceil(1.0*sizeU/unroll)) * (unroll + unrollOverhead)
+  return numSteps * numStepsU / max(1, sizeU)
+
+################################################################################
+# getKernelTime - seconds for one launch of kernel over a grid of work-groups
+################################################################################
+def getKernelTime( problem, kernel, numWorkGroups, branched ):
+  if numWorkGroups < 1:
+    return 0.0
+  (numComputeUnits, computeUnitFlops) = getDevice( problem )
+  workGroup = kernel.tile.workGroup
+  microTile = kernel.tile.microTile
+  macroTileDim0 = workGroup[0] * microTile[0]
+  macroTileDim1 = workGroup[1] * microTile[1]
+  flopsPerStep = 2 if problem.tensorA.dataType.isReal() else 8
+
+  # work-groups per compute unit at once
+  numWavefronts = int(math.ceil(1.0*workGroup[0]*workGroup[1]/wavefrontSize))
+  numRegisters = numWavefronts * wavefrontSize * ( numRegistersOverhead \
+      + SolutionCandidateGenerator.getTileNumRegisters(kernel, microTile) )
+  localMemoryBytes = SolutionCandidateGenerator.getTileLocalMemoryBytes( \
+      kernel, kernel.unrolls, workGroup, microTile )
+  numConcurrent = min( maxWorkGroupsPerComputeUnit, \
+      maxWavefrontsPerComputeUnit / numWavefronts, \
+      numRegistersPerComputeUnit / numRegisters, \
+      localMemoryBytesPerComputeUnit / max(1, localMemoryBytes) )
+  numConcurrent = max(1, numConcurrent)
+
+  # rounds on the busiest compute unit
+  numWorkGroupsPerComputeUnit = \
+      int(math.ceil(1.0*numWorkGroups/numComputeUnits))
+  numConcurrent = min(numConcurrent, numWorkGroupsPerComputeUnit)
+  numRounds = int(math.ceil(1.0*numWorkGroupsPerComputeUnit/numConcurrent))
+
+  # efficiency
+  occupancy = min(1.0, 1.0*numConcurrent*numWavefronts/numWavefrontsForPeak)
+  if kernel.tensorAssignedDim0 == 0: # dim0 in tensorA
+    numBytesDim0 = kernel.dataTypeA.numBytes()
+    numBytesDim1 = kernel.dataTypeB.numBytes()
+  else:
+    numBytesDim0 = kernel.dataTypeB.numBytes()
+    numBytesDim1 = kernel.dataTypeA.numBytes()
+  arithmeticIntensity = 1.0 * flopsPerStep * macroTileDim0 * macroTileDim1 \
+      / (macroTileDim0*numBytesDim0 + macroTileDim1*numBytesDim1)
+  efficiency = occupancy * min(1.0, arithmeticIntensity/machineBalance)
+  if branched:
+    efficiency /= branchedOverhead
+
+  workGroupFlops = flopsPerStep * macroTileDim0 * macroTileDim1 \
+      * getNumSummationSteps( problem, kernel )
+  roundTime = workGroupFlops * numConcurrent / (computeUnitFlops*efficiency)
+  return launchOverhead + numRounds * roundTime
+
+################################################################################
+# getSolutionTime - estimated seconds of solution for problem
+################################################################################
+def getSolutionTime( problem, solution ):
+  (size0, size1, sizeU) = problem.getSize01U()
+  kernel = solution.kernels[0]
+  macroTileDim0 = kernel.tile.workGroup[0] * kernel.tile.microTile[0]
+  macroTileDim1 = kernel.tile.workGroup[1] * kernel.tile.microTile[1]
+  numBatches = problem.getSizeFree() / max(1, size0*size1)
+  if solution.branch[0].isMultiple():
+    # main, edge-0, edge-1 and corner kernels
+    numTiles0 = size0 / macroTileDim0
+    numTiles1 = size1 / macroTileDim1
+    numEdgeTiles0 = 1 if size0 % macroTileDim0 else 0
+    numEdgeTiles1 = 1 if size1 % macroTileDim1 else 0
+    grids = [ numTiles0*numTiles1, numEdgeTiles0*numTiles1, \
+        numTiles0*numEdgeTiles1, numEdgeTiles0*numEdgeTiles1 ]
+    time = 0.0
+    for i in range(0, len(grids)):
+      if solution.kernels[i] is not None:
+        time += getKernelTime( problem, solution.kernels[i], \
+            grids[i]*numBatches, i > 0 )
+    return time
+  else:
+    numTiles0 = int(math.ceil(1.0*size0/macroTileDim0))
+    numTiles1 = int(math.ceil(1.0*size1/macroTileDim1))
+    return getKernelTime( problem, kernel, numTiles0*numTiles1*numBatches, \
+        solution.branch[0].isBranched() )
+
+################################################################################
+# getSolutionKey - parameters which distinguish one problem's candidates;
+#   breaks ties between equal estimates so rankings don't depend on set order
+################################################################################
+def getSolutionKey( solution ):
+  kernel = solution.kernels[0]
+  return ( \
+      solution.branch[0].value, \
+      solution.ppdLeadingStrides, \
+      solution.ppdOffsets, \
+      kernel.ppdAll, \
+      tuple(kernel.unrolls), \
+      tuple(kernel.tile.workGroup), \
+      tuple(kernel.tile.microTile), \
+      kernel.numLoadsParaA, \
+      kernel.numLoadsParaB )
+
+################################################################################
+# getFastestSolutions - the numSolutions solutions with the smallest
+#   estimated times for problem, fastest first
+################################################################################
+def getFastestSolutions( problem, solutions, numSolutions ):
+  rankedSolutions = [ (getSolutionTime(problem, solution), \
+      getSolutionKey(solution), solution) for solution in solutions ]
+  rankedSolutions.sort( key=lambda entry: entry[:2] )
+  return [ entry[2] for entry in rankedSolutions[:numSolutions] ]
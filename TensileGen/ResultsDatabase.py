@@ -0,0 +1,287 @@
+################################################################################
+# Copyright (C) 2016 Advanced Micro Devices, Inc. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell cop-
+# ies of the Software, and to permit persons to whom the Software is furnished
+# to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IM-
+# PLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNE-
+# CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+################################################################################
+
+import sqlite3
+import cPickle
+import argparse
+import os
+
+import FileReader
+
+
+################################################################################
+# getObjectKey
+# - canonical text key of a Structs object, built from its getAttributes()
+#   so two objects which compare equal always get the same database row
+################################################################################
+def getAttributesKey( obj ):
+  if hasattr(obj, "getAttributes"):
+    return (obj.__class__.__name__, getAttributesKey(obj.getAttributes()))
+  if isinstance(obj, (tuple, list)):
+    return tuple( getAttributesKey(item) for item in obj )
+  return obj
+
+def getObjectKey( obj ):
+  return repr(getAttributesKey(obj))
+
+
+################################################################################
+# ResultsDatabase
+# - sqlite store of benchmark results accumulated across many solution xmls
+# - objects are stored pickled, keyed by getObjectKey; benchmarks and
+#   validation reference them by row id and are indexed by ExactMatch so
+#   psTimes for one ExactMatch can be read without loading the whole database
+# - each imported file adds one Benchmarks row per problem/solution holding
+#   its pickled SolutionBenchmark statistics; rows are merged when read
+################################################################################
+class ResultsDatabase:
+  schema = [
+    "CREATE TABLE IF NOT EXISTS DeviceProfiles ( " \
+        "id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, " \
+        "name TEXT NOT NULL, object BLOB NOT NULL )",
+    "CREATE TABLE IF NOT EXISTS ExactMatches ( " \
+        "id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, " \
+        "deviceProfileId INTEGER NOT NULL REFERENCES DeviceProfiles(id), " \
+        "name TEXT NOT NULL, object BLOB NOT NULL )",
+    "CREATE TABLE IF NOT EXISTS Problems ( " \
+        "id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, " \
+        "sizeType INTEGER NOT NULL, object BLOB NOT NULL )",
+    "CREATE TABLE IF NOT EXISTS Solutions ( " \
+        "id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, " \
+        "object BLOB NOT NULL )",
+    "CREATE TABLE IF NOT EXISTS Benchmarks ( " \
+        "exactMatchId INTEGER NOT NULL REFERENCES ExactMatches(id), " \
+        "problemId INTEGER NOT NULL REFERENCES Problems(id), " \
+        "solutionId INTEGER NOT NULL REFERENCES Solutions(id), " \
+        "numSamples INTEGER NOT NULL, meanTime REAL NOT NULL, " \
+        "minTime REAL NOT NULL, statistics BLOB NOT NULL )",
+    "CREATE INDEX IF NOT EXISTS BenchmarksByExactMatch ON Benchmarks ( exactMatchId )",
+    "CREATE TABLE IF NOT EXISTS Validations ( " \
+        "exactMatchId INTEGER NOT NULL REFERENCES ExactMatches(id), " \
+        "problemId INTEGER NOT NULL REFERENCES Problems(id), " \
+        "solutionId INTEGER NOT NULL REFERENCES Solutions(id), " \
+        "status INTEGER NOT NULL, " \
+        "PRIMARY KEY ( exactMatchId, problemId, solutionId ) )",
+    "CREATE TABLE IF NOT EXISTS ImportedFiles ( " \
+        "hash TEXT PRIMARY KEY, path TEXT NOT NULL, " \
+        "optimizeAlpha INTEGER NOT NULL, optimizeBeta INTEGER NOT NULL )",
+    ]
+
+  def __init__( self, databasePath ):
+    self.connection = sqlite3.connect( databasePath )
+    for statement in self.schema:
+      self.connection.execute( statement )
+    self.connection.commit()
+    # key -> row id of objects already looked up/inserted this session
+    self.idCache = {}
+
+  def close( self ):
+    self.connection.close()
+
+  ##############################################################################
+  # getObjectId - row id of obj in table, inserted if not yet present
+  ##############################################################################
+  def getObjectId( self, table, obj, extraColumns=() ):
+    key = getObjectKey(obj)
+    if (table, key) in self.idCache:
+      return self.idCache[(table, key)]
+    row = self.connection.execute( \
+        "SELECT id FROM %s WHERE key=?" % table, (key,) ).fetchone()
+    if row is None:
+      columns = ("key", "object") + tuple(name for name, value in extraColumns)
+      values = (key, sqlite3.Binary(cPickle.dumps(obj, cPickle.HIGHEST_PROTOCOL))) \
+          + tuple(value for name, value in extraColumns)
+      cursor = self.connection.execute( \
+          "INSERT INTO %s (%s) VALUES (%s)" % (table, ", ".join(columns), \
+          ", ".join(["?"]*len(columns))), values )
+      rowId = cursor.lastrowid
+    else:
+      rowId = row[0]
+    self.idCache[(table, key)] = rowId
+    return rowId
+
+  ##############################################################################
+  # addSolutionMap - insert a psMap as produced by FileReader
+  ##############################################################################
+  def addSolutionMap( self, psMap ):
+    for deviceProfile, exactMatches in psMap.iteritems():
+      deviceProfileId = self.getObjectId( "DeviceProfiles", deviceProfile, \
+          (("name", deviceProfile.libString()),) )
+      for exactMatch, problems in exactMatches.iteritems():
+        exactMatchId = self.getObjectId( "ExactMatches", exactMatch, \
+            (("deviceProfileId", deviceProfileId), ("name", exactMatch.libString())) )
+        for sizeType in range(0, len(problems)):
+          for problem, solutionCandidates in problems[sizeType].iteritems():
+            problemId = self.getObjectId( "Problems", problem, \
+                (("sizeType", sizeType),) )
+            for solution, solutionBenchmark in solutionCandidates.iteritems():
+              solutionId = self.getObjectId( "Solutions", solution )
+              if solutionBenchmark.numSamples > 0:
+                self.addBenchmark( exactMatchId, problemId, solutionId, \
+                    solutionBenchmark )
+              if solutionBenchmark.validationStatus != 0:
+                self.addValidation( exactMatchId, problemId, solutionId, \
+                    solutionBenchmark.validationStatus )
+
+  def addBenchmark( self, exactMatchId, problemId, solutionId, solutionBenchmark ):
+    validationStatus = solutionBenchmark.validationStatus
+    solutionBenchmark.validationStatus = 0 # kept in Validations
+    statistics = cPickle.dumps(solutionBenchmark, cPickle.HIGHEST_PROTOCOL)
+    solutionBenchmark.validationStatus = validationStatus
+    self.connection.execute( "INSERT INTO Benchmarks VALUES (?, ?, ?, ?, ?, ?, ?)", \
+        (exactMatchId, problemId, solutionId, solutionBenchmark.numSamples, \
+        solutionBenchmark.mean(), solutionBenchmark.minimum, \
+        sqlite3.Binary(statistics)) )
+
+  def addValidation( self, exactMatchId, problemId, solutionId, validationStatus ):
+    row = self.connection.execute( "SELECT status FROM Validations " \
+        "WHERE exactMatchId=? AND problemId=? AND solutionId=?", \
+        (exactMatchId, problemId, solutionId) ).fetchone()
+    if row is None:
+      self.connection.execute( "INSERT INTO Validations VALUES (?, ?, ?, ?)", \
+          (exactMatchId, problemId, solutionId, validationStatus) )
+    elif row[0] != validationStatus:
+      print "ERROR: conflicting validation reports"
+
+  ##############################################################################
+  # importXMLFiles - add solution xmls; files already imported are skipped
+  ##############################################################################
+  def importXMLFiles( self, inputFiles, optimizeAlpha, optimizeBeta, useCache=False ):
+    for inputFile in inputFiles:
+      fileHash = FileReader.getFileHash( inputFile )
+      if self.connection.execute( "SELECT path FROM ImportedFiles WHERE hash=?", \
+          (fileHash,) ).fetchone() is not None:
+        print "TensileGen: Already imported " + os.path.basename(inputFile)
+        continue
+      print "TensileGen: Importing " + os.path.basename(inputFile)
+      psMap = FileReader.readSolutionsFromXMLFile( inputFile, optimizeAlpha, \
+          optimizeBeta, useCache )
+      try:
+        self.addSolutionMap( psMap )
+        self.connection.execute( "INSERT INTO ImportedFiles VALUES (?, ?, ?, ?)", \
+            (fileHash, os.path.abspath(inputFile), int(optimizeAlpha), int(optimizeBeta)) )
+        self.connection.commit()
+      except:
+        self.connection.rollback()
+        self.idCache = {}
+        raise
+
+  ##############################################################################
+  # getExactMatches - [ (exactMatchId, deviceProfile, exactMatch) ]
+  ##############################################################################
+  def getExactMatches( self, exactMatchNames=None ):
+    exactMatches = []
+    deviceProfiles = {}
+    for exactMatchId, deviceProfileId, name, exactMatchBlob in \
+        self.connection.execute( "SELECT id, deviceProfileId, name, object " \
+        "FROM ExactMatches ORDER BY id" ):
+      if exactMatchNames is not None and name not in exactMatchNames:
+        continue
+      if deviceProfileId not in deviceProfiles:
+        deviceProfileBlob = self.connection.execute( \
+            "SELECT object FROM DeviceProfiles WHERE id=?", \
+            (deviceProfileId,) ).fetchone()[0]
+        deviceProfiles[deviceProfileId] = cPickle.loads(str(deviceProfileBlob))
+      exactMatch = cPickle.loads(str(exactMatchBlob))
+      # share one DeviceProfile object between all its ExactMatches
+      exactMatch.deviceProfile = deviceProfiles[deviceProfileId]
+      exactMatches.append( (exactMatchId, exactMatch.deviceProfile, exactMatch) )
+    return exactMatches
+
+  ##############################################################################
+  # getSolutionMap - psMap holding only the given ExactMatch
+  ##############################################################################
+  def getSolutionMap( self, exactMatchId, deviceProfile, exactMatch ):
+    problems = {}
+    solutions = {}
+    for problemId, sizeType, problemBlob in self.connection.execute( \
+        "SELECT id, sizeType, object FROM Problems WHERE id IN " \
+        "(SELECT DISTINCT problemId FROM Benchmarks WHERE exactMatchId=?)", \
+        (exactMatchId,) ):
+      problems[problemId] = (sizeType, cPickle.loads(str(problemBlob)))
+    for solutionId, solutionBlob in self.connection.execute( \
+        "SELECT id, object FROM Solutions WHERE id IN " \
+        "(SELECT DISTINCT solutionId FROM Benchmarks WHERE exactMatchId=?)", \
+        (exactMatchId,) ):
+      solutions[solutionId] = cPickle.loads(str(solutionBlob))
+
+    psMap = { deviceProfile: { exactMatch: [ {}, {} ] } }
+    sizeTypeMaps = psMap[deviceProfile][exactMatch]
+    # rowid order merges statistics in import order so times are reproducible
+    for problemId, solutionId, statistics in self.connection.execute( \
+        "SELECT problemId, solutionId, statistics FROM Benchmarks " \
+        "WHERE exactMatchId=? ORDER BY rowid", (exactMatchId,) ):
+      sizeType, problem = problems[problemId]
+      solutionCandidates = sizeTypeMaps[sizeType].setdefault(problem, {})
+      solution = solutions[solutionId]
+      solutionBenchmark = cPickle.loads(str(statistics))
+      if solution not in solutionCandidates:
+        solutionCandidates[solution] = solutionBenchmark
+      else:
+        solutionCandidates[solution].merge(solutionBenchmark)
+    for problemId, solutionId, validationStatus in self.connection.execute( \
+        "SELECT problemId, solutionId, status FROM Validations " \
+        "WHERE exactMatchId=?", (exactMatchId,) ):
+      if problemId not in problems or solutionId not in solutions:
+        continue # validated but never benchmarked
+      sizeType, problem = problems[problemId]
+      solutionCandidates = sizeTypeMaps[sizeType].get(problem, {})
+      solution = solutions[solutionId]
+      if solution in solutionCandidates:
+        solutionCandidates[solution].validationStatus = validationStatus
+    return psMap
+
+
+################################################################################
+# ResultsDatabase - Main
+################################################################################
+if __name__ == "__main__":
+
+  # arguments
+  ap = argparse.ArgumentParser(description="ResultsDatabase")
+  ap.add_argument("--input-path", dest="inputPath", required=True )
+  ap.add_argument("--database", dest="databasePath", required=True )
+  ap.add_argument("--optimize-alpha", dest="optimizeAlphaStr" )
+  ap.add_argument("--optimize-beta", dest="optimizeBetaStr" )
+  ap.add_argument("--no-cache", dest="useCache", action="store_false", \
+      help="don't read or write parsed-xml caches next to input xmls" )
+  ap.set_defaults(optimizeAlphaStr="Off")
+  ap.set_defaults(optimizeBetaStr="Off")
+  ap.set_defaults(useCache=True)
+
+  # parse arguments
+  args = ap.parse_args()
+  inputFiles = FileReader.getXMLFiles( args.inputPath )
+
+  # print settings
+  print "TensileGen: numInputFiles=%u" % len(inputFiles)
+  print "  InputPath=" + args.inputPath
+  print "  Database=" + args.databasePath
+
+  # import
+  database = ResultsDatabase( args.databasePath )
+  database.importXMLFiles( \
+      inputFiles, \
+      args.optimizeAlphaStr=="On" or args.optimizeAlphaStr=="ON", \
+      args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON", \
+      args.useCache )
+  database.close()
+  print "TensileGen: DONE."
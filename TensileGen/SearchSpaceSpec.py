@@ -0,0 +1,140 @@
+################################################################################
+# Copyright (C) 2016 Advanced Micro Devices, Inc. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell cop-
+# ies of the Software, and to permit persons to whom the Software is furnished
+# to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IM-
+# PLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNE-
+# CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+################################################################################
+
+import json
+
+import SolutionCandidateGenerator
+try:
+  import yaml
+except ImportError:
+  yaml = None
+
+
+################################################################################
+# Search Space Spec
+# - a json file (or yaml, with PyYAML) of SolutionCandidateGenerator
+#   settings, so search spaces and hardware limits can differ per device
+#   without editing the generator, e.g.,
+#     {
+#       "default": { "modeWorkGroups": "thorough", "unrollFast": [16, 8] },
+#       "devices": {
+#         "Hawaii": { "maxLocalMemoryBytes": 65536 },
+#         "Fiji_Fiji": { "maxRegisters": 24576 }
+#       }
+#     }
+# - a device profile gets the default settings updated by those of its entry
+#   in devices, looked up by libString, e.g., "Fiji_Fiji", else by the name
+#   of its first device
+# - settings are those in SolutionCandidateGenerator.searchSpaceSettings;
+#   modes may also be given by name
+################################################################################
+modeNames = { \
+    "exhaustive": SolutionCandidateGenerator.SolutionCandidateGenerator.modeExhaustive, \
+    "thorough":   SolutionCandidateGenerator.SolutionCandidateGenerator.modeThorough, \
+    "fast":       SolutionCandidateGenerator.SolutionCandidateGenerator.modeFast }
+
+################################################################################
+# getSetting - value of a setting, checked against the generator's default
+################################################################################
+def getSetting( path, name, value ):
+  generatorClass = SolutionCandidateGenerator.SolutionCandidateGenerator
+  if name not in generatorClass.searchSpaceSettings:
+    raise ValueError("%s: unknown setting \"%s\"" % (path, name))
+  default = getattr(generatorClass, name)
+  if name.startswith("mode") and value in modeNames:
+    value = modeNames[value]
+  if isinstance(default, bool):
+    valid = isinstance(value, bool)
+  elif isinstance(default, list):
+    valid = isinstance(value, list) and all( isinstance(item, int) \
+        and not isinstance(item, bool) for item in value )
+  else:
+    valid = isinstance(value, int) and not isinstance(value, bool)
+  if not valid:
+    raise ValueError("%s: setting \"%s\" is %s; expected a value like %s" \
+        % (path, name, json.dumps(value), json.dumps(default)))
+  return value
+
+def getSettings( path, settings ):
+  if not isinstance(settings, dict):
+    raise ValueError("%s: expected a map of settings, found %s" \
+        % (path, json.dumps(settings)))
+  return dict( (str(name), getSetting(path, name, value)) \
+      for name, value in settings.iteritems() )
+
+################################################################################
+# readSearchSpaceSpec - { "default": settings, "devices": { name: settings } }
+################################################################################
+def readSearchSpaceSpec( path ):
+  specFile = open( path, "rb" )
+  try:
+    if path.endswith(".yaml") or path.endswith(".yml"):
+      if yaml is None:
+        raise IOError("%s is yaml; install PyYAML to read it" % path)
+      spec = yaml.safe_load( specFile )
+    else:
+      spec = json.load( specFile )
+  finally:
+    specFile.close()
+  if not isinstance(spec, dict):
+    raise ValueError("%s: expected a map with \"default\" and \"devices\"" % path)
+  for key in spec:
+    if key not in ["default", "devices"]:
+      raise ValueError("%s: unknown section \"%s\"" % (path, key))
+  devices = spec.get("devices", {})
+  if not isinstance(devices, dict):
+    raise ValueError("%s: expected devices to map device names to settings" % path)
+  return { \
+      "default": getSettings( path, spec.get("default", {}) ), \
+      "devices": dict( (str(name), getSettings(path, settings)) \
+          for name, settings in devices.iteritems() ) }
+
+################################################################################
+# getSearchSpaceSettings - settings of a device profile; {} if no spec
+################################################################################
+def getSearchSpaceSettings( spec, deviceProfile ):
+  settings = {}
+  if spec is None:
+    return settings
+  settings.update( spec["default"] )
+  devices = spec["devices"]
+  if len(deviceProfile.devices) > 0:
+    if deviceProfile.libString() in devices:
+      settings.update( devices[deviceProfile.libString()] )
+    elif deviceProfile.devices[0].name in devices:
+      settings.update( devices[deviceProfile.devices[0].name] )
+  return settings
+
+################################################################################
+# getSolutionCandidateGenerator - generator with a device profile's settings
+# - generators are kept in generators by device profile, so their caches
+#   carry over between problems of a device
+################################################################################
+def getSolutionCandidateGenerator( generators, deviceProfile, spec, \
+    optimizeAlpha, optimizeBeta, backend ):
+  generator = generators.get( deviceProfile )
+  if generator is None:
+    generator = SolutionCandidateGenerator.SolutionCandidateGenerator( \
+        optimizeAlpha, optimizeBeta, backend )
+    for name, value in getSearchSpaceSettings( spec, deviceProfile ).iteritems():
+      setattr( generator, name, value )
+    generators[deviceProfile] = generator
+  return generator
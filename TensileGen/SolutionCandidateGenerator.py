@@ -20,12 +20,14 @@
 ################################################################################
 
 import copy
+import itertools
 import Structs
-import FileReader
 import KernelWriter
 import SolutionWriter
+import PerformanceModel
 import argparse
 import math
+import time
 
 """
 3 levels
@@ -103,6 +105,21 @@ class SolutionCandidateGenerator:
   ratioMacroTileExact     = True # true means tile is 1x1, 1x2, 1x4...
   microTileIncr           = 1 # 2 means even micro tile only
 
+  # performance model; keep only this many candidates per problem, the ones
+  # PerformanceModel estimates fastest (0 keeps every candidate)
+  numModelCandidates      = 0
+
+  # class constants a search space spec may override per device; see
+  # SearchSpaceSpec
+  searchSpaceSettings = [ "maxLocalMemoryBytes", "localMemPad", \
+      "maxRegisters", "modeWorkGroups", "modeMicroTiles", "modeUnrolls", \
+      "modeLoads", "modePreprocessorDefinitions", "thresholdWorkGroupSize", \
+      "thresholdMicroTiles", "thresholdUnrolls", "unrollFast", \
+      "thresholdSkinny", "ratioWorkGroupSkinny", "ratioMacroTileSkinny", \
+      "ratioMacroTileThorough", "ratioMacroTileSS", "ratioMacroTileExact", \
+      "microTileIncr", "numModelCandidates", "noBranches", \
+      "noMultipleKernels" ]
+
 
   # Research Options
   noBranches = False # True means don't generate any solution requiring branches, i.e., only generate fastest
@@ -123,18 +140,125 @@ class SolutionCandidateGenerator:
       self.ppdUniverse = [ [True, False, False] ]
     self.kernelWriter = KernelWriter.KernelWriter(backend)
     self.solutionWriter = SolutionWriter.SolutionWriter(backend)
+    # candidates by signature; see getSolutionCandidatesForProblem
+    self.candidateCache = {}
+    # tile universes by data types, work-groups, micro-tile range and ratio
+    self.tileUniverseCache = {}
 
   ##############################################################################
   # getSolutionCandidatesForProblem
+  # - every candidate for the problem, as a set; memoized by signature
+  # - fully exhaustive search spaces are only counted, see
+  #   iterSolutionCandidatesForShard for enumerating them
+  # - if numModelCandidates is set, only that many are returned, see
+  #   PerformanceModel; the cache holds them all since the model depends on
+  #   the sizes
   ##############################################################################
   def getSolutionCandidatesForProblem( self, inputProblem ):
-    problem = copy.deepcopy(inputProblem)
+    searchSpace = self.getSearchSpace( inputProblem )
+    if self.isFullyExhaustive():
+      print "NumCandidates: " + str(self.countSolutionCandidates(searchSpace)) \
+          + "; enumerate them in shards"
+      return set()
+    if searchSpace.signature in self.candidateCache:
+      solutionCandidates = self.attachProblem( \
+          self.candidateCache[searchSpace.signature], searchSpace.kernel )
+    else:
+      solutionCandidates = set()
+      for key, solution in self.generateSolutionCandidates( searchSpace, \
+          self.getTiles(searchSpace) ):
+        solutionCandidates.add( solution )
+      self.candidateCache[searchSpace.signature] = solutionCandidates
+    if self.numModelCandidates > 0:
+      solutionCandidates = set( PerformanceModel.getFastestSolutions( \
+          searchSpace.kernel.problem, solutionCandidates, \
+          self.numModelCandidates ) )
+    return solutionCandidates
+
+  ##############################################################################
+  # iterSolutionCandidatesForProblem
+  # - yields the candidates one at a time, most promising tiles first (see
+  #   getTilePriority), without holding them; for streaming large or
+  #   exhaustive search spaces
+  # - stops after maxCandidates candidates or once maxSeconds have passed,
+  #   though always after at least one
+  # - duplicates are skipped by remembering the parameters which produced
+  #   each candidate rather than the candidate itself
+  ##############################################################################
+  def iterSolutionCandidatesForProblem( self, inputProblem, \
+      maxCandidates=None, maxSeconds=None ):
+    startTime = time.time()
+    searchSpace = self.getSearchSpace( inputProblem )
+    tiles = sorted( self.getTiles(searchSpace), \
+        key=lambda tile: self.getTilePriority(searchSpace, tile) )
     numCandidates = 0
-    fullyExhaustive = self.modeWorkGroups == self.modeExhaustive \
-        and self.modeMicroTiles == self.modeExhaustive \
-        and self.modeUnrolls == self.modeExhaustive \
-        and self.modeLoads == self.modeExhaustive \
-        and self.modePreprocessorDefinitions == self.modeExhaustive
+    seenKeys = set()
+    for key, solution in self.generateSolutionCandidates( searchSpace, tiles ):
+      if key in seenKeys:
+        continue
+      if maxSeconds is not None and numCandidates > 0 \
+          and time.time() - startTime > maxSeconds:
+        return
+      seenKeys.add( key )
+      numCandidates += 1
+      yield solution
+      if maxCandidates is not None and numCandidates >= maxCandidates:
+        return
+
+  ##############################################################################
+  # iterSolutionCandidatesForShard
+  # - yields the candidates of one of numShards shards of the problem's
+  #   search space, see getTileShards; shards are disjoint and together hold
+  #   every candidate, so each can be made by a different process or host
+  # - holds no more than one tile's candidates, so works for fully
+  #   exhaustive search spaces
+  ##############################################################################
+  def iterSolutionCandidatesForShard( self, inputProblem, shardIndex, \
+      numShards ):
+    searchSpace = self.getSearchSpace( inputProblem )
+    tiles = self.getTileShards( searchSpace, numShards )[shardIndex]
+    currentTile = None
+    seenKeys = set()
+    for key, solution in self.generateSolutionCandidates( searchSpace, tiles ):
+      if key[:3] != currentTile: # keys start with the tile
+        currentTile = key[:3]
+        seenKeys = set()
+      if key in seenKeys:
+        continue
+      seenKeys.add( key )
+      yield solution
+
+  ##############################################################################
+  # getTileShards
+  # - the tiles split into numShards lists, each a range of consecutive
+  #   tiles in getTiles order (so of unrolls x work-groups x micro-tiles),
+  #   cut so shards have about equal numbers of candidates as counted by
+  #   countSolutionCandidates; the split only depends on the search space
+  ##############################################################################
+  def getTileShards( self, searchSpace, numShards ):
+    numPreprocessorDefinitions = len(searchSpace.universePreprocessorDefinitions)
+    tiles = []
+    tileNumCandidates = []
+    for tile in self.getTiles(searchSpace):
+      (totalNumLoadsA, totalNumLoadsB) = self.getLoadGrid( tile )
+      tiles.append( tile )
+      tileNumCandidates.append( totalNumLoadsA*totalNumLoadsB \
+          *numPreprocessorDefinitions*2 )
+    numCandidates = sum(tileNumCandidates)
+    shards = [ [] for i in range(0, numShards) ]
+    numCandidatesBefore = 0
+    for tile, numTileCandidates in zip(tiles, tileNumCandidates):
+      shardIndex = numCandidatesBefore * numShards / max(1, numCandidates)
+      shards[shardIndex].append( tile )
+      numCandidatesBefore += numTileCandidates
+    return shards
+
+  ##############################################################################
+  # getSearchSpace
+  # - the universes of a problem's candidates, see SearchSpace
+  ##############################################################################
+  def getSearchSpace( self, inputProblem ):
+    problem = copy.deepcopy(inputProblem)
     # optimize alpha and beta?
     if not self.optimizeAlpha and not problem.operation.useAlpha():
       if self.printDetails: print "SCG: reverting void alpha to typeC b/c not optimizing"
@@ -147,10 +271,9 @@ class SolutionCandidateGenerator:
     numIndicesA = len(problem.tensorA.dimensions)
     numIndicesB = len(problem.tensorB.dimensions)
 
-    # create solution object
+    # create kernel object; candidates get clones of it and each candidate
+    # is a new solution object
     kernel = Structs.Kernel()
-    solution = Structs.Solution()
-    solutionCandidates = set()
 
     # Solution Correctness Parameters
     kernel.dataTypeC = problem.tensorC.dataType
@@ -161,9 +284,8 @@ class SolutionCandidateGenerator:
     kernel.problem = problem
 
     # Index Assignments
-    kernel.indexOrderC = []
-    kernel.indexOrderSummation = []
-    makeIndexAssignments( kernel, problem )
+    indexAssignments = getIndexAssignments( problem )
+    makeIndexAssignments( kernel, problem, indexAssignments )
     
     ###################################
     # Dimension Sizes
@@ -341,253 +463,577 @@ class SolutionCandidateGenerator:
     """
     
     ###################################
-    # begin solution universe
-    ###################################
+    # tile universe: [ (workGroup, [microTile, ...]) ]
+    (tileUniverseKey, tileUniverse, macroTileDims0, macroTileDims1) = \
+        self.getTileUniverse( kernel, universeWorkGroups, microTileMin, \
+        microTileMax, macroTileRatio )
 
-    
     ###################################
-    # for unrolls
-    for unroll in universeUnrolls:
-      # print "unroll = " + str(unroll)
-      kernel.unrolls = unroll
-      
-      ###################################
-      # for work-groups
-      for workGroup in universeWorkGroups:
-        kernel.tile.workGroup = workGroup
-        if fullyExhaustive:
-          print "NumCandidates: " + str(numCandidates)
-        
-        ###################################
-        # for all micro-tile dimensions
-        # print microTileMin, microTileMax, workGroup[0], workGroup[1]
-        for microTileDim0 in range(microTileMin, microTileMax+1, self.microTileIncr):
-          for microTileDim1 in range(microTileMin, microTileMax+1, self.microTileIncr):
-
-            # filter out single solution
-            if False:
-              if microTileDim0 != 6:
-                continue
-              if microTileDim1 != 6:
-                continue
-              if workGroup[0] != 16:
-                continue
-              if workGroup[1] != 16:
-                continue
-              #if unroll != [16]:
-                #continue
-
-            microTile = [ microTileDim0, microTileDim1 ]
-            kernel.tile.microTile = microTile
-
-            # micro-tile not too skinny
-            # if float(microTile[1])/microTile[0] > microTileRatio or float(microTile[0])/microTile[1] > microTileRatio:
-              #print "micro tile too skinny %u %u %u %u" % (workGroup[0], workGroup[1], microTile[0], microTile[1])
-              #continue
-
-            # macro-tile not too skinny
-            macroTileDim0 = workGroup[0] * microTile[0]
-            macroTileDim1 = workGroup[1] * microTile[1]
-            if float(macroTileDim1)/macroTileDim0 > macroTileRatio or float(macroTileDim0)/macroTileDim1 > macroTileRatio:
-              #print "macro tile too skinny %u %u %u %u" % (workGroup[0], workGroup[1], microTile[0], microTile[1])
-              continue
-            
-            if self.modeMicroTiles == self.modeFast: # don't accept small work-groups with large micro-tiles; pruning options
-              if microTileDim0 > 0.5*workGroup[0] or microTileDim1 > 0.5*workGroup[1]:
-                #print "skipping small WG and large UT: %ux%u > .5*%ux%u" % (microTile[0], microTile[1], workGroup[0], workGroup[1] )
-                continue
-              
-            if self.ratioMacroTileExact:
-              if 1.0*macroTileDim0/macroTileDim1 not in [1, 2, 4, 8] \
-                and 1.0*macroTileDim1/macroTileDim0 not in [1, 2, 4, 8]:
-                continue
-              if 1.0*microTile[0]/microTile[1] not in [1, 2, 4, 8] \
-                and 1.0*microTile[1]/microTile[0] not in [1, 2, 4, 8]:
-                continue
-              if 1.0*workGroup[0]/workGroup[1] not in [1, 2, 4, 8] \
-                and 1.0*workGroup[1]/workGroup[0] not in [1, 2, 4, 8]:
-                continue
+    # candidate signature
+    # - everything the candidates depend on; the sizes only matter
+    #   through the work-groups, unrolls, macro-tile ratio and whether they
+    #   are multiples of each macro-tile
+    signature = ( \
+        kernel.dataTypeC, \
+        kernel.dataTypeA, \
+        kernel.dataTypeB, \
+        kernel.dataTypeAlpha, \
+        kernel.dataTypeBeta, \
+        indexAssignments, \
+        tileUniverseKey, \
+        tuple( tuple(unroll) for unroll in universeUnrolls ), \
+        tuple( tuple(ppd) for ppd in universePreprocessorDefinitions ), \
+        tuple(kernelGrid), \
+        tuple( problemSizeDim0 % macroTileDim0 == 0 \
+            for macroTileDim0 in macroTileDims0 ), \
+        tuple( problemSizeDim1 % macroTileDim1 == 0 \
+            for macroTileDim1 in macroTileDims1 ) )
 
-            # macro-tile not too large
-            numWorkItems = workGroup[0] * workGroup[1]
-            numRegisters = numWorkItems * ( microTile[0] * microTile[1] \
-                * kernel.dataTypeC.numRegisters() \
-                + microTile[0] * kernel.dataTypeA.numRegisters() \
-                + microTile[1] * kernel.dataTypeB.numRegisters() )
-            if numRegisters > self.maxRegisters:
-              continue
+    searchSpace = SearchSpace()
+    searchSpace.kernel = kernel
+    searchSpace.transA = transA
+    searchSpace.transB = transB
+    searchSpace.problemSizeDim0 = problemSizeDim0
+    searchSpace.problemSizeDim1 = problemSizeDim1
+    searchSpace.universeUnrolls = universeUnrolls
+    searchSpace.tileUniverse = tileUniverse
+    searchSpace.universePreprocessorDefinitions = \
+        universePreprocessorDefinitions
+    searchSpace.kernelGrid = kernelGrid
+    searchSpace.signature = signature
+    return searchSpace
 
-            # local memory not too large
-            localMemoryBytes = 0
-            if kernel.tensorAssignedDim0 == 0: # dim0 in tensorA
-              localMemoryBytes = unroll[0] * ((macroTileDim0+self.localMemPad)*kernel.dataTypeA.numBytes() + (macroTileDim1+self.localMemPad)*kernel.dataTypeB.numBytes())
-            else: # dim1 in tensorA
-              localMemoryBytes = unroll[0] * ((macroTileDim0+self.localMemPad)*kernel.dataTypeB.numBytes() + (macroTileDim1+self.localMemPad)*kernel.dataTypeA.numBytes())
-            if localMemoryBytes > self.maxLocalMemoryBytes:
-              continue
+  ##############################################################################
+  # getTiles
+  # - (unroll, workGroup, microTile) of every candidate tile which fits in
+  #   local memory; unrolls outermost
+  ##############################################################################
+  def getTiles( self, searchSpace ):
+    kernel = searchSpace.kernel
+    for unroll in searchSpace.universeUnrolls:
+      for workGroup, microTiles in searchSpace.tileUniverse:
+        for microTile in microTiles:
+          # local memory not too large
+          localMemoryBytes = getTileLocalMemoryBytes( kernel, unroll, \
+              workGroup, microTile, self.localMemPad )
+          if localMemoryBytes > self.maxLocalMemoryBytes:
+            continue
+          yield (unroll, workGroup, microTile)
 
-            # load grid
-            totalNumLoadsA = max(1, (workGroup[0]*microTile[0]*unroll[0])/(workGroup[0]*workGroup[1]) )
-            totalNumLoadsB = max(1, (workGroup[1]*microTile[1]*unroll[0])/(workGroup[0]*workGroup[1]) )
-            kernel.totalLoadSizeParaA = macroTileDim0 if kernel.unrollDimStrideGreaterThanTileDimStrideA else unroll[0]
-            kernel.totalLoadSizePerpA = unroll[0] if kernel.unrollDimStrideGreaterThanTileDimStrideA else macroTileDim0
-            kernel.totalLoadSizeParaB = macroTileDim1 if not kernel.unrollDimStrideLessThanTileDimStrideB else unroll[0]
-            kernel.totalLoadSizePerpB = unroll[0] if not kernel.unrollDimStrideLessThanTileDimStrideB else macroTileDim1
-            
-            
-            if fullyExhaustive:
-              numCandidates += totalNumLoadsA*totalNumLoadsB*len(universePreprocessorDefinitions)*2
-              continue
+  ##############################################################################
+  # getTilePriority
+  # - sort key; macro-tiles which fit in the problem first, then larger
+  #   work-groups (occupancy), larger macro-tiles (reuse), tiles which
+  #   divide the problem (no edge kernels), exact unrolls and larger unrolls
+  ##############################################################################
+  def getTilePriority( self, searchSpace, tile ):
+    (unroll, workGroup, microTile) = tile
+    macroTileDim0 = workGroup[0] * microTile[0]
+    macroTileDim1 = workGroup[1] * microTile[1]
+    fitsTile = macroTileDim0 <= searchSpace.problemSizeDim0 \
+        and macroTileDim1 <= searchSpace.problemSizeDim1
+    exactTile = searchSpace.problemSizeDim0 % macroTileDim0 == 0 \
+        and searchSpace.problemSizeDim1 % macroTileDim1 == 0
+    return ( \
+        not fitsTile, \
+        -workGroup[0]*workGroup[1], \
+        -macroTileDim0*macroTileDim1, \
+        not exactTile, \
+        len(unroll), \
+        -unroll[0] )
 
-            # num loads parallel A
-            universeNumLoadsParaA = []
-            if self.modeLoads == self.modeExhaustive:
-              for i in range(1, totalNumLoadsA+1):
-                universeNumLoadsParaA.append(i)
-            elif self.modeLoads == self.modeThorough:
-                universeNumLoadsParaA.append( totalNumLoadsA )
-                universeNumLoadsParaA.append( 1 )
-            else:
-              if not transA:
-                universeNumLoadsParaA.append( totalNumLoadsA )
-              else:
-                universeNumLoadsParaA.append( 1 )
-            # print "  optionsA = " + str(universeNumLoadsParaA)
+  ##############################################################################
+  # getLoadGrid
+  # - (totalNumLoadsA, totalNumLoadsB) of a tile
+  ##############################################################################
+  def getLoadGrid( self, tile ):
+    (unroll, workGroup, microTile) = tile
+    totalNumLoadsA = max(1, (workGroup[0]*microTile[0]*unroll[0])/(workGroup[0]*workGroup[1]) )
+    totalNumLoadsB = max(1, (workGroup[1]*microTile[1]*unroll[0])/(workGroup[0]*workGroup[1]) )
+    return (totalNumLoadsA, totalNumLoadsB)
+
+  # search spaces too large to hold; getSolutionCandidatesForProblem only
+  # counts them
+  def isFullyExhaustive( self ):
+    return self.modeWorkGroups == self.modeExhaustive \
+        and self.modeMicroTiles == self.modeExhaustive \
+        and self.modeUnrolls == self.modeExhaustive \
+        and self.modeLoads == self.modeExhaustive \
+        and self.modePreprocessorDefinitions == self.modeExhaustive
+
+  ##############################################################################
+  # countSolutionCandidates
+  # - number of candidates with every load and preprocessor definition
+  #   option, without making them
+  ##############################################################################
+  def countSolutionCandidates( self, searchSpace ):
+    numCandidates = 0
+    for tile in self.getTiles(searchSpace):
+      (totalNumLoadsA, totalNumLoadsB) = self.getLoadGrid( tile )
+      numCandidates += totalNumLoadsA*totalNumLoadsB \
+          *len(searchSpace.universePreprocessorDefinitions)*2
+    return numCandidates
+
+  # at most this many kernels for countSolutionCandidates' candidates; of
+  # each pair, the multiple-kernel solution has 4 and the branched one 1
+  def countSolutionCandidateKernels( self, searchSpace ):
+    return self.countSolutionCandidates(searchSpace)/2*5
+
+  ##############################################################################
+  # generateSolutionCandidates
+  # - yields (key, solution) for the tiles in order; key is the parameters
+  #   the solution was made from, so equal keys mean equal solutions
+  # - the search space's kernel is the template candidates are cloned from,
+  #   so one search space serves one generator at a time
+  ##############################################################################
+  def generateSolutionCandidates( self, searchSpace, tiles ):
+    kernel = searchSpace.kernel
+    transA = searchSpace.transA
+    transB = searchSpace.transB
+    problemSizeDim0 = searchSpace.problemSizeDim0
+    problemSizeDim1 = searchSpace.problemSizeDim1
+    universePreprocessorDefinitions = \
+        searchSpace.universePreprocessorDefinitions
+    kernelGrid = searchSpace.kernelGrid
+
+    ###################################
+    # for tiles
+    for tile in tiles:
+      (unroll, workGroup, microTile) = tile
+      kernel.unrolls = tuple(unroll)
+      kernel.tile.workGroup = tuple(workGroup)
+      kernel.tile.microTile = tuple(microTile)
+      macroTileDim0 = workGroup[0] * microTile[0]
+      macroTileDim1 = workGroup[1] * microTile[1]
+
+      # load grid
+      (totalNumLoadsA, totalNumLoadsB) = self.getLoadGrid( tile )
+      kernel.totalLoadSizeParaA = macroTileDim0 if kernel.unrollDimStrideGreaterThanTileDimStrideA else unroll[0]
+      kernel.totalLoadSizePerpA = unroll[0] if kernel.unrollDimStrideGreaterThanTileDimStrideA else macroTileDim0
+      kernel.totalLoadSizeParaB = macroTileDim1 if not kernel.unrollDimStrideLessThanTileDimStrideB else unroll[0]
+      kernel.totalLoadSizePerpB = unroll[0] if not kernel.unrollDimStrideLessThanTileDimStrideB else macroTileDim1
+
+      # num loads parallel A
+      universeNumLoadsParaA = []
+      if self.modeLoads == self.modeExhaustive:
+        for i in range(1, totalNumLoadsA+1):
+          universeNumLoadsParaA.append(i)
+      elif self.modeLoads == self.modeThorough:
+          universeNumLoadsParaA.append( totalNumLoadsA )
+          universeNumLoadsParaA.append( 1 )
+      else:
+        if not transA:
+          universeNumLoadsParaA.append( totalNumLoadsA )
+        else:
+          universeNumLoadsParaA.append( 1 )
+      # print "  optionsA = " + str(universeNumLoadsParaA)
             
-            # num loads parallel B
-            universeNumLoadsParaB = []
-            if self.modeLoads == self.modeExhaustive:
-              for i in range(1, totalNumLoadsB+1):
-                universeNumLoadsParaB.append(i)
-            elif self.modeLoads == self.modeThorough:
-                universeNumLoadsParaB.append( totalNumLoadsB )
-                universeNumLoadsParaB.append( 1 )
-            else:
-              if transB:
-                universeNumLoadsParaB.append( totalNumLoadsB )
-              else:
-                universeNumLoadsParaB.append( 1 )
-            # print "    optionsB = " + str(universeNumLoadsParaB)
+      # num loads parallel B
+      universeNumLoadsParaB = []
+      if self.modeLoads == self.modeExhaustive:
+        for i in range(1, totalNumLoadsB+1):
+          universeNumLoadsParaB.append(i)
+      elif self.modeLoads == self.modeThorough:
+          universeNumLoadsParaB.append( totalNumLoadsB )
+          universeNumLoadsParaB.append( 1 )
+      else:
+        if transB:
+          universeNumLoadsParaB.append( totalNumLoadsB )
+        else:
+          universeNumLoadsParaB.append( 1 )
+      # print "    optionsB = " + str(universeNumLoadsParaB)
             
-            ###################################
-            # for num loads parallel A
-            for numLoadsParaA in universeNumLoadsParaA:
-              kernel.numLoadsParaA = numLoadsParaA
-              kernel.loadSizeParaA = int(math.ceil(1.0*kernel.totalLoadSizeParaA / kernel.numLoadsParaA ) ) # round up
-              kernel.loadSizePerpA = int( (workGroup[0]*workGroup[1])/kernel.loadSizeParaA ) # round down
-              if kernel.loadSizePerpA < 1:
-                kernel.loadSizePerpA = 1
-              if kernel.loadSizePerpA > kernel.totalLoadSizePerpA:
-                kernel.loadSizePerpA = kernel.totalLoadSizePerpA
-              kernel.numLoadsPerpA = int(math.ceil(1.0*kernel.totalLoadSizePerpA / kernel.loadSizePerpA )) # round up
-              # print "  A: nl=%.1fx%.1f ls=%.1fx%.1f" % (kernel.numLoadsParaA, kernel.numLoadsPerpA, kernel.loadSizeParaA, kernel.loadSizePerpA)
+      ###################################
+      # for num loads parallel A
+      for numLoadsParaA in universeNumLoadsParaA:
+        kernel.numLoadsParaA = numLoadsParaA
+        kernel.loadSizeParaA = int(math.ceil(1.0*kernel.totalLoadSizeParaA / kernel.numLoadsParaA ) ) # round up
+        kernel.loadSizePerpA = int( (workGroup[0]*workGroup[1])/kernel.loadSizeParaA ) # round down
+        if kernel.loadSizePerpA < 1:
+          kernel.loadSizePerpA = 1
+        if kernel.loadSizePerpA > kernel.totalLoadSizePerpA:
+          kernel.loadSizePerpA = kernel.totalLoadSizePerpA
+        kernel.numLoadsPerpA = int(math.ceil(1.0*kernel.totalLoadSizePerpA / kernel.loadSizePerpA )) # round up
+        # print "  A: nl=%.1fx%.1f ls=%.1fx%.1f" % (kernel.numLoadsParaA, kernel.numLoadsPerpA, kernel.loadSizeParaA, kernel.loadSizePerpA)
               
-              ###################################
-              # for num loads parallel B
-              for numLoadsParaB in universeNumLoadsParaB:
-                # if False: # true means only try perfect tiles w/o branches
-                #   if totalNumLoadsB % numLoadsParaB > 0:
-                #     continue
-                #   if totalLoadSizeParaB%numLoadsParaB>0:
-                #     continue
-                #   if (workGroup[0]*workGroup[1])%(totalLoadSizeParaB/numLoadsParaB) > 0:
-                #     continue
-                kernel.numLoadsParaB = numLoadsParaB
-                kernel.loadSizeParaB = int(math.ceil(1.0*kernel.totalLoadSizeParaB / kernel.numLoadsParaB )) # round up
-                kernel.loadSizePerpB = int((workGroup[0]*workGroup[1])/kernel.loadSizeParaB) # round down
-                if kernel.loadSizePerpB < 1:
-                  kernel.loadSizePerpB = 1
-                if kernel.loadSizePerpB > kernel.totalLoadSizePerpB:
-                  kernel.loadSizePerpB = kernel.totalLoadSizePerpB
-                kernel.numLoadsPerpB = int(math.ceil(1.0*kernel.totalLoadSizePerpB / kernel.loadSizePerpB)) # round up
-                # print "    B: nl=%.1fx%.1f ls=%.1fx%.1f" % (kernel.numLoadsParaB, kernel.numLoadsPerpB, kernel.loadSizeParaB, kernel.loadSizePerpB)
+        ###################################
+        # for num loads parallel B
+        for numLoadsParaB in universeNumLoadsParaB:
+          # if False: # true means only try perfect tiles w/o branches
+          #   if totalNumLoadsB % numLoadsParaB > 0:
+          #     continue
+          #   if totalLoadSizeParaB%numLoadsParaB>0:
+          #     continue
+          #   if (workGroup[0]*workGroup[1])%(totalLoadSizeParaB/numLoadsParaB) > 0:
+          #     continue
+          kernel.numLoadsParaB = numLoadsParaB
+          kernel.loadSizeParaB = int(math.ceil(1.0*kernel.totalLoadSizeParaB / kernel.numLoadsParaB )) # round up
+          kernel.loadSizePerpB = int((workGroup[0]*workGroup[1])/kernel.loadSizeParaB) # round down
+          if kernel.loadSizePerpB < 1:
+            kernel.loadSizePerpB = 1
+          if kernel.loadSizePerpB > kernel.totalLoadSizePerpB:
+            kernel.loadSizePerpB = kernel.totalLoadSizePerpB
+          kernel.numLoadsPerpB = int(math.ceil(1.0*kernel.totalLoadSizePerpB / kernel.loadSizePerpB)) # round up
+          # print "    B: nl=%.1fx%.1f ls=%.1fx%.1f" % (kernel.numLoadsParaB, kernel.numLoadsPerpB, kernel.loadSizeParaB, kernel.loadSizePerpB)
 
                   
-                ###################################
-                # for preprocessor definitions
-                for ppdOptimization in universePreprocessorDefinitions:
-                  ppdLeadingStrides = ppdOptimization[0]
-                  ppdOffsets       = ppdOptimization[1]
-                  ppdAll           = ppdOptimization[2]
+          ###################################
+          # for preprocessor definitions
+          for ppdOptimization in universePreprocessorDefinitions:
+            ppdLeadingStrides = ppdOptimization[0]
+            ppdOffsets       = ppdOptimization[1]
+            ppdAll           = ppdOptimization[2]
                     
-                  ###################################
-                  # for branch types
-                  branchTypes = [ Structs.BranchType(1), Structs.BranchType(2) ]
-                  for branchType in branchTypes:
-                    solution.kernelGrid = copy.deepcopy(kernelGrid)
-                    solution.kernels = []
-                    # skip if undesired
-                    if branchType.isMultiple():
-                      if self.noBranches or self.noMultipleKernels:
-                        if problemSizeDim0 % macroTileDim0 != 0 \
-                            or problemSizeDim1 % macroTileDim1 != 0:
-                          continue
-
-                      solution.branch = [branchType, branchType]
-                      solution.ppdLeadingStrides = ppdLeadingStrides
-                      kernel.ppdLeadingStrides = ppdLeadingStrides
-                      solution.ppdOffsets = ppdOffsets # kernel 0 need offsets?
-                      solution.ppdAll = 0 # kernels 1-3 will need sizes
-                      # add main kernel
-                      kernel.tile.branch = [Structs.BranchType(0), Structs.BranchType(0)]
-                      kernel.ppdOffsets = ppdOffsets
-                      kernel.ppdAll = ppdAll
-                      solution.kernels.append( copy.deepcopy(kernel) )
-                      # add edge-0 kernel
-                      solution.kernelGrid[0] += 1
-                      kernel.tile.branch = [ branchType, Structs.BranchType(0) ]
-                      kernel.ppdOffsets = 0
-                      kernel.ppdAll = 0
-                      solution.kernels.append( copy.deepcopy(kernel) )
-                      # add edge-1 kernel
-                      solution.kernelGrid[1] += 1
-                      kernel.tile.branch = [ Structs.BranchType(0), branchType ]
-                      kernel.ppdOffsets = 0
-                      kernel.ppdAll = 0
-                      solution.kernels.append( copy.deepcopy(kernel) )
-                      # add corner-01 kernel
-                      kernel.tile.branch = [ branchType, branchType ]
-                      kernel.ppdOffsets = 0
-                      kernel.ppdAll = 0
-                      solution.kernels.append( copy.deepcopy(kernel) )
-
-                    # branch - 1 branched kernel
-                    elif branchType.isBranched():
-                      if problemSizeDim0 % macroTileDim0 == 0 \
-                          and problemSizeDim1 % macroTileDim1 == 0:
-                        continue
-                      if kernelGrid[0] > 1 or kernelGrid[1] > 1 or kernelGrid[2] > 1: # don't use b kernels for 4096 cases b/c already not using single kernel
-                        continue
-                      if self.noBranches:
-                        continue
-                      solution.branch = [branchType, branchType]
-                      solution.ppdLeadingStrides = ppdLeadingStrides
-                      solution.ppdOffsets = ppdOffsets
-                      solution.ppdAll = ppdAll
-                      kernel.tile.branch = [branchType, branchType ]
-                      kernel.ppdLeadingStrides = ppdLeadingStrides
-                      kernel.ppdOffsets = ppdOffsets
-                      kernel.ppdAll = ppdAll
-                      solution.kernels.append( copy.deepcopy(kernel) )
-                      solution.kernels.append( None )
-                      solution.kernels.append( None )
-                      solution.kernels.append( None )
-
-                    # branch - unknown
-                    else:
-                      print "ERROR - unrecognized branchType"
-
-                    # kernels, grid, and branching specified, now add solution
-                    # print solution
-                    # print "  " + self.solutionWriter.getName(solution)
-                    solutionCandidates.add( copy.deepcopy(solution) )
-    if fullyExhaustive:
-      print "NumCandidates: " + str(numCandidates)
-    return solutionCandidates
+            ###################################
+            # for branch types
+            branchTypes = [ Structs.BranchType.get(1), Structs.BranchType.get(2) ]
+            for branchType in branchTypes:
+              # skip if undesired
+              if branchType.isMultiple():
+                if self.noBranches or self.noMultipleKernels:
+                  if problemSizeDim0 % macroTileDim0 != 0 \
+                      or problemSizeDim1 % macroTileDim1 != 0:
+                    continue
+
+                # main, edge-0, edge-1 and corner-01 kernels; the edge
+                # kernels add to the kernel grid
+                noBranch = Structs.BranchType.get(0)
+                kernels = ( \
+                    cloneCandidateKernel( kernel, (noBranch, noBranch), \
+                      ppdLeadingStrides, ppdOffsets, ppdAll ), \
+                    cloneCandidateKernel( kernel, (branchType, noBranch), \
+                      ppdLeadingStrides, 0, 0 ), \
+                    cloneCandidateKernel( kernel, (noBranch, branchType), \
+                      ppdLeadingStrides, 0, 0 ), \
+                    cloneCandidateKernel( kernel, (branchType, branchType), \
+                      ppdLeadingStrides, 0, 0 ) )
+                # kernel 0 need offsets?; kernels 1-3 will need sizes
+                solution = makeCandidateSolution( \
+                    ( kernelGrid[0]+1, kernelGrid[1]+1, kernelGrid[2] ), \
+                    branchType, kernels, ppdLeadingStrides, ppdOffsets, 0 )
+
+              # branch - 1 branched kernel
+              elif branchType.isBranched():
+                if problemSizeDim0 % macroTileDim0 == 0 \
+                    and problemSizeDim1 % macroTileDim1 == 0:
+                  continue
+                if kernelGrid[0] > 1 or kernelGrid[1] > 1 or kernelGrid[2] > 1: # don't use b kernels for 4096 cases b/c already not using single kernel
+                  continue
+                if self.noBranches:
+                  continue
+                kernels = ( \
+                    cloneCandidateKernel( kernel, (branchType, branchType), \
+                      ppdLeadingStrides, ppdOffsets, ppdAll ), \
+                    None, None, None )
+                solution = makeCandidateSolution( tuple(kernelGrid), \
+                    branchType, kernels, ppdLeadingStrides, ppdOffsets, ppdAll )
+
+              # branch - unknown
+              else:
+                print "ERROR - unrecognized branchType"
+                continue
+
+              # kernels, grid, and branching specified, now add solution
+              # print solution
+              # print "  " + self.solutionWriter.getName(solution)
+              key = ( tuple(unroll), tuple(workGroup), tuple(microTile), \
+                  numLoadsParaA, numLoadsParaB, tuple(ppdOptimization), \
+                  branchType.value )
+              yield (key, solution)
+
+  ##############################################################################
+  # attachProblem
+  # - clones of cached candidates whose kernels belong to the problem of
+  #   kernel, i.e., use its problem, unroll size and unroll strides
+  ##############################################################################
+  def attachProblem( self, solutionCandidates, kernel ):
+    setSlot = Structs.setSlot
+    attachedCandidates = set()
+    for solution in solutionCandidates:
+      solution = solution.clone()
+      for candidateKernel in solution.kernels:
+        if candidateKernel is not None:
+          setSlot(candidateKernel, "problem", kernel.problem)
+          setSlot(candidateKernel, "unrollDimSize", kernel.unrollDimSize)
+          setSlot(candidateKernel, "unrollDimStride0", kernel.unrollDimStride0)
+          setSlot(candidateKernel, "unrollDimStride1", kernel.unrollDimStride1)
+      attachedCandidates.add( solution )
+    return attachedCandidates
+
+  ##############################################################################
+  # getTileUniverse
+  # - every work-group paired with the micro-tiles which pass all the tile
+  #   filters that don't depend on the unroll, so they're evaluated once per
+  #   problem rather than once per unroll; filters on a single axis prune
+  #   that axis before the work-group x micro-tile product is formed
+  # - memoized; returns (key, tileUniverse, macroTileDims0, macroTileDims1)
+  #   where macroTileDims are the distinct macro-tile sizes it contains
+  ##############################################################################
+  def getTileUniverse( self, kernel, universeWorkGroups, microTileMin, \
+      microTileMax, macroTileRatio ):
+    key = ( \
+        kernel.dataTypeC, \
+        kernel.dataTypeA, \
+        kernel.dataTypeB, \
+        tuple( tuple(workGroup) for workGroup in universeWorkGroups ), \
+        microTileMin, \
+        microTileMax, \
+        macroTileRatio )
+    if key in self.tileUniverseCache:
+      return self.tileUniverseCache[key]
+
+    exactRatios = [1, 2, 4, 8]
+    def isExactRatio( a, b ):
+      return 1.0*a/b in exactRatios or 1.0*b/a in exactRatios
+
+    # micro-tile axis
+    microTileDims = range(microTileMin, microTileMax+1, self.microTileIncr)
+    universeMicroTiles = [ [ microTileDim0, microTileDim1 ] \
+        for microTileDim0 in microTileDims \
+        for microTileDim1 in microTileDims ]
+    if self.ratioMacroTileExact:
+      universeMicroTiles = [ microTile for microTile in universeMicroTiles \
+          if isExactRatio(microTile[0], microTile[1]) ]
+    # registers per work-item
+    universeMicroTileRegisters = [ getTileNumRegisters(kernel, microTile) \
+        for microTile in universeMicroTiles ]
+
+    tileUniverse = []
+    for workGroup in universeWorkGroups:
+      microTiles = []
+      # work-group axis
+      if not self.ratioMacroTileExact \
+          or isExactRatio(workGroup[0], workGroup[1]):
+        numWorkItems = workGroup[0] * workGroup[1]
+        for microTile, numRegisters in zip(universeMicroTiles, \
+            universeMicroTileRegisters):
+
+          # macro-tile not too skinny
+          macroTileDim0 = workGroup[0] * microTile[0]
+          macroTileDim1 = workGroup[1] * microTile[1]
+          if float(macroTileDim1)/macroTileDim0 > macroTileRatio \
+              or float(macroTileDim0)/macroTileDim1 > macroTileRatio:
+            continue
+
+          if self.modeMicroTiles == self.modeFast: # don't accept small work-groups with large micro-tiles; pruning options
+            if microTile[0] > 0.5*workGroup[0] \
+                or microTile[1] > 0.5*workGroup[1]:
+              continue
+
+          if self.ratioMacroTileExact \
+              and not isExactRatio(macroTileDim0, macroTileDim1):
+            continue
+
+          # macro-tile not too large
+          if numWorkItems * numRegisters > self.maxRegisters:
+            continue
+
+          microTiles.append( microTile )
+      tileUniverse.append( (workGroup, microTiles) )
+
+    macroTileDims0 = set()
+    macroTileDims1 = set()
+    for workGroup, microTiles in tileUniverse:
+      for microTile in microTiles:
+        macroTileDims0.add( workGroup[0] * microTile[0] )
+        macroTileDims1.add( workGroup[1] * microTile[1] )
+    result = (key, tileUniverse, sorted(macroTileDims0), sorted(macroTileDims1))
+    self.tileUniverseCache[key] = result
+    return result
+
+
+################################################################################
+# Search Space
+# - what getSearchSpace works out for a problem: the kernel every candidate
+#   is cloned from, the sizes and transposes candidates depend on, and the
+#   unroll, tile and preprocessor definition universes
+# - signature identifies the candidates; problems with equal signatures have
+#   equal candidates
+################################################################################
+class SearchSpace(object):
+  __slots__ = [ "kernel", "transA", "transB", "problemSizeDim0", \
+      "problemSizeDim1", "universeUnrolls", "tileUniverse", \
+      "universePreprocessorDefinitions", "kernelGrid", "signature" ]
+
+
+################################################################################
+# Candidate Kernels and Solutions
+# - what generateSolutionCandidates yields: a clone of the search space's
+#   kernel with the branch and preprocessor definitions of its place in the
+#   solution, and a solution of such kernels; new objects, so they're set
+#   with Structs.setSlot
+################################################################################
+def cloneCandidateKernel( kernel, branch, ppdLeadingStrides, ppdOffsets, \
+    ppdAll ):
+  candidateKernel = kernel.clone()
+  Structs.setSlot(candidateKernel.tile, "branch", branch)
+  Structs.setSlot(candidateKernel, "ppdLeadingStrides", ppdLeadingStrides)
+  Structs.setSlot(candidateKernel, "ppdOffsets", ppdOffsets)
+  Structs.setSlot(candidateKernel, "ppdAll", ppdAll)
+  return candidateKernel
+
+def makeCandidateSolution( kernelGrid, branchType, kernels, \
+    ppdLeadingStrides, ppdOffsets, ppdAll ):
+  solution = Structs.Solution.__new__(Structs.Solution)
+  Structs.setSlot(solution, "kernelGrid", kernelGrid)
+  Structs.setSlot(solution, "branch", (branchType, branchType))
+  Structs.setSlot(solution, "kernels", kernels)
+  Structs.setSlot(solution, "ppdLeadingStrides", ppdLeadingStrides)
+  Structs.setSlot(solution, "ppdOffsets", ppdOffsets)
+  Structs.setSlot(solution, "ppdAll", ppdAll)
+  return solution
+
+
+################################################################################
+# Tile Resources
+# - registers per work-item and local memory bytes per work-group of a tile,
+#   counted the way the generator's hardware limits count them
+################################################################################
+def getTileNumRegisters( kernel, microTile ):
+  return microTile[0] * microTile[1] * kernel.dataTypeC.numRegisters() \
+      + microTile[0] * kernel.dataTypeA.numRegisters() \
+      + microTile[1] * kernel.dataTypeB.numRegisters()
+
+def getTileLocalMemoryBytes( kernel, unroll, workGroup, microTile, \
+    localMemPad=SolutionCandidateGenerator.localMemPad ):
+  if kernel.tensorAssignedDim0 == 0: # dim0 in tensorA
+    numBytesDim0 = kernel.dataTypeA.numBytes()
+    numBytesDim1 = kernel.dataTypeB.numBytes()
+  else: # dim1 in tensorA
+    numBytesDim0 = kernel.dataTypeB.numBytes()
+    numBytesDim1 = kernel.dataTypeA.numBytes()
+  return unroll[0] * ( \
+      (workGroup[0]*microTile[0]+localMemPad)*numBytesDim0 \
+      + (workGroup[1]*microTile[1]+localMemPad)*numBytesDim1 )
+
+
+################################################################################
+# Index Assignments
+# - what makeIndexAssignments gives a kernel; shared by all kernels of
+#   problems with the same IndexAssignments key, so must not be edited
+################################################################################
+class IndexAssignments(object):
+  __slots__ = [ "indexOrderC", "indexOrderSummation", "indexAssignmentDim0", \
+      "indexAssignmentDim1", "tensorAssignedDim0", "tensorAssignedDim1", \
+      "indexAssignmentTileA", "indexAssignmentTileB", "indexUnroll", \
+      "unrollIndexA", "unrollIndexB", \
+      "unrollDimStrideGreaterThanTileDimStrideA", \
+      "unrollDimStrideLessThanTileDimStrideB" ]
+
+
+################################################################################
+# Get Index Assignments Key
+# - makeIndexAssignments only compares strides (and sums of two strides) to
+#   each other, so it gives the same assignments to problems whose operation
+#   index assignments match and whose compared values are in the same order
+# - key is the operation plus the rank of every value it could compare; ties
+#   share a rank, since sorts are stable and comparisons are strict
+################################################################################
+def getIndexAssignmentsKey(problem):
+  indexAssignmentsA = problem.operation.indexAssignmentsA
+  indexAssignmentsB = problem.operation.indexAssignmentsB
+  stridesA = [ dimension.stride for dimension in problem.tensorA.dimensions ]
+  stridesB = [ dimension.stride for dimension in problem.tensorB.dimensions ]
+  stridesC = [ dimension.stride for dimension in problem.tensorC.dimensions ]
+  numIndicesA = len(indexAssignmentsA)
+  numIndicesC = problem.operation.numIndicesFree \
+      + problem.operation.numIndicesBatch
+  # last position of each index, as makeIndexAssignments finds them
+  positionA = dict( (index, j) for j, index in enumerate(indexAssignmentsA) )
+  positionB = dict( (index, j) for j, index \
+      in enumerate(indexAssignmentsB[:numIndicesA]) )
+  values = [ 0 ] + stridesA + stridesB + stridesC
+  for i in range(0, numIndicesC):
+    if i in positionA and i in positionB: # batched
+      values.append( stridesA[positionA[i]] + stridesB[positionB[i]] )
+  positionB = dict( (index, j) for j, index in enumerate(indexAssignmentsB) )
+  for i in range(0, problem.operation.numIndicesSummation):
+    sumIndex = i + numIndicesC
+    values.append( stridesA[positionA.get(sumIndex, -1)] \
+        + stridesB[positionB.get(sumIndex, -1)] )
+  ranks = dict( (value, rank) for rank, value in enumerate(sorted(set(values))) )
+  return ( \
+      tuple(indexAssignmentsA), \
+      tuple(indexAssignmentsB), \
+      problem.operation.numIndicesFree, \
+      problem.operation.numIndicesBatch, \
+      problem.operation.numIndicesSummation, \
+      len(stridesC), \
+      tuple( ranks[value] for value in values ) )
+
+
+################################################################################
+# Get Index Assignments
+# - memoized; problems of one shape differing only in sizes share the result
+################################################################################
+indexAssignmentsCache = {}
+
+def getIndexAssignments(problem):
+  key = getIndexAssignmentsKey(problem)
+  indexAssignments = indexAssignmentsCache.get(key)
+  if indexAssignments is None:
+    indexAssignments = computeIndexAssignments(problem)
+    indexAssignmentsCache[key] = indexAssignments
+  return indexAssignments
 
 
 ################################################################################
 # Make Index Assignments
+# - applies the shared index assignments of problem to kernel, plus the
+#   unroll strides and size, which are the problem's own
+# - callers making many kernels of one problem may pass its
+#   getIndexAssignments(problem) to skip looking it up for each
+# - kernel is one being built, so it's set without the frozen check
+################################################################################
+def makeIndexAssignments(kernel, problem, indexAssignments=None):
+  if not kernelIndexAssignmentSetters:
+    kernelIndexAssignmentSetters.extend( Structs.getSlotSetters( \
+        Structs.Kernel, kernelIndexAssignmentNames ) )
+  for setter, value in itertools.izip(kernelIndexAssignmentSetters, \
+      getKernelIndexAssignments(problem, indexAssignments)):
+    setter(kernel, value)
+
+################################################################################
+# Kernel Index Assignments
+# - the values makeIndexAssignments gives the kernels of problem, in the
+#   order of kernelIndexAssignmentNames; the same for every kernel of
+#   problem, so callers making many kernels may keep them
+################################################################################
+kernelIndexAssignmentNames = [ "indexOrderC", "indexOrderSummation", \
+    "indexAssignmentDim0", "indexAssignmentDim1", "tensorAssignedDim0", \
+    "tensorAssignedDim1", "indexAssignmentTileA", "indexAssignmentTileB", \
+    "indexUnroll", "unrollDimStrideGreaterThanTileDimStrideA", \
+    "unrollDimStrideLessThanTileDimStrideB", "unrollDimSize", \
+    "unrollDimStride0", "unrollDimStride1" ]
+kernelIndexAssignmentSetters = [] # filled in once Structs has been imported
+
+def getKernelIndexAssignments(problem, indexAssignments=None):
+  if indexAssignments is None:
+    indexAssignments = getIndexAssignments(problem)
+  unrollDimStrideA = problem.tensorA.dimensions[indexAssignments.unrollIndexA].stride
+  unrollDimStrideB = problem.tensorB.dimensions[indexAssignments.unrollIndexB].stride
+  unrollDimSize = problem.tensorA.dimensions[indexAssignments.unrollIndexA].size
+  if indexAssignments.tensorAssignedDim0 == 0: # A assigned dim0
+    unrollDimStrides = ( unrollDimStrideA, unrollDimStrideB )
+  else:
+    unrollDimStrides = ( unrollDimStrideB, unrollDimStrideA )
+  return ( \
+      indexAssignments.indexOrderC, \
+      indexAssignments.indexOrderSummation, \
+      indexAssignments.indexAssignmentDim0, \
+      indexAssignments.indexAssignmentDim1, \
+      indexAssignments.tensorAssignedDim0, \
+      indexAssignments.tensorAssignedDim1, \
+      indexAssignments.indexAssignmentTileA, \
+      indexAssignments.indexAssignmentTileB, \
+      indexAssignments.indexUnroll, \
+      indexAssignments.unrollDimStrideGreaterThanTileDimStrideA, \
+      indexAssignments.unrollDimStrideLessThanTileDimStrideB, \
+      unrollDimSize ) + unrollDimStrides
+
+
+################################################################################
+# Compute Index Assignments
 # indicesSummation:
 #    largest stride -> shortest stride
 # indicesC:
@@ -595,7 +1041,10 @@ class SolutionCandidateGenerator:
 #    free largest stride (of A,B input tensor) -> shortest stride
 #    last two indices must belong to different A,B and are assigned d0,d1
 ################################################################################
-def makeIndexAssignments(kernel, problem):
+def computeIndexAssignments(problem):
+  indexAssignments = IndexAssignments()
+  indexAssignments.indexOrderC = []
+  indexAssignments.indexOrderSummation = []
   numIndicesC = problem.operation.numIndicesFree \
       + problem.operation.numIndicesBatch
   numIndicesA = len(problem.operation.indexAssignmentsA)
@@ -654,27 +1103,27 @@ def makeIndexAssignments(kernel, problem):
     indicesFreeSorted.insert(len(indicesFreeSorted)-1,tmp)
     #print indicesFreeSorted
 
-  kernel.indexAssignmentDim0 = indicesFreeSorted[len(indicesFreeSorted)-1][1]
-  kernel.tensorAssignedDim0 = indicesFreeSorted[len(indicesFreeSorted)-1][2]
-  kernel.indexAssignmentDim1 = indicesFreeSorted[len(indicesFreeSorted)-2][1]
-  kernel.tensorAssignedDim1 = indicesFreeSorted[len(indicesFreeSorted)-2][2]
+  indexAssignments.indexAssignmentDim0 = indicesFreeSorted[len(indicesFreeSorted)-1][1]
+  indexAssignments.tensorAssignedDim0 = indicesFreeSorted[len(indicesFreeSorted)-1][2]
+  indexAssignments.indexAssignmentDim1 = indicesFreeSorted[len(indicesFreeSorted)-2][1]
+  indexAssignments.tensorAssignedDim1 = indicesFreeSorted[len(indicesFreeSorted)-2][2]
 
-  if kernel.tensorAssignedDim0 == 0:
-    kernel.indexAssignmentTileA = [0, kernel.indexAssignmentDim0]
-    kernel.indexAssignmentTileB = [1, kernel.indexAssignmentDim1]
+  if indexAssignments.tensorAssignedDim0 == 0:
+    indexAssignments.indexAssignmentTileA = [0, indexAssignments.indexAssignmentDim0]
+    indexAssignments.indexAssignmentTileB = [1, indexAssignments.indexAssignmentDim1]
   else:
-    kernel.indexAssignmentTileA = [1, kernel.indexAssignmentDim1]
-    kernel.indexAssignmentTileB = [0, kernel.indexAssignmentDim0]
+    indexAssignments.indexAssignmentTileA = [1, indexAssignments.indexAssignmentDim1]
+    indexAssignments.indexAssignmentTileB = [0, indexAssignments.indexAssignmentDim0]
 
   strideD0 = indicesFreeSorted[len(indicesFreeSorted)-1][0]
   strideD1 = indicesFreeSorted[len(indicesFreeSorted)-2][0]
-  # print "d0=%u, d1=%u" % (kernel.indexAssignmentDim0, kernel.indexAssignmentDim1)
+  # print "d0=%u, d1=%u" % (indexAssignments.indexAssignmentDim0, indexAssignments.indexAssignmentDim1)
   # print "strideD0,1 = " + str(strideD0) + ", " + str(strideD1)
 
   for index in indicesBatchedSorted:
-    kernel.indexOrderC.append( index[1] )
+    indexAssignments.indexOrderC.append( index[1] )
   for index in indicesFreeSorted:
-    kernel.indexOrderC.append( index[1] )
+    indexAssignments.indexOrderC.append( index[1] )
 
   # summation indices in order of descending A-stride + B-stride
   indicesSummationUnsorted = []
@@ -694,52 +1143,46 @@ def makeIndexAssignments(kernel, problem):
   indicesSummationSorted = sorted( indicesSummationUnsorted, \
       key = lambda x: int(x[0]), reverse=True )
   for i in range(0,len(indicesSummationSorted)):
-    kernel.indexOrderSummation.append( indicesSummationSorted[i][1] )
+    indexAssignments.indexOrderSummation.append( indicesSummationSorted[i][1] )
+  # kernels hash these, so they're shared as tuples
+  indexAssignments.indexOrderC = tuple(indexAssignments.indexOrderC)
+  indexAssignments.indexOrderSummation = \
+      tuple(indexAssignments.indexOrderSummation)
 
 
   #unrollDimStride = indicesSummationSorted[len(indicesSummationSorted)-1][0]
-  unrollIndex = kernel.indexOrderSummation[len(kernel.indexOrderSummation)-1] + len(problem.tensorC.dimensions)
-  kernel.indexUnroll = unrollIndex
+  unrollIndex = indexAssignments.indexOrderSummation[len(indexAssignments.indexOrderSummation)-1] + len(problem.tensorC.dimensions)
+  indexAssignments.indexUnroll = unrollIndex
   unrollIndexA = problem.operation.indexAssignmentsA.index(unrollIndex)
   unrollIndexB = problem.operation.indexAssignmentsB.index(unrollIndex)
+  indexAssignments.unrollIndexA = unrollIndexA
+  indexAssignments.unrollIndexB = unrollIndexB
   # print "unrollIndex = " + str(unrollIndex)
   # print "indexAssignmentsA = " + str(problem.operation.indexAssignmentsA)
   # print "indexAssignmentsB = " + str(problem.operation.indexAssignmentsB)
   # print "unrollIndexA,B = " + str(unrollIndexA) + ", " + str(unrollIndexB)
   unrollDimStrideA = problem.tensorA.dimensions[unrollIndexA].stride
   unrollDimStrideB = problem.tensorB.dimensions[unrollIndexB].stride
-  kernel.unrollDimSize = problem.tensorA.dimensions[unrollIndexA].size
   # print "unrollStrideA,B = " + str(unrollDimStrideA) + ", " + str(unrollDimStrideB)
-  # print "tensorAssignedDim0 = " + ("A" if kernel.tensorAssignedDim0==0 else "B")
+  # print "tensorAssignedDim0 = " + ("A" if indexAssignments.tensorAssignedDim0==0 else "B")
   # print "strideD0 = " + str(strideD0)
   # print "strideD1 = " + str(strideD1)
 
-  #kernel.unrollDimStrideGreaterThanTileDimStride0 = \
+  #indexAssignments.unrollDimStrideGreaterThanTileDimStride0 = \
   #    indicesFreeSorted[len(indicesFreeSorted)-2][0] < unrollDimStride
-  #kernel.unrollDimStrideGreaterThanTileDimStride1 = \
+  #indexAssignments.unrollDimStrideGreaterThanTileDimStride1 = \
   #    indicesFreeSorted[len(indicesFreeSorted)-1][0] < unrollDimStride
-  if kernel.tensorAssignedDim0 == 0: # A assigned dim0
-    kernel.unrollDimStrideGreaterThanTileDimStrideA = \
+  if indexAssignments.tensorAssignedDim0 == 0: # A assigned dim0
+    indexAssignments.unrollDimStrideGreaterThanTileDimStrideA = \
       unrollDimStrideA > strideD0
-    kernel.unrollDimStrideLessThanTileDimStrideB = \
+    indexAssignments.unrollDimStrideLessThanTileDimStrideB = \
       unrollDimStrideB < strideD1
-    kernel.unrollDimStride0 = unrollDimStrideA
-    kernel.unrollDimStride1 = unrollDimStrideB
   else:
-    kernel.unrollDimStrideGreaterThanTileDimStrideA = \
+    indexAssignments.unrollDimStrideGreaterThanTileDimStrideA = \
       unrollDimStrideA > strideD1
-    kernel.unrollDimStrideLessThanTileDimStrideB = \
+    indexAssignments.unrollDimStrideLessThanTileDimStrideB = \
       unrollDimStrideB < strideD0
-    kernel.unrollDimStride0 = unrollDimStrideB
-    kernel.unrollDimStride1 = unrollDimStrideA
-
-  # print kernel name
-  backend = Structs.Backend()
-  backend.value = Structs.Backend.opencl12
-  kw = KernelWriter.KernelWriter(backend)
-  #print kw.getName(kernel)
-  #print "\n"
-
+  return indexAssignments
 
 
 ################################################################################
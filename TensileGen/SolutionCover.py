@@ -0,0 +1,181 @@
+################################################################################
+# Copyright (C) 2016 Advanced Micro Devices, Inc. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell cop-
+# ies of the Software, and to permit persons to whom the Software is furnished
+# to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IM-
+# PLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNE-
+# CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+################################################################################
+
+import heapq
+
+import PerformanceModel
+
+
+################################################################################
+# Solution Cover
+# - every unique solution of a benchmark is written, and compiled, as its
+#   own kernel and solution files, so a benchmark's build time grows with
+#   the number of unique solutions, not with the number of benchmarks run;
+#   getSolutionCover picks at most maxNumSolutions solutions for all
+#   problems together, and each problem then benchmarks those of its own
+#   candidates which were picked, whichever problem they were picked for
+# - a candidate's quality for a problem is the problem's fastest estimate
+#   (see PerformanceModel) over the candidate's, so 1 for the candidate the
+#   model ranks first
+# - problems first get one candidate each: the solution picked is the one
+#   whose qualities summed over problems without a candidate yet is largest,
+#   so solutions shared by many problems are preferred
+# - the rest of the budget goes where it helps most: a problem's value is
+#   the sum of the qualities of its picked candidates, best first, each
+#   weighted by qualityDecay times the one before, and the solution picked
+#   is the one which increases the summed value of all problems the most;
+#   a problem's second candidate so counts for a quarter of its quality, and
+#   is worth less than covering another problem well
+# - both steps are greedy, with gains only ever decreasing, so a solution's
+#   gain is only recomputed when it is the largest one left (lazy greedy)
+################################################################################
+qualityDecay = 0.25
+
+################################################################################
+# getSolutionQualities - [(problem, {solution: quality})], problems in a
+#   deterministic order, and the solutions in a deterministic order of first
+#   appearance, fastest first for each problem
+################################################################################
+def getSolutionQualities( problemTree, benchmarkList ):
+  problemQualities = []
+  orderedSolutions = []
+  seenSolutions = set()
+  for deviceProfile in sorted(problemTree.keys(), key=lambda dp: dp.libString()):
+    exactMatches = problemTree[deviceProfile]
+    for exactMatch in sorted(exactMatches.keys(), key=lambda em: em.libString()):
+      for problem in sorted(exactMatches[exactMatch], key=str):
+        rankedSolutions = [ (PerformanceModel.getSolutionTime(problem, solution), \
+            PerformanceModel.getSolutionKey(solution), solution) \
+            for solution in benchmarkList.get(problem, []) ]
+        rankedSolutions.sort( key=lambda entry: entry[:2] )
+        qualities = {}
+        if len(rankedSolutions) > 0:
+          bestTime = rankedSolutions[0][0]
+          for (time, key, solution) in rankedSolutions:
+            qualities[solution] = bestTime / time if time > 0 else 1.0
+            if solution not in seenSolutions:
+              seenSolutions.add( solution )
+              orderedSolutions.append( solution )
+        problemQualities.append( (problem, qualities) )
+  return (problemQualities, orderedSolutions)
+
+################################################################################
+# getCoverGain - summed qualities for problems without a candidate yet
+################################################################################
+def getCoverGain( solutionProblems, pickedQualities ):
+  gain = 0.0
+  for (problemIdx, quality) in solutionProblems:
+    if len(pickedQualities[problemIdx]) == 0:
+      gain += quality
+  return gain
+
+################################################################################
+# getValueGain - increase of the summed value of solutionProblems' problems
+#   if the solution is picked; a quality inserted at position i of a
+#   problem's qualities adds quality*d^i and moves the ones after it down by
+#   one position, scaling each by d
+################################################################################
+def getValueGain( solutionProblems, pickedQualities ):
+  gain = 0.0
+  for (problemIdx, quality) in solutionProblems:
+    qualities = pickedQualities[problemIdx]
+    position = 0
+    while position < len(qualities) and qualities[position] >= quality:
+      position += 1
+    weight = qualityDecay**position
+    gain += quality * weight
+    for i in range(position, len(qualities)):
+      gain -= (1-qualityDecay) * qualities[i] * weight
+      weight *= qualityDecay
+  return gain
+
+################################################################################
+# pickSolutions - lazy greedy; picks unpicked solutions with a positive gain
+#   while fewer than maxNumSolutions are picked
+################################################################################
+def pickSolutions( solutionProblems, picked, pickedQualities, getGain, \
+    maxNumSolutions ):
+  heap = []
+  for solutionIdx in range(0, len(solutionProblems)):
+    if not picked[solutionIdx]:
+      gain = getGain( solutionProblems[solutionIdx], pickedQualities )
+      if gain > 0:
+        heap.append( (-gain, solutionIdx) )
+  heapq.heapify( heap )
+  numPicked = sum( 1 for p in picked if p )
+  while len(heap) > 0 and numPicked < maxNumSolutions:
+    (negativeGain, solutionIdx) = heapq.heappop( heap )
+    gain = getGain( solutionProblems[solutionIdx], pickedQualities )
+    if gain <= 0:
+      continue
+    if len(heap) > 0 and gain < -heap[0][0]:
+      heapq.heappush( heap, (-gain, solutionIdx) )
+      continue
+    picked[solutionIdx] = True
+    numPicked += 1
+    for (problemIdx, quality) in solutionProblems[solutionIdx]:
+      pickedQualities[problemIdx].append( quality )
+      pickedQualities[problemIdx].sort( reverse=True )
+
+################################################################################
+# getSolutionCover - benchmarkList restricted to at most maxNumSolutions
+#   unique solutions, see Solution Cover
+################################################################################
+def getSolutionCover( problemTree, benchmarkList, maxNumSolutions ):
+  (problemQualities, orderedSolutions) = \
+      getSolutionQualities( problemTree, benchmarkList )
+  if len(orderedSolutions) <= maxNumSolutions:
+    return benchmarkList
+  solutionIndices = dict( (solution, i) for (i, solution) \
+      in enumerate(orderedSolutions) )
+  solutionProblems = [ [] for solution in orderedSolutions ]
+  for problemIdx in range(0, len(problemQualities)):
+    qualities = problemQualities[problemIdx][1]
+    for solution in qualities:
+      solutionProblems[solutionIndices[solution]].append( \
+          (problemIdx, qualities[solution]) )
+  for problems in solutionProblems:
+    problems.sort()
+
+  picked = [ False ] * len(orderedSolutions)
+  pickedQualities = [ [] for entry in problemQualities ]
+  pickSolutions( solutionProblems, picked, pickedQualities, getCoverGain, \
+      maxNumSolutions )
+  pickSolutions( solutionProblems, picked, pickedQualities, getValueGain, \
+      maxNumSolutions )
+
+  coveredList = {}
+  for (problem, qualities) in problemQualities:
+    coveredList[problem] = set( solution for solution in qualities \
+        if picked[solutionIndices[solution]] )
+  numProblems = sum( 1 for (problem, qualities) in problemQualities \
+      if len(qualities) > 0 )
+  numCovered = sum( 1 for qualities in pickedQualities if len(qualities) > 0 )
+  bestQualities = [ qualities[0] for qualities in pickedQualities \
+      if len(qualities) > 0 ]
+  print "SolutionCover: %u of %u solutions; %u of %u problems covered; best quality %.3f mean, %.3f min" \
+      % ( sum( 1 for p in picked if p ), len(orderedSolutions), numCovered, \
+      numProblems, sum(bestQualities)/max(1, len(bestQualities)), \
+      min(bestQualities) if len(bestQualities) > 0 else 0.0 )
+  if numCovered < numProblems:
+    print "SolutionCover: WARNING: %u problems have no candidate; raise the number of solutions" \
+        % ( numProblems - numCovered )
+  return coveredList
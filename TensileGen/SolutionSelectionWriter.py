@@ -21,9 +21,120 @@
 
 import Structs
 import SolutionWriter
-import copy
 import SolutionCandidateGenerator
 
+
+################################################################################
+# PSP Table
+# - columns of a list of [problem, solution, time] psps; row i is psps[i]
+# - problems and solutions get integer ids in order of first appearance so
+#   per-problem and per-solution values are computed once, not once per psp
+# - rows are lists of row indices, which select, sort and group take and give
+################################################################################
+class PSPTable:
+
+  def __init__(self, psps):
+    self.psps = psps
+    self.problems = []
+    self.solutions = []
+    self.problemId = []
+    self.solutionId = []
+    self.time = []
+    problemIds = {}
+    solutionIds = {}
+    for psp in psps:
+      problemId = problemIds.get(psp[0])
+      if problemId is None:
+        problemId = len(self.problems)
+        problemIds[psp[0]] = problemId
+        self.problems.append(psp[0])
+      solutionId = solutionIds.get(psp[1])
+      if solutionId is None:
+        solutionId = len(self.solutions)
+        solutionIds[psp[1]] = solutionId
+        self.solutions.append(psp[1])
+      self.problemId.append(problemId)
+      self.solutionId.append(solutionId)
+      self.time.append(psp[2])
+
+    # per problem; a solution's kernels share its problem's index assignments
+    problemSizeFree = [ problem.getSizeFree() for problem in self.problems ]
+    problemNumFlops = [ problem.getNumFlops() for problem in self.problems ]
+    problemSize01U = [ problem.getSize01U() for problem in self.problems ]
+
+    # per solution; from the tile attributes so the kernels of solutions read
+    # from logs needn't be built (FileReader.LazySolution)
+    solutionMacroTile0 = []
+    solutionMacroTile1 = []
+    solutionUnroll = []
+    solutionNumUnrolls = []
+    solutionBranch0 = []
+    solutionBranched = []
+    solutionMultiple0 = []
+    solutionMultiple1 = []
+    for solution in self.solutions:
+      (workGroup0, workGroup1, microTile0, microTile1, branch0, branch1, \
+          unrolls) = solution.getTileAttributes()
+      solutionMacroTile0.append( workGroup0*microTile0 )
+      solutionMacroTile1.append( workGroup1*microTile1 )
+      solutionUnroll.append( unrolls[len(unrolls)-1] )
+      solutionNumUnrolls.append( len(unrolls) )
+      solutionBranch0.append( solution.branch[0].value )
+      solutionBranched.append( solution.branch[0].isBranched() \
+          or solution.branch[1].isBranched() )
+      solutionMultiple0.append( solution.branch[0].isMultiple() )
+      solutionMultiple1.append( solution.branch[1].isMultiple() )
+
+    # per row
+    self.sizeFree = [ problemSizeFree[p] for p in self.problemId ]
+    self.gflops = [ (problemNumFlops[p]/1000000000.0) / (time/1000.0) \
+        for p, time in zip(self.problemId, self.time) ]
+    self.size0 = [ problemSize01U[p][0] for p in self.problemId ]
+    self.size1 = [ problemSize01U[p][1] for p in self.problemId ]
+    self.sizeU = [ problemSize01U[p][2] for p in self.problemId ]
+    self.macroTile0 = [ solutionMacroTile0[s] for s in self.solutionId ]
+    self.macroTile1 = [ solutionMacroTile1[s] for s in self.solutionId ]
+    self.unroll = [ solutionUnroll[s] for s in self.solutionId ]
+    self.numUnrolls = [ solutionNumUnrolls[s] for s in self.solutionId ]
+    self.branch0 = [ solutionBranch0[s] for s in self.solutionId ]
+    self.exactDim0 = [ size0 % macroTile0 == 0 \
+        for size0, macroTile0 in zip(self.size0, self.macroTile0) ]
+    self.exactDim1 = [ size1 % macroTile1 == 0 \
+        for size1, macroTile1 in zip(self.size1, self.macroTile1) ]
+    self.isExactTile = [ not solutionBranched[s] and e0 and e1 \
+        for s, e0, e1 in zip(self.solutionId, self.exactDim0, self.exactDim1) ]
+    self.isFallback = [ solutionBranched[s] \
+        or (solutionMultiple0[s] and not e0) \
+        or (solutionMultiple1[s] and not e1) \
+        for s, e0, e1 in zip(self.solutionId, self.exactDim0, self.exactDim1) ]
+
+  def getRows(self):
+    return range(0, len(self.psps))
+
+  # rows for which column is true
+  def select(self, rows, column):
+    return [ i for i in rows if column[i] ]
+
+  # rows sorted by column; stable, so ties keep their order
+  def sort(self, rows, column, reverse=False):
+    return sorted( rows, key=column.__getitem__, reverse=reverse )
+
+  # [ (key, rows) ] in order of first appearance of each key
+  def group(self, rows, column):
+    keys = []
+    groups = {}
+    for i in rows:
+      key = column[i]
+      if key not in groups:
+        groups[key] = []
+        keys.append(key)
+      groups[key].append(i)
+    return [ (key, groups[key]) for key in keys ]
+
+  def getPSPs(self, rows):
+    return [ self.psps[i] for i in rows ]
+
+
 class SolutionSelectionWriter:
 
   def __init__(self, psMap, backend):
@@ -33,6 +144,7 @@ class SolutionSelectionWriter:
     self.tolerance = 0.05
     self.kernelSet = set()
     self.solutionSet = set()
+    self.exactMatchSolutionSet = None # if set, also collects solutions used
     #self.scg = SolutionCandidateGenerator.SolutionCandidateGenerator(False, False) # dummy generator for getting indices 0, 1
     self.printLogic = False
     self.printStatus = False
@@ -54,12 +166,13 @@ class SolutionSelectionWriter:
     s = ""
     s += "#include \"Problem.h\"\n"
     s += "#include \"TensileGetSolution.h\"\n"
-    for deviceProfile, exactMatches in self.psMap.iteritems():
+    deviceProfiles = sorted(self.psMap.keys(), key=lambda dp: dp.libString())
+    for deviceProfile in deviceProfiles:
       s += "#include \"TensileGetSolution_" + deviceProfile.libString() + ".h\"\n"
     s += "\n"
     s += "Tensile::Solution* " + functionName + "( const Tensile::Problem & problem, TensileStatus *status ) {\n"
     # if match device
-    for deviceProfile, exactMatches in self.psMap.iteritems():
+    for deviceProfile in deviceProfiles:
       s += "  if ( problem.deviceProfile.numDevices() == " + str(len(deviceProfile.devices)) + " ) {\n"
       s += "    if ( problem.deviceProfile[0].matches(\"" + deviceProfile.devices[0].name + "\")"
       for i in range(1, len(deviceProfile.devices)):
@@ -69,7 +182,7 @@ class SolutionSelectionWriter:
       s += "    }\n"
       s += "  }\n"
     # else doesn't match any device
-    for deviceProfile, exactMatches in self.psMap.iteritems():
+    for deviceProfile in deviceProfiles:
       s += "  /* doesn't match any known device; return a default */\n"
       s += "  return getSolution_" + deviceProfile.libString() + "(problem, status);\n"
       break
@@ -81,7 +194,7 @@ class SolutionSelectionWriter:
     s += "void enumerateDeviceProfilesSupported( std::vector<TensileDeviceProfile> & enumeratedProfiles ) {\n"
     s += "  TensileDeviceProfile profile = tensileCreateEmptyDeviceProfile();\n"
     s += "  profile.numDevices = 1;\n"
-    for deviceProfile, exactMatches in self.psMap.iteritems():
+    for deviceProfile in deviceProfiles:
       for device in deviceProfile.devices:
         s += "#ifdef WIN32\n"
         s += "  sprintf_s(profile.devices[0].name, profile.devices[0].maxNameLength, \"%s\");\n" % device.name
@@ -121,14 +234,15 @@ class SolutionSelectionWriter:
     s = ""
     s += "#include \"Problem.h\"\n"
     s += "#include \"TensileGetSolution_" + deviceProfile.libString() + ".h\"\n"
-    for exactMatch, problems in exactMatches.iteritems():
+    exactMatchList = sorted(exactMatches.keys(), key=lambda em: em.libString())
+    for exactMatch in exactMatchList:
       s += "#include \"TensileGetSolution_" + exactMatch.libString() + ".h\"\n"
     s += "\n"
     s += "Tensile::Solution* " + functionName + "( const Tensile::Problem & problem, TensileStatus *status ) {\n"
     s += "  bool problemRequiresLeadingStrides = problem.tensorC[0].stride != 1 || problem.tensorA[0].stride != 1 || problem.tensorB[0].stride != 1;\n"
     s += "\n"
     
-    for exactMatch, problems in exactMatches.iteritems():
+    for exactMatch in exactMatchList:
       # if problem exactly matches EXACT_MATCH
       s += "  if ( problem.getDataTypeC() == " + exactMatch.typeC.getLibString() + "\n"
       s += "      && problem.getDataTypeA() == " + exactMatch.typeA.getLibString() + "\n"
@@ -177,52 +291,6 @@ class SolutionSelectionWriter:
     h += "\n"
     return (s, h)
   
-  # fallback problem/solution pair = "b" solution or "m" solution which launched multiple kernels
-  def isFallback(self, problem, solution):
-    #if solution.kernels[0].unrolls[len(solution.kernels[0].unrolls)-1] > 1:
-    #  return False
-    if solution.branch[0].isBranched() or solution.branch[1].isBranched():
-      return True
-    if solution.branch[0].isMultiple():
-      problemSize0 = problem.tensorC.dimensions[solution.kernels[0].indexAssignmentDim0].size
-      tileSize0 = solution.kernels[0].tile.workGroup[0] * solution.kernels[0].tile.microTile[0]
-      if problemSize0 % tileSize0 > 0:
-        return True
-    if solution.branch[1].isMultiple():
-      problemSize1 = problem.tensorC.dimensions[solution.kernels[0].indexAssignmentDim1].size
-      tileSize1 = solution.kernels[0].tile.workGroup[1] * solution.kernels[0].tile.microTile[1]
-      if problemSize1 % tileSize1 > 0:
-        return True
-    return False
-  
-  # single-kernel problem/solution pair = "b" solution or "m" solution which launched only one kernel
-  def isSingleton(self, problem, solution):
-    if solution.branch[0].isMultiple():
-      problemSize0 = problem.tensorC.dimensions[solution.kernels[0].indexAssignmentDim0].size
-      tileSize0 = solution.kernels[0].tile.workGroup[0] * solution.kernels[0].tile.microTile[0]
-      if problemSize0 % tileSize0 > 0:
-        return False
-    if solution.branch[1].isMultiple():
-      problemSize1 = problem.tensorC.dimensions[solution.kernels[0].indexAssignmentDim1].size
-      tileSize1 = solution.kernels[0].tile.workGroup[1] * solution.kernels[0].tile.microTile[1]
-      if problemSize1 % tileSize1 > 0:
-        return False
-    return True
-
-    # single-kernel problem/solution pair = "b" solution or "m" solution which launched only one kernel
-  def isExactTile(self, problem, solution):
-    if solution.branch[0].isBranched() or solution.branch[1].isBranched():
-      return False
-    problemSize0 = problem.tensorC.dimensions[solution.kernels[0].indexAssignmentDim0].size
-    tileSize0 = solution.kernels[0].tile.workGroup[0] * solution.kernels[0].tile.microTile[0]
-    if problemSize0 % tileSize0 > 0:
-      return False
-    problemSize1 = problem.tensorC.dimensions[solution.kernels[0].indexAssignmentDim1].size
-    tileSize1 = solution.kernels[0].tile.workGroup[1] * solution.kernels[0].tile.microTile[1]
-    if problemSize1 % tileSize1 > 0:
-      return False
-    return True
-  
   # size of free indices, i.e., how many threads
   # def getSize(self, problem):
   #   totalSize = 1
@@ -232,20 +300,7 @@ class SolutionSelectionWriter:
   #   return totalSize
 
   def getGFlops(self, problem, timeMS):
-    totalFlops = problem.getSizeFree()
-    if problem.tensorA.dataType.isReal():
-      totalFlops *= 2
-    else:
-      totalFlops *= 8
-    ## multiply summation indices
-    for i in range(0, len(problem.operation.indexAssignmentsA)):
-      index = problem.operation.indexAssignmentsA[i]
-      inC = index < len(problem.tensorC.dimensions)
-      inB = index in problem.operation.indexAssignmentsB
-      if inB and not inC: # is summation dimension
-        totalFlops *= problem.tensorA.dimensions[i].size
-        
-    gFlops = (totalFlops/1000000000.0) / (timeMS/1000.0)
+    gFlops = (problem.getNumFlops()/1000000000.0) / (timeMS/1000.0)
     return gFlops
         
   def getGFlopsString(self, problem, timeMS):
@@ -275,33 +330,6 @@ class SolutionSelectionWriter:
     return s
 
 
-  def getFallbacks(self, psps):
-    fallbacks = []
-    for i in range(0, len(psps)):
-      problem = psps[i][0]
-      solution = psps[i][1]
-      if self.isFallback(problem, solution):
-        fallbacks.append( psps[i] )
-    return fallbacks
-  
-  def getSingletons(self, psps):
-    singles = []
-    for i in range(0, len(psps)):
-      problem = psps[i][0]
-      solution = psps[i][1]
-      if self.isSingleton(problem, solution):
-        singles.append( psps[i] )
-    return singles
-
-  def getExactTiles(self, psps):
-    exacts = []
-    for i in range(0, len(psps)):
-      problem = psps[i][0]
-      solution = psps[i][1]
-      if self.isExactTile(problem, solution):
-        exacts.append( psps[i] )
-    return exacts
-
   def getIndexOfFastest( self, psps ):
     fastestIndex = 0
     fastestProblem = psps[fastestIndex][0]
@@ -329,25 +357,35 @@ class SolutionSelectionWriter:
     return largestIndex
 
 
+  # copy of (nested lists of) psps which may be edited; lists are copied
+  # but the problems and solutions in them are shared, so a solution which
+  # will be changed must be cloned first
+  def copyPSPs( self, psps, memo=None ):
+    if not isinstance(psps, list):
+      return psps
+    if memo is None:
+      memo = {}
+    if id(psps) not in memo:
+      memo[id(psps)] = [ self.copyPSPs(item, memo) for item in psps ]
+    return memo[id(psps)]
+
+  # copy of psp whose kernels use unroll 1
+  def getPSPU1( self, psp ):
+    solution = psp[1].clone()
+    for i in range(len(solution.kernels)):
+      if solution.kernels[i] != None:
+        solution.kernels[i].unrolls = ( 1, )
+    return [ psp[0], solution, psp[2] ]
+
+  # largest to smallest; stable, so equal sizes keep their order
   def sortSizePSPs( self, inputPSPs ):
-    # can't get this to work
-    # sorted(inputPSPs, key=lambda psp: psp[0].getSizeFree() )
-    # return inputPSPs
-
-    psps = inputPSPs # copy.deepcopy(inputPSPs)
-    s = []
-    while len(psps) > 0:
-      indexOfLargest = self.getIndexOfLargest(psps)
-      s.append( psps.pop(indexOfLargest) )
-    return s
+    return sorted( inputPSPs, key=lambda psp: psp[0].getSizeFree(), \
+        reverse=True )
 
+  # fastest to slowest; stable, so equal speeds keep their order
   def sortSpeedPSPs( self, inputPSPs ):
-    psps = inputPSPs # copy.deepcopy(inputPSPs)
-    s = []
-    while len(psps) > 0:
-      indexOfFastest = self.getIndexOfFastest(psps)
-      s.append( psps.pop(indexOfFastest) )
-    return s
+    return sorted( inputPSPs, key=lambda psp: self.getGFlops(psp[0], psp[2]), \
+        reverse=True )
 
   def getPSPsWithSize(self, psps, size ):
     s = []
@@ -402,21 +440,27 @@ class SolutionSelectionWriter:
     return 0
 
 
-  def getPSPsForSize( self, psps, sizeP):
+  # compareSize of each psp's problem to sizeP, comparing each problem once
+  def compareSizes( self, psps, sizeP ):
+    comparisons = {}
     s = []
-    for i in range(0, len(psps)):
-      psp = psps[i]
-      if self.compareSize(psp[0], sizeP) == 0:
-        s.append(psp)
+    for psp in psps:
+      comparison = comparisons.get(psp[0])
+      if comparison is None:
+        comparison = self.compareSize(psp[0], sizeP)
+        comparisons[psp[0]] = comparison
+      s.append(comparison)
     return s
 
+  def getPSPsForSize( self, psps, sizeP):
+    comparisons = self.compareSizes(psps, sizeP)
+    return [ psp for psp, comparison in zip(psps, comparisons) \
+        if comparison == 0 ]
+
   def getPSPsLargerOrEqual( self, psps, sizeP):
-    s = []
-    for i in range(0, len(psps)):
-      psp = psps[i]
-      if self.compareSize(psp[0], sizeP) >= 0:
-        s.append(psp)
-    return s
+    comparisons = self.compareSizes(psps, sizeP)
+    return [ psp for psp, comparison in zip(psps, comparisons) \
+        if comparison >= 0 ]
 
   # psp must be faster than fasterThan and not duplicate prior
   def getPSPsFasterThan(self, psps, fasterThan):
@@ -485,7 +529,17 @@ class SolutionSelectionWriter:
     return len(psps)
 
   def removePSPsLargerOrEqual(self, psps, sizeP ):
-    psps[:] = [ psp for psp in psps if self.compareSize(psp[0], sizeP) < 0 ]
+    comparisons = self.compareSizes(psps, sizeP)
+    psps[:] = [ psp for psp, comparison in zip(psps, comparisons) \
+        if comparison < 0 ]
+
+  # fastest psp of each problem, for the first 20 problems in psps
+  def getFastestPSPsPerProblem(self, psps):
+    table = PSPTable(psps)
+    fastestPSPs = []
+    for problemId, rows in table.group(table.getRows(), table.problemId)[0:20]:
+      fastestPSPs.append( psps[min(rows, key=table.time.__getitem__)] )
+    return fastestPSPs
 
 
   # return size (M,N,K) of size group
@@ -499,10 +553,12 @@ class SolutionSelectionWriter:
 
   # are the dims covered by s1 already covered by s0
   def coversSameDim01( self, s0, s1 ):
-    mt_s0_d0 = s0.kernels[0].tile.workGroup[0] * s0.kernels[0].tile.microTile[0]
-    mt_s0_d1 = s0.kernels[0].tile.workGroup[1] * s0.kernels[0].tile.microTile[1]
-    mt_s1_d0 = s1.kernels[0].tile.workGroup[0] * s1.kernels[0].tile.microTile[0]
-    mt_s1_d1 = s1.kernels[0].tile.workGroup[1] * s1.kernels[0].tile.microTile[1]
+    (wg_s0_d0, wg_s0_d1, ut_s0_d0, ut_s0_d1) = s0.getTileAttributes()[0:4]
+    (wg_s1_d0, wg_s1_d1, ut_s1_d0, ut_s1_d1) = s1.getTileAttributes()[0:4]
+    mt_s0_d0 = wg_s0_d0 * ut_s0_d0
+    mt_s0_d1 = wg_s0_d1 * ut_s0_d1
+    mt_s1_d0 = wg_s1_d0 * ut_s1_d0
+    mt_s1_d1 = wg_s1_d1 * ut_s1_d1
 
     if mt_s1_d0 % mt_s0_d0 > 0:
       return False
@@ -511,12 +567,16 @@ class SolutionSelectionWriter:
     return True
 
   def coversSameDim( self, s0, s1 ):
-    mt_s0_d0 = s0.kernels[0].tile.workGroup[0] * s0.kernels[0].tile.microTile[0]
-    mt_s0_d1 = s0.kernels[0].tile.workGroup[1] * s0.kernels[0].tile.microTile[1]
-    mt_s0_dU = s0.kernels[0].unrolls[len(s0.kernels[0].unrolls)-1]
-    mt_s1_d0 = s1.kernels[0].tile.workGroup[0] * s1.kernels[0].tile.microTile[0]
-    mt_s1_d1 = s1.kernels[0].tile.workGroup[1] * s1.kernels[0].tile.microTile[1]
-    mt_s1_dU = s1.kernels[0].unrolls[len(s1.kernels[0].unrolls)-1]
+    (wg_s0_d0, wg_s0_d1, ut_s0_d0, ut_s0_d1, b_s0_d0, b_s0_d1, u_s0) = \
+        s0.getTileAttributes()
+    (wg_s1_d0, wg_s1_d1, ut_s1_d0, ut_s1_d1, b_s1_d0, b_s1_d1, u_s1) = \
+        s1.getTileAttributes()
+    mt_s0_d0 = wg_s0_d0 * ut_s0_d0
+    mt_s0_d1 = wg_s0_d1 * ut_s0_d1
+    mt_s0_dU = u_s0[len(u_s0)-1]
+    mt_s1_d0 = wg_s1_d0 * ut_s1_d0
+    mt_s1_d1 = wg_s1_d1 * ut_s1_d1
+    mt_s1_dU = u_s1[len(u_s1)-1]
 
     if mt_s1_d0 % mt_s0_d0 > 0:
       return False
@@ -579,11 +639,11 @@ class SolutionSelectionWriter:
 
 
   def mergeRules(self, rule, inputNewRule):
-    newRule = copy.deepcopy(inputNewRule)
+    newRule = self.copyPSPs(inputNewRule)
     # already determined no conflicts
     # order only determined when multiple tiles show up in same problem size
-    ugs = copy.deepcopy(rule[0]) # unordered groups
-    nugs = copy.deepcopy(newRule[0]) # new unordered groups
+    ugs = self.copyPSPs(rule[0]) # unordered groups
+    nugs = self.copyPSPs(newRule[0]) # new unordered groups
     mugs = [] # merged unordered groups
 
     ugi = 0 # unordered group idx
@@ -683,6 +743,8 @@ class SolutionSelectionWriter:
     #startSolutionSetSize = len(self.solutionSet)
     #startKernelSetSize = len(self.kernelSet)
     self.solutionSet.add( psp[1] )
+    if self.exactMatchSolutionSet is not None:
+      self.exactMatchSolutionSet.add( psp[1] )
     for kernel in psp[1].kernels:
       if kernel != None:
         self.kernelSet.add( kernel )
@@ -796,7 +858,7 @@ class SolutionSelectionWriter:
         numFallbacks += len(sizeGroup[1])
       print "%s::writeGetSolution( %i, %i, %i)" % (str(exactMatch), numExactTiles, numFallbacks, len(inputExactPSPs))
 
-    rangePSPs = copy.deepcopy(inputRangePSPs)
+    rangePSPs = self.copyPSPs(inputRangePSPs)
     exactPSPs = self.sortSizePSPs(inputExactPSPs)
     
     localSolutionSet = set() # for solution header includes
@@ -841,10 +903,7 @@ class SolutionSelectionWriter:
           fastestFallbackGFlops = gflops
 
 
-      self.fallbackPSPU1 = copy.deepcopy(fastestFallbackPSP)
-      for i in range(len(self.fallbackPSPU1[1].kernels)):
-        if self.fallbackPSPU1[1].kernels[i] != None:
-          self.fallbackPSPU1[1].kernels[i].unrolls = [ 1 ]
+      self.fallbackPSPU1 = self.getPSPU1(fastestFallbackPSP)
       self.addPSPToSets(self.fallbackPSPU1)
       localSolutionSet.add(self.fallbackPSPU1[1])
 
@@ -856,38 +915,12 @@ class SolutionSelectionWriter:
       rule = [unorderedGroups, fastestFallbackPSP, None, exactPSPs[0][0]]
       #ruleString = self.ruleToString(rule)
       
-      exactPSPsInRange = exactPSPs
-      fastestExactPSPsInRange = []
       # for each unique problem, get only fastest
-      iterCnt = 0
-      while len(exactPSPsInRange) > 0:
-        iterCnt += 1
-        if iterCnt > 20:
-          break
-        problem = exactPSPsInRange[0][0]
-        fastestTime  = 1e9
-        fastestIndex = -1
-        slowPSPs = []
-
-        for i in range(0, len(exactPSPsInRange)):
-          psp = exactPSPsInRange[i]
-          if psp[0] == problem:
-            time = psp[2]
-            if time < fastestTime:
-              fastestTime = time
-              if fastestIndex >= 0:
-                slowPSPs.append(exactPSPsInRange[fastestIndex])
-              fastestIndex = i
-            else:
-              slowPSPs.append(psp)
-        fastestExactPSPsInRange.append(exactPSPsInRange[fastestIndex])
-        exactPSPsInRange.remove(exactPSPsInRange[fastestIndex])
-        for slowPSP in slowPSPs:
-          exactPSPsInRange.remove(slowPSP)
+      fastestExactPSPsInRange = self.getFastestPSPsPerProblem(exactPSPs)
       for psp in fastestExactPSPsInRange:
         localSolutionSet.add( psp[1] )
         self.addPSPToSets(psp)
-        fastestPSPs.add( tuple(copy.deepcopy(psp)) )
+        fastestPSPs.add( tuple(psp) )
 
       # self.addRuleToSets(rule)
       s += self.ruleToLibString(rule, firstSizeGroup, lastSizeGroup, fastestExactPSPsInRange, "  ")
@@ -913,10 +946,7 @@ class SolutionSelectionWriter:
                   fastestSizeGroupTypeIdxU1 = groupTypeIdx
           if fastestIdxU1 > -1:
             break
-      self.fallbackPSPU1 = copy.deepcopy(rangePSPs[fastestSizeGroupIdxU1][fastestSizeGroupTypeIdxU1][fastestIdxU1])
-      for i in range(len(self.fallbackPSPU1[1].kernels)):
-        if self.fallbackPSPU1[1].kernels[i] != None:
-          self.fallbackPSPU1[1].kernels[i].unrolls = [ 1 ]
+      self.fallbackPSPU1 = self.getPSPU1(rangePSPs[fastestSizeGroupIdxU1][fastestSizeGroupTypeIdxU1][fastestIdxU1])
       self.addPSPToSets(self.fallbackPSPU1)
       localSolutionSet.add(self.fallbackPSPU1[1])
 
@@ -924,7 +954,7 @@ class SolutionSelectionWriter:
       sizeGroupIdx = 0
       while sizeGroupIdx < len(rangePSPs):
         sizeGroup = rangePSPs[sizeGroupIdx]
-        fallbacksForLargestSize = sizeGroup[1] # self.getFallbacks(pspsForLargestSize)
+        fallbacksForLargestSize = sizeGroup[1]
         sizeGroupSize = self.getSizeGroupSize(sizeGroup)
         if self.printStatus: print "  RuleGroup[%u/%u] size=%u, len=%u, %u " % (sizeGroupIdx, len(rangePSPs), sizeGroupSize, len(sizeGroup[0]), len(sizeGroup[1]) )
 
@@ -952,7 +982,7 @@ class SolutionSelectionWriter:
         fallbackProblem = fallbackPSP[0]
         fallbackSolution = fallbackPSP[1]
         fallbackTime = fallbackPSP[2]
-        fastestPSPs.add( tuple(copy.deepcopy(fallbackPSP)) )
+        fastestPSPs.add( tuple(fallbackPSP) )
         fallbackGFlops = self.getGFlops(fallbackProblem, fallbackTime)
         size = fallbackProblem.getSizeFree()**0.5
         pspString = self.pspToString(fallbackPSP)
@@ -982,7 +1012,7 @@ class SolutionSelectionWriter:
               continue
             # original fallback solution benchmarked at current problem size
             fallbackForSize = fallbacksForSize[indexOfFallbackForSize]
-            fastestPSPs.add( tuple(copy.deepcopy(fallbackForSize)) )
+            fastestPSPs.add( tuple(fallbackForSize) )
             fallbackProblemForSize = fallbackForSize[0]
             fallbackSolutionForSize = fallbackForSize[1]
             fallbackTimeForSize = fallbackForSize[2]
@@ -990,7 +1020,7 @@ class SolutionSelectionWriter:
             # fastest fallback solution benchmarked at current problem size
             indexOfFastestFallbackForSize = self.getIndexOfFastest(fallbacksForSize)
             currentFastestFallback = fallbacksForSize[indexOfFastestFallbackForSize]
-            fastestPSPs.add( tuple(copy.deepcopy(currentFastestFallback)) )
+            fastestPSPs.add( tuple(currentFastestFallback) )
             currentFastestProblem = currentFastestFallback[0]
             currentFastestSolution = currentFastestFallback[1]
             currentFastestTime = currentFastestFallback[2]
@@ -1050,7 +1080,7 @@ class SolutionSelectionWriter:
           unorderedGroup = []
           unorderedGroup.append( psp )
           unorderedGroups.append( unorderedGroup )
-          fastestPSPs.add( tuple(copy.deepcopy(psp)) )
+          fastestPSPs.add( tuple(psp) )
         rule = [unorderedGroups, fallbackPSP, None, fallbackPSP[0]]
         ruleString = self.ruleToString(rule)
         if self.printLogic: print "RULE: " + ruleString
@@ -1081,7 +1111,7 @@ class SolutionSelectionWriter:
               unorderedGroup = []
               unorderedGroup.append( psp )
               unorderedGroups.append( unorderedGroup )
-              fastestPSPs.add( tuple(copy.deepcopy(psp)) )
+              fastestPSPs.add( tuple(psp) )
             newRule = [unorderedGroups, fallbackPSP, None, nextSizeGroupNewFallbackProblem ] # nextLargestSizeP
             newRuleString = self.ruleToString(newRule)
             if self.printLogic: print "NEXT RULE: " + newRuleString
@@ -1112,36 +1142,11 @@ class SolutionSelectionWriter:
         lastSizeGroup = nextSizeGroupIdx == len(rangePSPs) # self.getIndexOfNextLargestSize(rangePSPs, rule[3]) == len(rangePSPs)
         if self.printLogic and lastSizeGroup: print "last size group"
         exactPSPsInRange = self.getPSPsLargerOrEqual(exactPSPs, rule[3])
-        fastestExactPSPsInRange = []
         # for each unique problem, get only fastest
-        iterCnt = 0
-        while len(exactPSPsInRange) > 0:
-          iterCnt += 1
-          if iterCnt > 20:
-            break
-          problem = exactPSPsInRange[0][0]
-          fastestTime  = 1e9
-          fastestIndex = -1
-          slowPSPs = []
-
-          for i in range(0, len(exactPSPsInRange)):
-            psp = exactPSPsInRange[i]
-            if psp[0] == problem:
-              time = psp[2]
-              if time < fastestTime:
-                fastestTime = time
-                if fastestIndex >= 0:
-                  slowPSPs.append(exactPSPsInRange[fastestIndex])
-                fastestIndex = i
-              else:
-                slowPSPs.append(psp)
-          fastestExactPSPsInRange.append(exactPSPsInRange[fastestIndex])
-          exactPSPsInRange.remove(exactPSPsInRange[fastestIndex])
-          for slowPSP in slowPSPs:
-            exactPSPsInRange.remove(slowPSP)
+        fastestExactPSPsInRange = self.getFastestPSPsPerProblem(exactPSPsInRange)
         for psp in fastestExactPSPsInRange:
           localSolutionSet.add( psp[1] )
-          fastestPSPs.add( tuple(copy.deepcopy(psp)) )
+          fastestPSPs.add( tuple(psp) )
 
         finalRuleString = self.ruleToString(rule)
         if self.printLogic: print "FINAL RULE: " + finalRuleString
@@ -1150,15 +1155,15 @@ class SolutionSelectionWriter:
         for ug in rule[0]: # exact tiles
           for psp in ug:
             localSolutionSet.add( psp[1] )
-            fastestPSPs.add( tuple(copy.deepcopy(psp)) )
+            fastestPSPs.add( tuple(psp) )
         for psp in fastestExactPSPsInRange:
           print "adding exact " + str(psp[1])
-          fastestPSPs.add( tuple(copy.deepcopy(psp)) )
+          fastestPSPs.add( tuple(psp) )
           self.addPSPToSets(psp)
-        fastestPSPs.add( tuple(copy.deepcopy(rule[1])) )
+        fastestPSPs.add( tuple(rule[1]) )
 
         localSolutionSet.add(rule[1][1])
-        newFallbackSolution = copy.deepcopy( rule[1][1] )
+        #newFallbackSolution = copy.deepcopy( rule[1][1] )
         #for i in range( 0, 4):
         #  if newFallbackSolution.kernels[i] != None:
         #    newFallbackSolution.kernels[i].unrolls = [ 1 ]
@@ -1215,16 +1220,27 @@ class SolutionSelectionWriter:
   def bucketSortRangePSPs(self, psps):
     if self.printStatus: print "bucketSortRangePSPs()"
 
+    # sizes only depend on problems, so compare problems rather than psps
+    table = PSPTable(psps)
+    problemRows = dict( table.group(table.getRows(), table.problemId) )
+    problemIds = range(0, len(table.problems))
     sortedPSPs = []
 
-    while len(psps) > 0:
-      largestSizeP = self.getLargestSize(psps)
-      size = largestSizeP.getSizeFree()**0.5
-      pspsForLargestSize = self.getPSPsForSize(psps, largestSizeP)
-      exactPSPs = self.getExactTiles(pspsForLargestSize)
-      fallbackPSPs = self.getFallbacks(pspsForLargestSize)
+    while len(problemIds) > 0:
+      largestId = max( problemIds, \
+          key=lambda problemId: table.problems[problemId].getSizeFree() )
+      largestSizeP = table.problems[largestId]
+      comparisons = {}
+      for problemId in problemIds:
+        comparisons[problemId] = \
+            self.compareSize(table.problems[problemId], largestSizeP)
+      rows = sorted( [ i for problemId in problemIds \
+          if comparisons[problemId] == 0 for i in problemRows[problemId] ] )
+      exactPSPs = table.getPSPs( table.select(rows, table.isExactTile) )
+      fallbackPSPs = table.getPSPs( table.select(rows, table.isFallback) )
       sortedPSPs.append( [exactPSPs, fallbackPSPs] )
-      self.removePSPsLargerOrEqual(psps, largestSizeP)
+      problemIds = [ problemId for problemId in problemIds \
+          if comparisons[problemId] < 0 ]
 
     return sortedPSPs
 
@@ -1240,13 +1256,14 @@ class SolutionSelectionWriter:
     s += "\n"
     s += "set( TensileLib_OtherFiles_GENERATED_DYNAMIC\n"
     
-    for deviceProfile, exactMatches in self.psMap.iteritems():
+    for deviceProfile in sorted(self.psMap.keys(), key=lambda dp: dp.libString()):
+      exactMatches = self.psMap[deviceProfile]
       # (2) Write Device-Level Solution Selection files
       baseName = "TensileGetSolution_" + deviceProfile.libString()
       s += "  ${TensileLib_DIR_GENERATED}" + subdirectory + baseName + ".cpp\n"
       s += "  ${TensileLib_DIR_GENERATED}" + subdirectory + baseName + ".h\n"
 
-      for exactMatch, pspTypes in exactMatches.iteritems():
+      for exactMatch in sorted(exactMatches.keys(), key=lambda em: em.libString()):
         baseName = "TensileGetSolution_" + exactMatch.libString()
         s += "  ${TensileLib_DIR_GENERATED}" + subdirectory + baseName + ".cpp\n"
         s += "  ${TensileLib_DIR_GENERATED}" + subdirectory + baseName + ".h\n"
@@ -1276,7 +1293,8 @@ class SolutionSelectionWriter:
       for sizeGroupTypeIdx in range(0,2):
         for psp in sizeGroup[sizeGroupTypeIdx]:
           localSolutionSet[sizeGroupTypeIdx].add(psp[1])
-    solutionList = [sorted(list(localSolutionSet[0])), sorted(list(localSolutionSet[1]))]
+    solutionList = [sorted(localSolutionSet[0], key=self.solutionWriter.getName), \
+        sorted(localSolutionSet[1], key=self.solutionWriter.getName)]
 
     s = ""
     # write row header
@@ -1290,10 +1308,12 @@ class SolutionSelectionWriter:
     s += "\r"
     for sizeGroupTypeIdx in range(0, 2):
       for solution in solutionList[sizeGroupTypeIdx]:
-        MT0 = solution.kernels[0].tile.workGroup[0] * solution.kernels[0].tile.microTile[0]
-        MT1 = solution.kernels[0].tile.workGroup[1] * solution.kernels[0].tile.microTile[1]
-        unrollStr = str(solution.kernels[0].unrolls[0])
-        if len(solution.kernels[0].unrolls) > 1:
+        (workGroup0, workGroup1, microTile0, microTile1, branch0, branch1, \
+            unrolls) = solution.getTileAttributes()
+        MT0 = workGroup0 * microTile0
+        MT1 = workGroup1 * microTile1
+        unrollStr = str(unrolls[0])
+        if len(unrolls) > 1:
           unrollStr += "/1"
         s += "%ux%ux%s, " % (MT0, MT1, unrollStr)
       s += "<-- Tiles -- Fallbacks -->, "
@@ -1307,12 +1327,15 @@ class SolutionSelectionWriter:
       for sizeGroupTypeIdx in range(0, 2):
         group = sizeGroup[sizeGroupTypeIdx]
         solutionsForType = solutionList[sizeGroupTypeIdx]
+        groupPSPs = {} # solution -> first psp of it in group
+        for psp in group:
+          if psp[1] not in groupPSPs:
+            groupPSPs[psp[1]] = psp
         for solution in solutionsForType:
           time = -1
-          for psp in group:
-            if solution == psp[1]:
-              time = psp[2]
-              break
+          if solution in groupPSPs:
+            psp = groupPSPs[solution]
+            time = psp[2]
           if time >= 0:
             s += "%5.0f, " % ( self.getGFlops(psp[0], time) )
           else:
@@ -1332,13 +1355,15 @@ class SolutionSelectionWriter:
     for psp in exactPSPs:
       localProblemSet.add(psp[0])
       localSolutionSet.add(psp[1])
-    problemList = sorted(list(localProblemSet))
-    solutionList = sorted(list(localSolutionSet))
+    problemList = sorted(localProblemSet, key=str)
+    solutionList = sorted(localSolutionSet, key=self.solutionWriter.getName)
 
-    pspMap = {}
-    for solution in solutionList:
-      pspMap[solution] = []
-      pspMap[solution][:] = [psp for psp in exactPSPs if psp[1] == solution]
+    problemPSPs = {} # problem -> solution -> first psp of them
+    for psp in exactPSPs:
+      if psp[0] not in problemPSPs:
+        problemPSPs[psp[0]] = {}
+      if psp[1] not in problemPSPs[psp[0]]:
+        problemPSPs[psp[0]][psp[1]] = psp
 
     s = ""
     # write row header
@@ -1350,10 +1375,12 @@ class SolutionSelectionWriter:
     s += "\r"
     s += " , "
     for solution in solutionList:
-        MT0 = solution.kernels[0].tile.workGroup[0] * solution.kernels[0].tile.microTile[0]
-        MT1 = solution.kernels[0].tile.workGroup[1] * solution.kernels[0].tile.microTile[1]
-        unrollStr = str(solution.kernels[0].unrolls[0])
-        if len(solution.kernels[0].unrolls) > 1:
+        (workGroup0, workGroup1, microTile0, microTile1, branch0, branch1, \
+            unrolls) = solution.getTileAttributes()
+        MT0 = workGroup0 * microTile0
+        MT1 = workGroup1 * microTile1
+        unrollStr = str(unrolls[0])
+        if len(unrolls) > 1:
           unrollStr += "/1"
         s += "%ux%ux%s, " % (MT0, MT1, unrollStr)
     s += "\r"
@@ -1361,14 +1388,11 @@ class SolutionSelectionWriter:
     prevSize = 0
     for problem in problemList:
       s += "%s, " % (str(problem))
-      problemPSPs = []
-      problemPSPs[:] = [psp for psp in exactPSPs if psp[0] == problem]
       for solution in solutionList:
         time = -1
-        for psp in problemPSPs:
-          if solution == psp[1]:
-            time = psp[2]
-            break
+        if solution in problemPSPs[problem]:
+          psp = problemPSPs[problem][solution]
+          time = psp[2]
         if time >= 0:
           s += "%5.0f, " % ( self.getGFlops(psp[0], time) )
         else:
@@ -1385,48 +1409,29 @@ class SolutionSelectionWriter:
     if self.printStatus: print str(exactMatch) + "::pruneSolutions()"
     
     # choose 1 unroll and wg/uT for each macro-tile/branch for rangePSPs
-    # create set of macro-tile sizes
-    uniqueSet = set() # only one solution per uniqueGroup will be kept
-    uniqueDictionary = {}
-    for sizeGroup in rangePSPs:
-      exactPSPs = sizeGroup[0]
-      fallbackPSPs = sizeGroup[1]
-      for psp in exactPSPs:
-        tile0 = psp[1].kernels[0].tile.workGroup[0]*psp[1].kernels[0].tile.microTile[0]
-        tile1 = psp[1].kernels[0].tile.workGroup[1]*psp[1].kernels[0].tile.microTile[1]
-        # branchType = psp[1].branch[0].value
-        # (size0, size1, sizeU) = psp[0].getSize01U()
-        # if size0%tile0==0 and size1%tile1==0:
-        branchType = 0
-        groupTuple = ( tile0, tile1, branchType, len( psp[1].kernels[0].unrolls) )
-        uniqueSet.add( groupTuple )
-        if groupTuple not in uniqueDictionary:
-          uniqueDictionary[groupTuple] = list()
-        uniqueDictionary[groupTuple].append( psp )
-      for psp in fallbackPSPs:
-        tile0 = psp[1].kernels[0].tile.workGroup[0]*psp[1].kernels[0].tile.microTile[0]
-        tile1 = psp[1].kernels[0].tile.workGroup[1]*psp[1].kernels[0].tile.microTile[1]
-        branchType = psp[1].branch[0].value
-        # (size0, size1, sizeU) = psp[0].getSize01U()
-        # if size0%tile0==0 and size1%tile1==0:
-        # branchType = 0
-        groupTuple = ( tile0, tile1, branchType, len( psp[1].kernels[0].unrolls) )
-        uniqueSet.add( groupTuple )
-        if groupTuple not in uniqueDictionary:
-          uniqueDictionary[groupTuple] = list()
-        uniqueDictionary[groupTuple].append( psp )
+    pspList = []
+    pspGroups = [] # (sizeGroupIdx, groupTypeIdx) of each psp
+    for sizeGroupIdx in range(0, len(rangePSPs)):
+      for groupTypeIdx in range(0, 2):
+        for psp in rangePSPs[sizeGroupIdx][groupTypeIdx]:
+          pspList.append(psp)
+          pspGroups.append( (sizeGroupIdx, groupTypeIdx) )
+    table = PSPTable(pspList)
+    rows = table.getRows()
+
+    # group exact tiles by macro-tile and fallbacks by macro-tile/branch
+    groupTuples = [ ( table.macroTile0[i], table.macroTile1[i], \
+        table.branch0[i] if pspGroups[i][1] == 1 else 0, \
+        table.numUnrolls[i] ) for i in rows ]
     # for each macro-tile/branch combo
     fastestSolutionForGroup = {}
-    for uniqueGroup, psps in uniqueDictionary.iteritems():
+    for uniqueGroup, groupRows in table.group(rows, groupTuples):
       solutionPerf = {}
-      for psp in psps:
-        problem = psp[0]
-        solution = psp[1]
-        time = psp[2]
+      for i in groupRows:
+        solution = table.solutions[table.solutionId[i]]
         if solution not in solutionPerf:
           solutionPerf[solution] = 0
-        gFlops = (problem.getNumFlops()/1000000000.0) / (time/1000.0)
-        solutionPerf[solution] += gFlops
+        solutionPerf[solution] += table.gflops[i]
       solutionPerfs = solutionPerf.items()
       fastestIdx = 0
       fastestPerf = -1
@@ -1437,18 +1442,21 @@ class SolutionSelectionWriter:
           fastestPerf = p
       (solution, perf) = solutionPerfs[fastestIdx]
       fastestSolutionForGroup[uniqueGroup] = solution
-    for sizeGroupIdx in range(0, len(rangePSPs)):
-      for groupTypeIdx in range(0, 2):
-        for psp in list(rangePSPs[sizeGroupIdx][groupTypeIdx]): #iterate over copy and remove from original
-          tile0 = psp[1].kernels[0].tile.workGroup[0]*psp[1].kernels[0].tile.microTile[0]
-          tile1 = psp[1].kernels[0].tile.workGroup[1]*psp[1].kernels[0].tile.microTile[1]
-          branchType = psp[1].branch[0].value
-          (size0, size1, sizeU) = psp[0].getSize01U()
-          if size0%tile0==0 and size1%tile1==0:
-            branchType = 0
-          groupTuple = ( tile0, tile1, branchType, len( psp[1].kernels[0].unrolls) )
-          if psp[1] != fastestSolutionForGroup[groupTuple]:
-            rangePSPs[sizeGroupIdx][groupTypeIdx].remove(psp)
+
+    # keep only psps of the fastest solution of their group; a fallback psp
+    # whose problem is a multiple of its macro-tile counts as an exact tile
+    for sizeGroup in rangePSPs:
+      sizeGroup[0][:] = []
+      sizeGroup[1][:] = []
+    for i in rows:
+      branchType = table.branch0[i]
+      if table.exactDim0[i] and table.exactDim1[i]:
+        branchType = 0
+      groupTuple = ( table.macroTile0[i], table.macroTile1[i], branchType, \
+          table.numUnrolls[i] )
+      if pspList[i][1] == fastestSolutionForGroup[groupTuple]:
+        (sizeGroupIdx, groupTypeIdx) = pspGroups[i]
+        rangePSPs[sizeGroupIdx][groupTypeIdx].append(pspList[i])
 
     # remove empty sizeGroups
     for sizeGroup in list(rangePSPs):
@@ -42,7 +42,7 @@ class SolutionWriter:
   ##############################################################################
   def getName(self, solution):
     solutionName = self.kernelWriter.getName( \
-        solution.kernels[0])
+        solution.getNameKernel())
     solutionName += "_G"
     solutionName += str(solution.kernelGrid[0])
     solutionName += solution.branch[0].getChar()
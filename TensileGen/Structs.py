@@ -19,6 +19,8 @@
 # CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 ################################################################################
 
+import bisect
+import copy
 import SolutionCandidateGenerator
 
 ################################################################################
@@ -27,10 +29,178 @@ import SolutionCandidateGenerator
 class Status:
   success = 0
 
+################################################################################
+# Struct - base of the value classes below
+# - attributes are __slots__ so instances carry no per-object __dict__
+# - a struct is frozen once it's built: freeze() makes it and the structs it
+#   is made of (frozenNames) read-only, and hashing freezes it first, as the
+#   hash is computed from getHashAttributes() once and then kept; setting an
+#   attribute of a frozen struct raises AttributeError, except for
+#   derivedNames, which only cache values computed from the others, and the
+#   sequences a struct holds are tuples so they can't be edited in place
+# - copies and unpickled structs start unfrozen, so copy.deepcopy then edit
+#   is how to derive a new one
+# - setSlot sets an attribute without checking, and getSlotSetters gives
+#   functions which set the named slots of a class the same way, only
+#   faster; the code which builds structs in bulk (FileReader, StructsCodec,
+#   generating candidates) uses them on structs it has just made
+################################################################################
+setSlot = object.__setattr__
+
+def getSlotSetters( cls, names ):
+  return [ getattr(cls, name).__set__ for name in names ]
+
+class Struct(object):
+  __slots__ = [ "cachedHash", "frozen" ]
+  stateNamesByClass = {} # class -> slot names pickled/copied
+  stateSlotsByClass = {} # class -> their slot descriptors
+  immutableTypes = frozenset([ int, long, float, bool, str, type(None) ])
+  derivedNames = frozenset() # slots which may be set once frozen
+  frozenNames = () # slots holding structs, or tuples of them, frozen too
+
+  # every struct starts unfrozen, however it's made (copy and unpickle too)
+  def __new__(cls, *args):
+    struct = object.__new__(cls)
+    setSlot(struct, "frozen", False)
+    return struct
+
+  def __hash__(self):
+    try:
+      return self.cachedHash
+    except AttributeError:
+      self.freeze()
+      setSlot(self, "cachedHash", hash(self.getHashAttributes()))
+      return self.cachedHash
+
+  def __setattr__(self, name, value):
+    if self.frozen and name not in self.derivedNames:
+      raise AttributeError("can't set %s of a frozen %s; edit a copy" \
+          % (name, type(self).__name__))
+    setSlot(self, name, value)
+
+  def freeze(self):
+    if not self.frozen:
+      setSlot(self, "frozen", True)
+      for name in self.frozenNames:
+        value = getattr(self, name)
+        if type(value) is tuple:
+          for struct in value:
+            if struct is not None:
+              struct.freeze()
+        elif value is not None:
+          value.freeze()
+
+  # attributes hashed; subclasses may hash a cheaper subset of getAttributes
+  def getHashAttributes(self):
+    return self.getAttributes()
+
+  @classmethod
+  def getStateNames(cls):
+    try:
+      return Struct.stateNamesByClass[cls]
+    except KeyError:
+      stateNames = []
+      for baseClass in cls.__mro__:
+        for name in baseClass.__dict__.get("__slots__", []):
+          if name not in Struct.__slots__ and name not in stateNames:
+            stateNames.append(name)
+      Struct.stateNamesByClass[cls] = stateNames
+      return stateNames
+
+  @classmethod
+  def getStateSlots(cls):
+    try:
+      return Struct.stateSlotsByClass[cls]
+    except KeyError:
+      stateSlots = [ getattr(cls, name) for name in cls.getStateNames() ]
+      Struct.stateSlotsByClass[cls] = stateSlots
+      return stateSlots
+
+  def __getstate__(self):
+    state = {}
+    for name in self.getStateNames():
+      try:
+        state[name] = object.__getattribute__(self, name)
+      except AttributeError:
+        pass
+    if hasattr(self, "__dict__"):
+      state.update(self.__dict__)
+    return state
+
+  # structs pickled before their sequences were tuples hold lists
+  def __setstate__(self, state):
+    setSlot(self, "frozen", False)
+    for name, value in state.iteritems():
+      if type(value) is list:
+        value = tuple(value)
+      setSlot(self, name, value)
+
+  # shallow; the copy refers to the same values as this struct
+  def __copy__(self):
+    cls = type(self)
+    clone = cls.__new__(cls)
+    for slot in cls.getStateSlots():
+      try:
+        slot.__set__(clone, slot.__get__(self, cls))
+      except AttributeError:
+        pass
+    return clone
+
+  # slot by slot; immutable and Interned values are shared rather than copied
+  def __deepcopy__(self, memo):
+    cls = type(self)
+    clone = cls.__new__(cls)
+    memo[id(self)] = clone
+    for name in cls.getStateNames():
+      try:
+        value = object.__getattribute__(self, name)
+      except AttributeError:
+        continue
+      if type(value) not in Struct.immutableTypes \
+          and not isinstance(value, Interned):
+        value = copy.deepcopy(value, memo)
+      setSlot(clone, name, value)
+    return clone
+
+################################################################################
+# Interned - base of immutable structs shared as flyweights
+# - get(args) returns the one canonical instance built from those
+#   constructor args, so equal instances are normally the same object and
+#   equality is an identity check; copies and unpickled instances are the
+#   canonical instance too
+# - canonical instances are frozen; get another one instead
+################################################################################
+internedInstances = {} # (class, args) -> instance
+
+def getInterned( cls, args ):
+  key = (cls, args)
+  try:
+    return internedInstances[key]
+  except KeyError:
+    instance = cls(*args)
+    instance.freeze()
+    internedInstances[key] = instance
+    return instance
+
+class Interned( Struct ):
+  __slots__ = []
+
+  @classmethod
+  def get(cls, *args):
+    return getInterned(cls, args)
+
+  def __reduce__(self):
+    return (getInterned, (type(self), self.getInternArgs()))
+  def __copy__(self):
+    return self
+  def __deepcopy__(self, memo):
+    return self
+
 ################################################################################
 # Data Type - Enum
 ################################################################################
-class DataType:
+class DataType( Interned ):
+  __slots__ = [ "value" ]
   single        = 0
   double        = 1
   complexSingle = 2
@@ -48,6 +218,9 @@ class DataType:
   def __init__( self, value ):
     self.value = value
 
+  def getInternArgs(self):
+    return (self.value,)
+
   def toChar(self):
     if self.value == self.half:
       return "H"
@@ -210,7 +383,8 @@ class DataType:
   def __hash__(self):
     return hash(self.getAttributes())
   def __eq__(self, other):
-    return isinstance(other, DataType) and self.getAttributes() == other.getAttributes()
+    return self is other \
+        or isinstance(other, DataType) and self.getAttributes() == other.getAttributes()
   def __ne__(self, other):
     result = self.__eq__(other)
     if result is NotImplemented:
@@ -221,7 +395,8 @@ class DataType:
 ################################################################################
 # Dimension
 ################################################################################
-class Dimension:
+class Dimension( Struct ):
+  __slots__ = [ "stride", "size" ]
   def __init__( self ):
     self.stride = 0
     self.size = 0
@@ -237,8 +412,6 @@ class Dimension:
 
   def getAttributes(self):
     return ( self.stride, self.size )
-  def __hash__(self):
-    return hash(self.getAttributes())
   def __eq__(self, other):
     return isinstance(other, Dimension) and self.getAttributes() == other.getAttributes()
   def __ne__(self, other):
@@ -251,10 +424,12 @@ class Dimension:
 ################################################################################
 # Tensor
 ################################################################################
-class Tensor:
+class Tensor( Struct ):
+  __slots__ = [ "dataType", "dimensions" ]
+  frozenNames = ( "dimensions", )
   def __init__( self ):
-    self.dataType = DataType(-1)
-    self.dimensions = []
+    self.dataType = DataType.get(-1)
+    self.dimensions = ()
     #print "Tensor::__init__" + str(self)
 
   def __str__(self):
@@ -268,9 +443,7 @@ class Tensor:
     return self.__str__()
 
   def getAttributes(self):
-    return ( self.dataType, tuple(self.dimensions))
-  def __hash__(self):
-    return hash(self.getAttributes())
+    return ( self.dataType, self.dimensions )
   def __eq__(self, other):
     return isinstance(other, Tensor) \
         and self.getAttributes() == other.getAttributes()
@@ -284,7 +457,8 @@ class Tensor:
 ################################################################################
 # Backend - Enum
 ################################################################################
-class Backend:
+class Backend( Struct ):
+  __slots__ = [ "value" ]
   opencl12 = 0
   hip = 1
 
@@ -324,13 +498,17 @@ class Backend:
 ################################################################################
 # Device
 ################################################################################
-class Device:
+class Device( Interned ):
+  __slots__ = [ "name", "numComputeUnits", "clockFrequency", "flopsPerClock" ]
   def __init__( self, name, numComputeUnits, clockFrequency, flopsPerClock):
     self.name = name
     self.numComputeUnits = numComputeUnits
     self.clockFrequency = clockFrequency
     self.flopsPerClock = flopsPerClock
 
+  def getInternArgs(self):
+    return self.getAttributes()
+
   def __str__(self):
     print "Device.str"
     state = "[Device"
@@ -351,10 +529,9 @@ class Device:
         self.clockFrequency, \
         self.flopsPerClock, \
         )
-  def __hash__(self):
-    return hash(self.getAttributes())
   def __eq__(self, other):
-    return isinstance(other, Device) and self.getAttributes() == other.getAttributes()
+    return self is other \
+        or isinstance(other, Device) and self.getAttributes() == other.getAttributes()
   def __ne__(self, other):
     result = self.__eq__(other)
     if result is NotImplemented:
@@ -365,9 +542,13 @@ class Device:
 ################################################################################
 # DeviceProfile
 ################################################################################
-class DeviceProfile:
-  def __init__(self):
-    self.devices = []
+class DeviceProfile( Interned ):
+  __slots__ = [ "devices" ]
+  def __init__(self, devices=()):
+    self.devices = tuple(devices)
+
+  def getInternArgs(self):
+    return (self.devices,)
 
   def libString(self):
     s = self.devices[0].name
@@ -384,10 +565,9 @@ class DeviceProfile:
 
   def getAttributes(self):
     return (tuple(self.devices))
-  def __hash__(self):
-    return hash(self.getAttributes())
   def __eq__(self, other):
-    return isinstance(other, DeviceProfile) and self.getAttributes() == other.getAttributes()
+    return self is other \
+        or isinstance(other, DeviceProfile) and self.getAttributes() == other.getAttributes()
   def __ne__(self, other):
     result = self.__eq__(other)
     if result is NotImplemented:
@@ -398,7 +578,8 @@ class DeviceProfile:
 ################################################################################
 # OperationType - Enum
 ################################################################################
-class OperationType:
+class OperationType( Interned ):
+  __slots__ = [ "value" ]
   contraction = 0
   convolution = 1
   correlation = 2
@@ -406,6 +587,9 @@ class OperationType:
   def __init__(self, value):
     self.value = value
 
+  def getInternArgs(self):
+    return (self.value,)
+
   def __str__(self):
     if self.value == self.contraction:
       return "CT"
@@ -435,7 +619,8 @@ class OperationType:
   def __hash__(self):
     return hash(self.getAttributes())
   def __eq__(self, other):
-    return isinstance(other, OperationType) and self.getAttributes() == other.getAttributes()
+    return self is other \
+        or isinstance(other, OperationType) and self.getAttributes() == other.getAttributes()
   def __ne__(self, other):
     result = self.__eq__(other)
     if result is NotImplemented:
@@ -446,19 +631,22 @@ class OperationType:
 ################################################################################
 # Operation
 ################################################################################
-class Operation:
+class Operation( Struct ):
+  __slots__ = [ "type", "alphaType", "betaType", "useOffsets", \
+      "numIndicesFree", "numIndicesBatch", "numIndicesSummation", \
+      "indexAssignmentsA", "indexAssignmentsB", "pad", "stride" ]
   def __init__( self ):
-    self.type = OperationType(-1)
+    self.type = OperationType.get(-1)
     #self.useAlpha = -1
-    self.alphaType = DataType(-1)
+    self.alphaType = DataType.get(-1)
     #self.useBeta = -1
-    self.betaType = DataType(-1)
+    self.betaType = DataType.get(-1)
     self.useOffsets = -1
     self.numIndicesFree = -1
     self.numIndicesBatch = -1
     self.numIndicesSummation = -1
-    self.indexAssignmentsA = []
-    self.indexAssignmentsB = []
+    self.indexAssignmentsA = ()
+    self.indexAssignmentsB = ()
     self.pad = []
     self.stride = []
 
@@ -496,11 +684,9 @@ class Operation:
         self.numIndicesFree, \
         self.numIndicesBatch, \
         self.numIndicesSummation, \
-        tuple(self.indexAssignmentsA), \
-        tuple(self.indexAssignmentsB), \
+        self.indexAssignmentsA, \
+        self.indexAssignmentsB, \
         )
-  def __hash__(self):
-    return hash(self.getAttributes())
   def __eq__(self, other):
     return isinstance(other, Operation) and self.getAttributes() == other.getAttributes()
   def __ne__(self, other):
@@ -513,19 +699,22 @@ class Operation:
 ################################################################################
 # ExactMatch - parameters which must exactly match between problem and solution
 ################################################################################
-class ExactMatch:
+class ExactMatch( Struct ):
+  __slots__ = [ "deviceProfile", "typeC", "typeA", "typeB", "typeAlpha", \
+      "typeBeta", "operationType", "numIndicesFree", "indexAssignmentsA", \
+      "indexAssignmentsB", "ppdOffsets", "ppdLeadingStrides", "ppdAll" ]
   indexChars = "ijklmnopqrstuvwxyz"
   def __init__(self):
-    self.deviceProfile = DeviceProfile()
-    self.typeC = DataType(-1)
-    self.typeA = DataType(-1)
-    self.typeB = DataType(-1)
-    self.typeAlpha = DataType(-1)
-    self.typeBeta = DataType(-1)
-    self.operationType = OperationType(-1)
+    self.deviceProfile = DeviceProfile.get(())
+    self.typeC = DataType.get(-1)
+    self.typeA = DataType.get(-1)
+    self.typeB = DataType.get(-1)
+    self.typeAlpha = DataType.get(-1)
+    self.typeBeta = DataType.get(-1)
+    self.operationType = OperationType.get(-1)
     self.numIndicesFree = -1
-    self.indexAssignmentsA = []
-    self.indexAssignmentsB = []
+    self.indexAssignmentsA = ()
+    self.indexAssignmentsB = ()
     self.ppdOffsets = 0 # if true, solution must allow offset parameters; if false, enqueue must not use offsets
     self.ppdLeadingStrides = 0 # if true, solution must allow non-1 initial strides; if false, problem must have size=1 initial strides
     self.ppdAll = 0 # to actually support all parameters being compiled into kernel, all tensor dimensions must become part of exact match
@@ -589,13 +778,11 @@ class ExactMatch:
       self.typeAlpha, \
       self.typeBeta, \
       self.operationType, \
-      tuple(self.indexAssignmentsA), \
-      tuple(self.indexAssignmentsB), \
+      self.indexAssignmentsA, \
+      self.indexAssignmentsB, \
       self.ppdOffsets, \
       self.ppdLeadingStrides \
       )
-  def __hash__(self):
-    return hash(self.getAttributes())
   def __eq__(self, other):
     return isinstance(other, ExactMatch) and self.getAttributes() == other.getAttributes()
   def __ne__(self, other):
@@ -604,11 +791,132 @@ class ExactMatch:
       return result
     return not result
 
+################################################################################
+# SolutionBenchmark - timing statistics of one solution on one problem
+# - samples are folded into running count/sum/variance/min and a small
+#   quantile sketch instead of being kept, so memory per entry is bounded
+# - sketch is a value-sorted list of [value, weight] centroids; it is exact
+#   until it holds more than sketchSize samples, after which the adjacent pair
+#   with the least combined weight is merged into their weighted mean
+################################################################################
 class SolutionBenchmark:
+  aggregates = [ "mean", "median", "trimmedMean", "min" ]
+  sketchSize = 32
+  trimFraction = 0.1 # dropped from each end by trimmedMean; at least one
+                     # sample each once there are 3
+
   def __init__(self):
-    self.times = []
+    self.numSamples = 0
+    self.total = 0.0
+    self.sumSquaredDeviations = 0.0
+    self.minimum = None
+    self.sketch = []
     self.validationStatus = 0 # -1 invalid, 0 unspecified, +1 valid
 
+  # numSamples samples of time, e.g., a centroid written by TensileGenCompact
+  def addTime(self, time, numSamples=1):
+    meanBefore = self.mean()
+    self.numSamples += numSamples
+    self.total += time * numSamples
+    self.sumSquaredDeviations += numSamples * (time - meanBefore) * (time - self.mean())
+    if self.minimum is None or time < self.minimum:
+      self.minimum = time
+    bisect.insort( self.sketch, [time, numSamples] )
+    self.compressSketch()
+
+  def merge(self, other):
+    if other.numSamples == 0:
+      return
+    if self.numSamples == 0:
+      self.sumSquaredDeviations = other.sumSquaredDeviations
+    else:
+      delta = other.mean() - self.mean()
+      self.sumSquaredDeviations += other.sumSquaredDeviations + delta * delta \
+          * self.numSamples * other.numSamples / (self.numSamples + other.numSamples)
+    self.numSamples += other.numSamples
+    self.total += other.total
+    if self.minimum is None or other.minimum < self.minimum:
+      self.minimum = other.minimum
+    for centroid in other.sketch:
+      bisect.insort( self.sketch, list(centroid) )
+    self.compressSketch()
+
+  def compressSketch(self):
+    while len(self.sketch) > self.sketchSize:
+      mergeIdx = 0
+      for i in range(1, len(self.sketch)-1):
+        if self.sketch[i][1] + self.sketch[i+1][1] \
+            < self.sketch[mergeIdx][1] + self.sketch[mergeIdx+1][1]:
+          mergeIdx = i
+      lower = self.sketch[mergeIdx]
+      upper = self.sketch.pop(mergeIdx+1)
+      weight = lower[1] + upper[1]
+      lower[0] = (lower[0]*lower[1] + upper[0]*upper[1]) / weight
+      lower[1] = weight
+
+  def mean(self):
+    if self.numSamples == 0:
+      return 0.0
+    return self.total / self.numSamples
+
+  def variance(self):
+    if self.numSamples < 2:
+      return 0.0
+    return self.sumSquaredDeviations / (self.numSamples - 1)
+
+  # q in [0,1]; linearly interpolates between centroid centers, which is
+  # the usual sample quantile while the sketch is exact
+  def quantile(self, q):
+    if self.numSamples == 0:
+      return 0.0
+    rank = q * (self.numSamples - 1)
+    prevCenter = None
+    prevValue = None
+    first = 0
+    for value, weight in self.sketch:
+      center = first + (weight - 1) / 2.0
+      if rank <= center:
+        if prevCenter is None:
+          return value
+        return prevValue + (value - prevValue) * (rank - prevCenter) / (center - prevCenter)
+      prevCenter = center
+      prevValue = value
+      first += weight
+    return prevValue
+
+  def trimmedMean(self):
+    if self.numSamples == 0:
+      return 0.0
+    numTrimmed = 0
+    if self.numSamples >= 3:
+      numTrimmed = max(1, int(self.trimFraction * self.numSamples))
+    low = numTrimmed
+    high = self.numSamples - numTrimmed
+    total = 0.0
+    first = 0
+    for value, weight in self.sketch:
+      overlap = min(first + weight, high) - max(first, low)
+      if overlap > 0:
+        total += value * overlap
+      first += weight
+    return total / (high - low)
+
+  # without samples every aggregate is 0.0, like mean()
+  def getTime(self, aggregate):
+    if self.numSamples == 0:
+      return 0.0
+    if aggregate == "mean":
+      return self.mean()
+    elif aggregate == "median":
+      return self.quantile(0.5)
+    elif aggregate == "trimmedMean":
+      return self.trimmedMean()
+    elif aggregate == "min":
+      return self.minimum
+    else:
+      print "SolutionBenchmark::getTime(%s) ERROR: unknown aggregate" % aggregate
+      return self.mean()
+
 ################################################################################
 # Problem
 # - some problem descriptors get passed in as kernel argument and
@@ -625,7 +933,13 @@ class SolutionBenchmark:
 # - other
 #   - Device - determined through benchmarking / file reading
 ################################################################################
-class Problem:
+class Problem( Struct ):
+  __slots__ = [ "tensorC", "tensorA", "tensorB", "operation", \
+      "deviceProfile", "sizeFree", "sizeType", "totalFlops", "size0", \
+      "size1", "sizeU" ]
+  derivedNames = frozenset([ "sizeFree", "sizeType", "totalFlops", "size0", \
+      "size1", "sizeU" ])
+  frozenNames = ( "tensorC", "tensorA", "tensorB", "operation" )
   # sizeType=0 ranged
   # sizeType=1 exact
   def __init__( self ):
@@ -633,7 +947,7 @@ class Problem:
     self.tensorA = Tensor()
     self.tensorB = Tensor()
     self.operation = Operation()
-    self.deviceProfile = DeviceProfile()
+    self.deviceProfile = DeviceProfile.get(())
     self.sizeFree = 0
     self.sizeType = -1
     self.totalFlops = -1
@@ -650,30 +964,16 @@ class Problem:
 
   def getSize01U(self):
     if self.size0 < 0:
-      kernel = Kernel()
-      SolutionCandidateGenerator.makeIndexAssignments(kernel, self)
-      self.size0 = self.tensorC.dimensions[ kernel.indexAssignmentDim0].size
-      self.size1 = self.tensorC.dimensions[ kernel.indexAssignmentDim1].size
-      self.sizeU = -1
-      for i in range(len(self.operation.indexAssignmentsA)):
-        if kernel.indexUnroll == self.operation.indexAssignmentsA[i]:
-          self.sizeU = self.tensorA.dimensions[i].size
-          break
+      indexAssignments = SolutionCandidateGenerator.getIndexAssignments(self)
+      self.size0 = self.tensorC.dimensions[ indexAssignments.indexAssignmentDim0].size
+      self.size1 = self.tensorC.dimensions[ indexAssignments.indexAssignmentDim1].size
+      self.sizeU = self.tensorA.dimensions[ indexAssignments.unrollIndexA].size
     return (self.size0, self.size1, self.sizeU)
 
   def getSizeType(self):
     if self.sizeType < 0:
-      # make index assignments
-      kernel = Kernel()
-      SolutionCandidateGenerator.makeIndexAssignments(kernel, self)
       # get key sizes
-      problemSizeDim0 = self.tensorC.dimensions[ kernel.indexAssignmentDim0].size
-      problemSizeDim1 = self.tensorC.dimensions[ kernel.indexAssignmentDim1].size
-      problemSizeUnroll = -1
-      for i in range(len(self.operation.indexAssignmentsA)):
-        if kernel.indexUnroll == self.operation.indexAssignmentsA[i]:
-          problemSizeUnroll = self.tensorA.dimensions[i].size
-          break
+      (problemSizeDim0, problemSizeDim1, problemSizeUnroll) = self.getSize01U()
       # if sizes are squarish, then type=0
       self.sizeType = 0
       if (not problemSizeDim0 % 16 == 0 and not (problemSizeDim0+1) % 16 == 0) or (not problemSizeDim1 % 16 == 0 and not (problemSizeDim1+1) % 16 == 0) or (not problemSizeUnroll % 16 == 0 and not (problemSizeUnroll+1) % 16 == 0):
@@ -759,8 +1059,6 @@ class Problem:
         self.operation, \
         self.deviceProfile, \
         )
-  def __hash__(self):
-    return hash(self.getAttributes())
   def __eq__(self, other):
     return isinstance(other, Problem) and self.getAttributes() == other.getAttributes()
   def __ne__(self, other):
@@ -773,7 +1071,8 @@ class Problem:
 ################################################################################
 # BranchType - Enum
 ################################################################################
-class BranchType:
+class BranchType( Interned ):
+  __slots__ = [ "value" ]
   none = 0
   multiple = 1
   branched = 2
@@ -781,6 +1080,9 @@ class BranchType:
   def __init__(self, value):
     self.value = value
 
+  def getInternArgs(self):
+    return (self.value,)
+
   def __str__(self):
     if self.value == self.none:
       return "none"
@@ -814,7 +1116,7 @@ class BranchType:
   def __hash__(self):
     return hash(self.getAttributes())
   def __eq__(self, other):
-    return isinstance(other, BranchType) \
+    return self is other or isinstance(other, BranchType) \
         and self.getAttributes() == other.getAttributes()
   def __ne__(self, other):
     result = self.__eq__(other)
@@ -826,11 +1128,19 @@ class BranchType:
 ################################################################################
 # Tile
 ################################################################################
-class Tile:
+class Tile( Struct ):
+  __slots__ = [ "workGroup", "microTile", "branch" ]
   def __init__( self ):
-    self.workGroup = [ -1, -1]
-    self.microTile = [ -1, -1]
-    self.branch = [ BranchType(-1), BranchType(-1)]
+    self.workGroup = ( -1, -1 )
+    self.microTile = ( -1, -1 )
+    self.branch = ( BranchType.get(-1), BranchType.get(-1) )
+
+  def clone(self):
+    tile = Tile.__new__(Tile)
+    setSlot(tile, "workGroup", self.workGroup)
+    setSlot(tile, "microTile", self.microTile)
+    setSlot(tile, "branch", self.branch)
+    return tile
 
   def __str__(self):
     state = "[Tile; " + str(self.workGroup[0]) + "x" + str(self.workGroup[1])
@@ -851,8 +1161,6 @@ class Tile:
         self.branch[0], \
         self.branch[1], \
         )
-  def __hash__(self):
-    return hash(self.getAttributes())
   def __eq__(self, other):
     return isinstance(other, Tile) \
         and self.getAttributes() == other.getAttributes()
@@ -866,17 +1174,32 @@ class Tile:
 ################################################################################
 # Kernel
 ################################################################################
-class Kernel:
+class Kernel( Struct ):
+  __slots__ = [ "dataTypeC", "dataTypeA", "dataTypeB", "dataTypeAlpha", \
+      "dataTypeBeta", "indexOrderC", "indexOrderSummation", \
+      "indexAssignmentDim0", "indexAssignmentDim1", "indexAssignmentTileA", \
+      "indexAssignmentTileB", "tensorAssignedDim0", "tensorAssignedDim1", \
+      "indexUnroll", "unrollDimStride0", \
+      "unrollDimStride1", "unrollDimSize", \
+      "unrollDimStrideGreaterThanTileDimStrideA", \
+      "unrollDimStrideLessThanTileDimStrideB", "transposeWorkGroupOrder", \
+      "problem", "tile", "unrolls", \
+      "numLoadsParaA", "loadSizeParaA", "totalLoadSizeParaA", \
+      "numLoadsPerpA", "loadSizePerpA", "totalLoadSizePerpA", \
+      "numLoadsParaB", "loadSizeParaB", "totalLoadSizeParaB", \
+      "numLoadsPerpB", "loadSizePerpB", "totalLoadSizePerpB", \
+      "ppdOffsets", "ppdLeadingStrides", "ppdAll" ]
+  frozenNames = ( "tile", )
   def __init__( self ):
-    self.dataTypeC = DataType(-1)
-    self.dataTypeA = DataType(-1)
-    self.dataTypeB = DataType(-1)
-    self.dataTypeAlpha = DataType(-1)
-    self.dataTypeBeta = DataType(-1)
+    self.dataTypeC = DataType.get(-1)
+    self.dataTypeA = DataType.get(-1)
+    self.dataTypeB = DataType.get(-1)
+    self.dataTypeAlpha = DataType.get(-1)
+    self.dataTypeBeta = DataType.get(-1)
     #self.operation = Operation()
     # Index Assignments
-    self.indexOrderC = []
-    self.indexOrderSummation = []
+    self.indexOrderC = ()
+    self.indexOrderSummation = ()
     self.indexAssignmentDim0 = -1
     self.indexAssignmentDim1 = -1
     self.unrollDimStride0 = -1
@@ -891,7 +1214,7 @@ class Kernel:
 
     # Tile
     self.tile = Tile()
-    self.unrolls = []
+    self.unrolls = ()
 
     # global->local load strategy
     self.numLoadsParaA = -1
@@ -934,6 +1257,13 @@ class Kernel:
   def useBeta(self):
     return self.dataTypeBeta.value != DataType.none
 
+  # unfrozen copy whose tile and unrolls may be changed; problem and data
+  # types are shared, so they must be replaced, not edited
+  def clone(self):
+    kernel = self.__copy__()
+    setSlot(kernel, "tile", self.tile.clone())
+    return kernel
+
   def __str__(self):
     state = "[Kernel; " + str(self.tile)
     state += "; " + str(self.dataTypeC)
@@ -962,14 +1292,14 @@ class Kernel:
         self.dataTypeB, \
         self.dataTypeAlpha, \
         self.dataTypeBeta, \
-        tuple(self.indexOrderC), \
-        tuple(self.indexOrderSummation), \
+        self.indexOrderC, \
+        self.indexOrderSummation, \
         self.indexAssignmentDim0, \
         self.indexAssignmentDim1, \
         self.unrollDimStrideGreaterThanTileDimStrideA, \
         self.unrollDimStrideLessThanTileDimStrideB, \
         self.tile, \
-        tuple(self.unrolls), \
+        self.unrolls, \
         self.ppdOffsets, \
         self.ppdLeadingStrides, \
         self.ppdAll, \
@@ -982,8 +1312,6 @@ class Kernel:
         self.loadSizeParaB, \
         self.loadSizePerpB \
         )
-  def __hash__(self):
-    return hash(self.getAttributes())
   def __eq__(self, other):
     return isinstance(other, Kernel) and self.getAttributes() == other.getAttributes()
   def __ne__(self, other):
@@ -996,19 +1324,34 @@ class Kernel:
 ################################################################################
 # Solution
 ################################################################################
-class Solution:
+class Solution( Struct ):
+  __slots__ = [ "kernelGrid", "branch", "kernels", "ppdOffsets", \
+      "ppdLeadingStrides", "ppdAll" ]
+  frozenNames = ( "kernels", )
   def __init__(self):
     # Solution Correctness Parameters
     # Kernels
-    self.kernelGrid = [ -1, -1, -1 ]
-    self.branch = [ BranchType(-1), BranchType(-1)]
-    self.kernels = []
+    self.kernelGrid = ( -1, -1, -1 )
+    self.branch = ( BranchType.get(-1), BranchType.get(-1) )
+    self.kernels = ()
 
     # PreProcessor optimizations (#defining arguments)
     self.ppdOffsets = 0 # offsets are #defined and not arguments
     self.ppdLeadingStrides = 0 #leading strides are #defined and not arguments
     self.ppdAll = 0 #everything is #defined and not arguments
 
+  # unfrozen copy with cloned kernels; always a plain Solution
+  def clone(self):
+    solution = Solution.__new__(Solution)
+    setSlot(solution, "kernelGrid", self.kernelGrid)
+    setSlot(solution, "branch", self.branch)
+    setSlot(solution, "kernels", tuple( None if kernel is None \
+        else kernel.clone() for kernel in self.kernels ))
+    setSlot(solution, "ppdOffsets", self.ppdOffsets)
+    setSlot(solution, "ppdLeadingStrides", self.ppdLeadingStrides)
+    setSlot(solution, "ppdAll", self.ppdAll)
+    return solution
+
   def __str__(self):
     state = "[Solution"
     state += "; " + str(self.kernelGrid)
@@ -1021,7 +1364,7 @@ class Solution:
 
   def getAttributes(self):
     return ( \
-        tuple(self.kernels), \
+        self.kernels, \
         self.kernelGrid[0], \
         self.kernelGrid[1], \
         self.branch[0], \
@@ -1029,8 +1372,39 @@ class Solution:
         self.ppdOffsets, \
         self.ppdLeadingStrides, \
         self.ppdAll )
-  def __hash__(self):
-    return hash(self.getAttributes())
+  # subset of attributes used for hashing; also computable by solutions
+  # whose kernels haven't been built (FileReader.LazySolution)
+  def getHashAttributes(self):
+    kernelTiles = []
+    for kernel in self.kernels:
+      if kernel is None:
+        kernelTiles.append(None)
+      else:
+        kernelTiles.append( ( \
+            kernel.tile.workGroup[0], \
+            kernel.tile.workGroup[1], \
+            kernel.tile.microTile[0], \
+            kernel.tile.microTile[1], \
+            kernel.tile.branch[0].value, \
+            kernel.tile.branch[1].value, \
+            kernel.unrolls ) )
+    return ( \
+        tuple(kernelTiles), \
+        self.kernelGrid[0], \
+        self.kernelGrid[1], \
+        self.branch[0].value, \
+        self.branch[1].value, \
+        self.ppdOffsets, \
+        self.ppdLeadingStrides, \
+        self.ppdAll )
+  # (workGroup0, workGroup1, microTile0, microTile1, branch0, branch1,
+  # unrolls) of the first kernel; like getHashAttributes, doesn't build
+  # kernels
+  def getTileAttributes(self):
+    return self.getHashAttributes()[0][0]
+  # kernel the solution's name is made from (SolutionWriter.getName)
+  def getNameKernel(self):
+    return self.kernels[0]
   def __eq__(self, other):
     return isinstance(other, Solution) and self.getAttributes() == other.getAttributes()
   def __ne__(self, other):
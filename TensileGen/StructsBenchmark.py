@@ -0,0 +1,282 @@
+################################################################################
+# Copyright (C) 2016 Advanced Micro Devices, Inc. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell cop-
+# ies of the Software, and to permit persons to whom the Software is furnished
+# to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IM-
+# PLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNE-
+# CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+################################################################################
+
+import argparse
+import cPickle
+import copy
+import gc
+import multiprocessing
+import os
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+import Structs
+import StructsCodec
+import FileReader
+import SolutionCandidateGenerator
+import TensileGenBenchmark
+
+
+################################################################################
+# getDeepSize - bytes held by an object graph, each object counted once
+# - follows __dict__ of plain instances and __slots__ of Structs
+################################################################################
+def getDeepSize( obj, seen ):
+  if id(obj) in seen:
+    return 0
+  seen.add(id(obj))
+  size = sys.getsizeof(obj)
+  if isinstance(obj, (list, tuple, set, frozenset)):
+    for item in obj:
+      size += getDeepSize(item, seen)
+  elif isinstance(obj, dict):
+    for key, value in obj.iteritems():
+      size += getDeepSize(key, seen) + getDeepSize(value, seen)
+  elif isinstance(obj, types.InstanceType):
+    size += getDeepSize(obj.__dict__, seen)
+  elif isinstance(obj, Structs.Struct):
+    for name in obj.getStateNames():
+      try:
+        size += getDeepSize(object.__getattribute__(obj, name), seen)
+      except AttributeError:
+        pass
+  return size
+
+
+################################################################################
+# timeBest - seconds taken by the fastest of numRepeats calls of function
+# timeBestOfEach - the same for each of functions, called in turn, so a
+#   change in machine speed during the runs affects them all alike
+# - with the cyclic garbage collector off, as timeit does, so its runs
+#   don't land in some calls and not others
+################################################################################
+def timeBest( function, numRepeats ):
+  return timeBestOfEach( [ function ], numRepeats )[0]
+
+def timeBestOfEach( functions, numRepeats ):
+  best = [ None ] * len(functions)
+  gcEnabled = gc.isenabled()
+  gc.disable()
+  try:
+    for i in range(0, numRepeats):
+      for j in range(0, len(functions)):
+        start = time.time()
+        functions[j]()
+        elapsed = time.time() - start
+        if best[j] is None or elapsed < best[j]:
+          best[j] = elapsed
+  finally:
+    if gcEnabled:
+      gc.enable()
+  return best
+
+
+################################################################################
+# getSolutionCandidates - candidates of every problem in inputFiles, in the
+# order TensileGenBenchmark generates them; the same solution appears once
+# per problem it is a candidate for
+################################################################################
+def getSolutionCandidates( inputFiles, backend ):
+  problemTree = {}
+  FileReader.getProblemsFromXMLFiles( inputFiles, problemTree, False, False, 1 )
+  solutionCandidateGenerator = \
+      SolutionCandidateGenerator.SolutionCandidateGenerator(False, False, backend)
+  problems = []
+  solutions = []
+  for deviceProfile in sorted(problemTree.keys(), key=lambda dp: dp.libString()):
+    exactMatches = problemTree[deviceProfile]
+    for exactMatch in sorted(exactMatches.keys(), key=lambda em: em.libString()):
+      for problem in sorted(exactMatches[exactMatch], key=str):
+        problems.append(problem)
+        solutions.extend( solutionCandidateGenerator.getSolutionCandidatesForProblem( problem ) )
+  return (problems, solutions)
+
+
+################################################################################
+# Benchmark Structs
+# - hash, set and dict operations on a realistic list of solution candidates
+#   and the memory that list holds
+# - probes are deep copies, so lookups hash unhashed objects and compare
+#   unequal-identity objects, as happens for solutions read from xml
+################################################################################
+def BenchmarkStructs( inputFiles, numRepeats ):
+  backend = Structs.Backend()
+  start = time.time()
+  (problems, solutions) = getSolutionCandidates( inputFiles, backend )
+  print "StructsBenchmark: %u problems, %u solution candidates generated in %.3fs" \
+      % ( len(problems), len(solutions), time.time() - start )
+
+  solutionMemory = getDeepSize( solutions, set() )
+  problemMemory = getDeepSize( problems, set() )
+  print "  memory: solutions %.2f MB (%u B each), problems %.1f KB" \
+      % ( solutionMemory/1048576.0, solutionMemory/max(1,len(solutions)), problemMemory/1024.0 )
+
+  probeSets = [ copy.deepcopy(solutions) for i in range(0, numRepeats) ]
+  def hashFresh():
+    for solution in probeSets.pop():
+      hash(solution)
+  uniqueSolutions = set(solutions)
+  def buildSet():
+    set(solutions)
+  def buildDict():
+    dict.fromkeys(solutions)
+  probes = copy.deepcopy(solutions)
+  def lookupSet():
+    for solution in probes:
+      solution in uniqueSolutions
+  kernels = [ kernel for solution in solutions for kernel in solution.kernels if kernel != None ]
+  def buildKernelSet():
+    set(kernels)
+  problemProbes = copy.deepcopy(problems) * 50
+  problemSet = set(problems)
+  def lookupProblems():
+    for problem in problemProbes:
+      problem in problemSet
+
+  print "  %u unique solutions, %u kernels" % ( len(uniqueSolutions), len(kernels) )
+  for name, function in [ \
+      ("hash unhashed solutions", hashFresh), \
+      ("set(solutions)", buildSet), \
+      ("dict.fromkeys(solutions)", buildDict), \
+      ("solution in set (copies)", lookupSet), \
+      ("set(kernels)", buildKernelSet), \
+      ("problem in set (copies)", lookupProblems) ]:
+    print "  %-28s %8.2f ms" % ( name, 1000*timeBest(function, numRepeats) )
+
+  BenchmarkCodec( problems + solutions, numRepeats )
+
+
+################################################################################
+# Benchmark Codec
+# - StructsCodec against cPickle on the same objects; the round trip must
+#   give objects equal to, and hashing like, the originals, else the
+#   benchmark exits with an error, as it does when StructsCodec decodes
+#   slower than cPickle loads
+################################################################################
+def BenchmarkCodec( objects, numRepeats ):
+  encoded = StructsCodec.dumps( objects )
+  pickled = cPickle.dumps( objects, cPickle.HIGHEST_PROTOCOL )
+  decoded = StructsCodec.loads( encoded )
+  if decoded != objects \
+      or [ hash(obj) for obj in decoded ] != [ hash(obj) for obj in objects ]:
+    sys.exit( "ERROR: StructsCodec round trip changed objects" )
+  print "  encoded %.1f KB, pickled %.1f KB" \
+      % ( len(encoded)/1024.0, len(pickled)/1024.0 )
+  names, functions = zip( \
+      ("StructsCodec.dumps", lambda: StructsCodec.dumps(objects)), \
+      ("StructsCodec.loads", lambda: StructsCodec.loads(encoded)), \
+      ("cPickle.dumps", lambda: cPickle.dumps(objects, cPickle.HIGHEST_PROTOCOL)), \
+      ("cPickle.loads", lambda: cPickle.loads(pickled)) )
+  times = dict( zip(names, timeBestOfEach(functions, numRepeats)) )
+  for name in names:
+    print "  %-28s %8.2f ms" % ( name, 1000*times[name] )
+  if times["StructsCodec.loads"] >= times["cPickle.loads"]:
+    sys.exit( "ERROR: StructsCodec.loads (%.2f ms) is no faster than cPickle.loads (%.2f ms)" \
+        % ( 1000*times["StructsCodec.loads"], 1000*times["cPickle.loads"] ) )
+
+
+################################################################################
+# writeScaledProblemFiles - copy of each problem xml holding scale variants
+# of each of its problems; variant k adds 16*k to every size and non-unit
+# stride, so problems stay distinct but get similar solution candidates
+################################################################################
+def writeScaledProblemFiles( inputFiles, scale, outputPath ):
+  outputFiles = []
+  for inputFile in inputFiles:
+    inputXML = FileReader.openXMLFile( inputFile ).read()
+    traceEntries = re.findall( r"<TE>.*?</TE>", inputXML, re.DOTALL )
+    outputFile = os.path.join( outputPath, os.path.basename(inputFile) )
+    scaledFile = open( outputFile, "w" )
+    scaledFile.write( "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<TensileLog>\n" )
+    for k in range(0, scale):
+      def shift( match ):
+        value = int(match.group(2))
+        if match.group(1).startswith("st") and value == 1:
+          return match.group(0)
+        return "%s=\"%u\"" % (match.group(1), value + 16*k)
+      for traceEntry in traceEntries:
+        scaledFile.write( " " + re.sub( r"\b(s[tz]\d+)=\"(\d+)\"", shift, traceEntry ) + "\n" )
+    scaledFile.write( "</TensileLog>\n" )
+    scaledFile.close()
+    outputFiles.append( outputFile )
+  return outputFiles
+
+
+def genBenchmarkWorker( inputFiles, generatedPath ):
+  backend = Structs.Backend()
+  TensileGenBenchmark.GenBenchmarkFromFiles( inputFiles, "", generatedPath, \
+      backend, False, False, 1 )
+
+
+################################################################################
+# Measure GenBenchmark Memory
+# - peak resident set size of GenBenchmarkFromFiles on inputFiles scaled up
+#   scale times; run in a child process so only it is measured
+################################################################################
+def MeasureGenBenchmarkMemory( inputFiles, scale ):
+  workPath = tempfile.mkdtemp( prefix="StructsBenchmark" )
+  try:
+    problemPath = os.path.join( workPath, "problems" )
+    os.makedirs( problemPath )
+    scaledFiles = writeScaledProblemFiles( inputFiles, scale, problemPath )
+    start = time.time()
+    process = multiprocessing.Process( target=genBenchmarkWorker, \
+        args=(scaledFiles, os.path.join(workPath, "generated")) )
+    process.start()
+    process.join()
+    elapsed = time.time() - start
+    if process.exitcode != 0:
+      sys.exit( "ERROR: GenBenchmarkFromFiles exited with %d" % process.exitcode )
+    peakRSS = resource.getrusage( resource.RUSAGE_CHILDREN ).ru_maxrss # KB
+    print "StructsBenchmark: GenBenchmarkFromFiles on test set x%u: peak RSS %.1f MB in %.1fs" \
+        % ( scale, peakRSS/1024.0, elapsed )
+  finally:
+    shutil.rmtree( workPath )
+
+
+################################################################################
+# StructsBenchmark - Main
+################################################################################
+if __name__ == "__main__":
+
+  # arguments
+  ap = argparse.ArgumentParser(description="StructsBenchmark")
+  ap.add_argument("--input-path", dest="inputPath", \
+      default=os.path.join(os.path.dirname(os.path.realpath(__file__)), \
+      "..", "test", "problems", "full"), help="problem xmls; default test/problems/full" )
+  ap.add_argument("--repeats", dest="numRepeats", type=int, default=5, \
+      help="best of this many runs is reported" )
+  ap.add_argument("--gen-benchmark-scale", dest="genBenchmarkScale", type=int, \
+      default=0, help="also measure peak RSS of GenBenchmarkFromFiles on the input problems scaled up this many times" )
+
+  # parse arguments
+  args = ap.parse_args()
+  inputFiles = FileReader.getXMLFiles( args.inputPath )
+
+  # memory first, so the measured child doesn't inherit the candidates
+  if args.genBenchmarkScale > 0:
+    MeasureGenBenchmarkMemory( inputFiles, args.genBenchmarkScale )
+  BenchmarkStructs( inputFiles, args.numRepeats )
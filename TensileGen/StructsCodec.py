@@ -0,0 +1,417 @@
+################################################################################
+# Copyright (C) 2016 Advanced Micro Devices, Inc. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell cop-
+# ies of the Software, and to permit persons to whom the Software is furnished
+# to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IM-
+# PLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNE-
+# CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+################################################################################
+
+
+import itertools
+import marshal
+
+import Structs
+import FileReader
+import SolutionCandidateGenerator
+
+
+################################################################################
+# Structs Codec
+# - compact encoding of Problems, Kernels, Solutions and ExactMatches for
+#   moving them between processes or keeping them on disk
+# - encode gives a tuple of tables, one per kind of object, whose entries are
+#   flat tuples of ints (device names are the only strings); an object held
+#   by several others (the Problem of every Kernel, the Kernels of every
+#   Solution, DeviceProfiles) is stored once and referred to by table index
+# - data, branch and operation types are stored as their int values and
+#   decoded to the interned instances
+# - kernel index assignments aren't stored; decode rebuilds them from the
+#   kernel's problem (getKernelIndexAssignments), as makeIndexAssignments
+#   would
+# - decoded objects compare equal (getAttributes) to the encoded ones; a
+#   FileReader.LazySolution decodes to a LazySolution with unbuilt kernels
+################################################################################
+formatTag = "TensileStructs"
+formatVersion = 1
+
+# kinds of object; a reference is a (kind, table index) pair of ints
+kindNone = 0
+kindProblem = 1
+kindKernel = 2
+kindSolution = 3
+kindLazySolution = 4
+kindExactMatch = 5
+
+numKernelParameters = len(FileReader.LazySolution.kernelParameterNames)
+
+# decoded objects are new, so they're set without Struct's frozen check;
+# a kernel's slots are set in this order, its index assignments last
+setSlot = Structs.setSlot
+kernelSetters = Structs.getSlotSetters( Structs.Kernel, [ "problem", \
+    "dataTypeC", "dataTypeA", "dataTypeB", "dataTypeAlpha", "dataTypeBeta", \
+    "tile", "numLoadsParaA", "loadSizeParaA", "totalLoadSizeParaA", \
+    "numLoadsPerpA", "loadSizePerpA", "totalLoadSizePerpA", \
+    "numLoadsParaB", "loadSizeParaB", "totalLoadSizeParaB", \
+    "numLoadsPerpB", "loadSizePerpB", "totalLoadSizePerpB", \
+    "ppdOffsets", "ppdLeadingStrides", "ppdAll", \
+    "transposeWorkGroupOrder", "unrolls" ] \
+    + SolutionCandidateGenerator.kernelIndexAssignmentNames )
+
+
+################################################################################
+# Encoder
+################################################################################
+class Encoder:
+
+  def __init__(self):
+    self.tables = [ [] for kind in range(0, kindExactMatch+1) ]
+    self.deviceProfiles = []
+    self.references = {} # id(object) -> reference
+    self.encoded = [] # objects referenced, kept alive so ids stay unique
+
+  def encodeDeviceProfile(self, deviceProfile):
+    reference = self.references.get(id(deviceProfile))
+    if reference is None:
+      entry = []
+      for device in deviceProfile.devices:
+        entry.extend( device.getAttributes() )
+      reference = len(self.deviceProfiles)
+      self.deviceProfiles.append( tuple(entry) )
+      self.references[id(deviceProfile)] = reference
+      self.encoded.append(deviceProfile)
+    return reference
+
+  def encodeReference(self, obj):
+    if obj is None:
+      return (kindNone, 0)
+    reference = self.references.get(id(obj))
+    if reference is None:
+      if isinstance(obj, FileReader.LazySolution):
+        kind = kindLazySolution
+        entry = self.encodeLazySolution(obj)
+      elif isinstance(obj, Structs.Solution):
+        kind = kindSolution
+        entry = self.encodeSolution(obj)
+      elif isinstance(obj, Structs.Kernel):
+        kind = kindKernel
+        entry = self.encodeKernel(obj)
+      elif isinstance(obj, Structs.Problem):
+        kind = kindProblem
+        entry = self.encodeProblem(obj)
+      elif isinstance(obj, Structs.ExactMatch):
+        kind = kindExactMatch
+        entry = self.encodeExactMatch(obj)
+      else:
+        raise TypeError("StructsCodec can't encode %s" % type(obj).__name__)
+      reference = (kind, len(self.tables[kind]))
+      self.tables[kind].append( tuple(entry) )
+      self.references[id(obj)] = reference
+      self.encoded.append(obj)
+    return reference
+
+  def encodeProblem(self, problem):
+    operation = problem.operation
+    entry = [ \
+        self.encodeDeviceProfile(problem.deviceProfile), \
+        operation.type.value, \
+        operation.alphaType.value, \
+        operation.betaType.value, \
+        operation.useOffsets, \
+        operation.numIndicesFree, \
+        operation.numIndicesBatch, \
+        operation.numIndicesSummation ]
+    for indexAssignments in [ operation.indexAssignmentsA, \
+        operation.indexAssignmentsB ]:
+      entry.append( len(indexAssignments) )
+      entry.extend( indexAssignments )
+    for tensor in [ problem.tensorC, problem.tensorA, problem.tensorB ]:
+      entry.append( tensor.dataType.value )
+      entry.append( len(tensor.dimensions) )
+      for dimension in tensor.dimensions:
+        entry.append( dimension.stride )
+        entry.append( dimension.size )
+    return entry
+
+  def encodeKernel(self, kernel):
+    entry = list( self.encodeReference(kernel.problem) )
+    entry.extend( [ \
+        kernel.dataTypeC.value, \
+        kernel.dataTypeA.value, \
+        kernel.dataTypeB.value, \
+        kernel.dataTypeAlpha.value, \
+        kernel.dataTypeBeta.value, \
+        kernel.tile.workGroup[0], \
+        kernel.tile.workGroup[1], \
+        kernel.tile.microTile[0], \
+        kernel.tile.microTile[1], \
+        kernel.tile.branch[0].value, \
+        kernel.tile.branch[1].value, \
+        kernel.numLoadsParaA, \
+        kernel.loadSizeParaA, \
+        kernel.totalLoadSizeParaA, \
+        kernel.numLoadsPerpA, \
+        kernel.loadSizePerpA, \
+        kernel.totalLoadSizePerpA, \
+        kernel.numLoadsParaB, \
+        kernel.loadSizeParaB, \
+        kernel.totalLoadSizeParaB, \
+        kernel.numLoadsPerpB, \
+        kernel.loadSizePerpB, \
+        kernel.totalLoadSizePerpB, \
+        kernel.ppdOffsets, \
+        kernel.ppdLeadingStrides, \
+        kernel.ppdAll, \
+        int(kernel.transposeWorkGroupOrder), \
+        len(kernel.unrolls) ] )
+    entry.extend( kernel.unrolls )
+    return entry
+
+  def encodeSolutionHeader(self, solution):
+    return [ \
+        solution.kernelGrid[0], \
+        solution.kernelGrid[1], \
+        solution.kernelGrid[2], \
+        solution.branch[0].value, \
+        solution.branch[1].value, \
+        solution.ppdOffsets, \
+        solution.ppdLeadingStrides, \
+        solution.ppdAll ]
+
+  def encodeSolution(self, solution):
+    entry = self.encodeSolutionHeader(solution)
+    entry.append( len(solution.kernels) )
+    for kernel in solution.kernels:
+      entry.extend( self.encodeReference(kernel) )
+    return entry
+
+  # raw <K> parameters rather than kernels, so they stay unbuilt
+  def encodeLazySolution(self, solution):
+    entry = self.encodeSolutionHeader(solution)
+    entry.extend( self.encodeReference(solution.problem) )
+    entry.append( len(solution.kernelParameters) )
+    for parameters in solution.kernelParameters:
+      entry.extend( parameters )
+    return entry
+
+  def encodeExactMatch(self, exactMatch):
+    entry = [ \
+        self.encodeDeviceProfile(exactMatch.deviceProfile), \
+        exactMatch.typeC.value, \
+        exactMatch.typeA.value, \
+        exactMatch.typeB.value, \
+        exactMatch.typeAlpha.value, \
+        exactMatch.typeBeta.value, \
+        exactMatch.operationType.value, \
+        exactMatch.numIndicesFree, \
+        exactMatch.ppdOffsets, \
+        exactMatch.ppdLeadingStrides, \
+        exactMatch.ppdAll ]
+    for indexAssignments in [ exactMatch.indexAssignmentsA, \
+        exactMatch.indexAssignmentsB ]:
+      entry.append( len(indexAssignments) )
+      entry.extend( indexAssignments )
+    return entry
+
+
+################################################################################
+# Decoder
+# - tables are decoded lazily, entry by entry, so a reference may point
+#   anywhere in its table regardless of the order entries were written in
+################################################################################
+class Decoder:
+
+  def __init__(self, encoded):
+    if len(encoded) != 4 or encoded[0] != formatTag:
+      raise ValueError("not a StructsCodec encoding")
+    if encoded[1] != formatVersion:
+      raise ValueError("StructsCodec encoding version %s; expected %u" \
+          % (str(encoded[1]), formatVersion))
+    (self.deviceProfileEntries, self.tables) = encoded[2]
+    self.deviceProfiles = [ None ] * len(self.deviceProfileEntries)
+    self.decoded = [ [ None ] * len(table) for table in self.tables ]
+    self.decoders = [ None, self.decodeProblem, self.decodeKernel, \
+        self.decodeSolution, self.decodeLazySolution, self.decodeExactMatch ]
+    self.kernelKeys = {} # id(problem) -> FileReader.getKernelKey(problem)
+    self.indexAssignments = {} # id(problem) -> its kernel index assignments
+
+  def decodeDeviceProfile(self, index):
+    deviceProfile = self.deviceProfiles[index]
+    if deviceProfile is None:
+      entry = self.deviceProfileEntries[index]
+      devices = []
+      for i in range(0, len(entry), 4):
+        devices.append( Structs.Device.get(*entry[i:i+4]) )
+      deviceProfile = Structs.DeviceProfile.get(tuple(devices))
+      self.deviceProfiles[index] = deviceProfile
+    return deviceProfile
+
+  def decodeReference(self, kind, index):
+    if kind == kindNone:
+      return None
+    obj = self.decoded[kind][index]
+    if obj is None:
+      obj = self.decoders[kind]( self.tables[kind][index] )
+      self.decoded[kind][index] = obj
+    return obj
+
+  def decodeProblem(self, entry):
+    problem = Structs.Problem()
+    operation = problem.operation
+    problem.deviceProfile = self.decodeDeviceProfile(entry[0])
+    operation.type = Structs.OperationType.get(entry[1])
+    operation.alphaType = Structs.DataType.get(entry[2])
+    operation.betaType = Structs.DataType.get(entry[3])
+    (operation.useOffsets, operation.numIndicesFree, \
+        operation.numIndicesBatch, operation.numIndicesSummation) = entry[4:8]
+    i = 8
+    operation.indexAssignmentsA = entry[i+1:i+1+entry[i]]
+    i += 1 + entry[i]
+    operation.indexAssignmentsB = entry[i+1:i+1+entry[i]]
+    i += 1 + entry[i]
+    for tensor in [ problem.tensorC, problem.tensorA, problem.tensorB ]:
+      tensor.dataType = Structs.DataType.get(entry[i])
+      numDimensions = entry[i+1]
+      i += 2
+      dimensions = []
+      for j in range(0, numDimensions):
+        dimension = Structs.Dimension()
+        dimension.stride = entry[i]
+        dimension.size = entry[i+1]
+        dimensions.append(dimension)
+        i += 2
+      tensor.dimensions = tuple(dimensions)
+    return problem
+
+  def decodeKernel(self, entry):
+    kernel = Structs.Kernel.__new__(Structs.Kernel)
+    tile = Structs.Tile.__new__(Structs.Tile)
+    setSlot(tile, "workGroup", entry[7:9])
+    setSlot(tile, "microTile", entry[9:11])
+    setSlot(tile, "branch", ( Structs.BranchType.get(entry[11]), \
+        Structs.BranchType.get(entry[12]) ))
+    problem = self.decodeReference(entry[0], entry[1])
+    indexAssignments = self.indexAssignments.get(id(problem))
+    if indexAssignments is None:
+      indexAssignments = \
+          SolutionCandidateGenerator.getKernelIndexAssignments(problem)
+      self.indexAssignments[id(problem)] = indexAssignments
+    values = ( problem, \
+        Structs.DataType.get(entry[2]), \
+        Structs.DataType.get(entry[3]), \
+        Structs.DataType.get(entry[4]), \
+        Structs.DataType.get(entry[5]), \
+        Structs.DataType.get(entry[6]), \
+        tile ) + entry[13:28] \
+        + ( bool(entry[28]), entry[30:30+entry[29]] ) + indexAssignments
+    for setter, value in itertools.izip(kernelSetters, values):
+      setter(kernel, value)
+    return kernel
+
+  def decodeSolutionHeader(self, solution, entry):
+    setSlot(solution, "kernelGrid", entry[0:3])
+    setSlot(solution, "branch", ( Structs.BranchType.get(entry[3]), \
+        Structs.BranchType.get(entry[4]) ))
+    setSlot(solution, "ppdOffsets", entry[5])
+    setSlot(solution, "ppdLeadingStrides", entry[6])
+    setSlot(solution, "ppdAll", entry[7])
+
+  def decodeSolution(self, entry):
+    solution = Structs.Solution.__new__(Structs.Solution)
+    self.decodeSolutionHeader(solution, entry)
+    setSlot(solution, "kernels", tuple( \
+        self.decodeReference(entry[i], entry[i+1]) \
+        for i in range(9, 9+2*entry[8], 2) ))
+    return solution
+
+  def decodeLazySolution(self, entry):
+    solution = FileReader.LazySolution.__new__(FileReader.LazySolution)
+    self.decodeSolutionHeader(solution, entry)
+    problem = self.decodeReference(entry[8], entry[9])
+    setSlot(solution, "problem", problem)
+    if id(problem) not in self.kernelKeys:
+      self.kernelKeys[id(problem)] = FileReader.getKernelKey(problem)
+    setSlot(solution, "kernelKey", self.kernelKeys[id(problem)])
+    kernelParameters = []
+    for i in range(11, 11+numKernelParameters*entry[10], numKernelParameters):
+      kernelParameters.append( entry[i:i+numKernelParameters] )
+    setSlot(solution, "kernelParameters", tuple(kernelParameters))
+    return solution
+
+  def decodeExactMatch(self, entry):
+    exactMatch = Structs.ExactMatch()
+    exactMatch.deviceProfile = self.decodeDeviceProfile(entry[0])
+    exactMatch.typeC = Structs.DataType.get(entry[1])
+    exactMatch.typeA = Structs.DataType.get(entry[2])
+    exactMatch.typeB = Structs.DataType.get(entry[3])
+    exactMatch.typeAlpha = Structs.DataType.get(entry[4])
+    exactMatch.typeBeta = Structs.DataType.get(entry[5])
+    exactMatch.operationType = Structs.OperationType.get(entry[6])
+    (exactMatch.numIndicesFree, exactMatch.ppdOffsets, \
+        exactMatch.ppdLeadingStrides, exactMatch.ppdAll) = entry[7:11]
+    i = 11
+    exactMatch.indexAssignmentsA = entry[i+1:i+1+entry[i]]
+    i += 1 + entry[i]
+    exactMatch.indexAssignmentsB = entry[i+1:i+1+entry[i]]
+    return exactMatch
+
+
+################################################################################
+# encode - objects (a list of Problems, Kernels, Solutions, ExactMatches or
+# None) as a tuple of ints, strs and tuples; shared objects are encoded once
+################################################################################
+def encode( objects ):
+  encoder = Encoder()
+  roots = []
+  for obj in objects:
+    roots.extend( encoder.encodeReference(obj) )
+  tables = tuple( tuple(table) for table in encoder.tables )
+  return ( formatTag, formatVersion, \
+      (tuple(encoder.deviceProfiles), tables), tuple(roots) )
+
+################################################################################
+# decode - list of the objects given to encode; objects shared when encoded
+# are shared again; raises ValueError for other versions of the encoding
+################################################################################
+def decode( encoded ):
+  decoder = Decoder( encoded )
+  roots = encoded[3]
+  return [ decoder.decodeReference(roots[i], roots[i+1]) \
+      for i in range(0, len(roots), 2) ]
+
+################################################################################
+# dumps, loads - encode/decode to and from a byte string
+################################################################################
+def dumps( objects ):
+  return marshal.dumps( encode(objects) )
+
+def loads( data ):
+  return decode( marshal.loads(data) )
+
+################################################################################
+# dump, iterLoad - a file as a stream of encodings; each dump appends one
+# and iterLoad yields each one's list of objects in turn, so a file can hold
+# far more objects than fit in memory
+################################################################################
+def dump( objects, outputFile ):
+  marshal.dump( encode(objects), outputFile )
+
+def iterLoad( inputFile ):
+  while True:
+    try:
+      encoded = marshal.load( inputFile )
+    except EOFError:
+      return
+    yield decode( encoded )
@@ -24,6 +24,9 @@ import os
 import sys
 import subprocess
 import TensileGenBenchmark
+import TensileGenTune
+import SearchSpaceSpec
+import FileReader
 import Structs
 import glob
 import multiprocessing
@@ -65,18 +68,30 @@ def benchmark(cargs):
     ap.add_argument("--optimize-alpha", dest="optimizeAlphaStr")
     ap.add_argument("--optimize-beta", dest="optimizeBetaStr")
     ap.add_argument("--validate", "-v", dest="validate", action="store_true")
+    ap.add_argument("--num-processes", "-j", dest="numProcesses", type=int, default=multiprocessing.cpu_count())
+    ap.add_argument("--search-space", dest="searchSpacePath", help="json (or yaml) search space spec; see SearchSpaceSpec")
+    ap.add_argument("--max-solutions", dest="maxNumSolutions", type=int, default=0, help="unique solutions to build, picked for all problems together; 0 means all")
+    ap.add_argument("--dry-run", dest="dryRun", action="store_true", help="only report what would be generated; don't build or run")
+    ap.add_argument("--candidate-shard", dest="candidateShardPath", help="benchmark the candidates of this shard file, see TensileGenBenchmark --spill-path")
     ap.set_defaults(optimizeAlphaStr="Off")
     ap.set_defaults(optimizeBetaStr="Off")
     ap.set_defaults(validate=False)
 
     # parse arguments
     args = ap.parse_args(args=cargs)
-    inputFiles = glob.glob(args.problemsPath + "/*.xml")
+    inputFiles = FileReader.getXMLFiles(args.problemsPath)
+    searchSpaceSpec = None
+    if args.searchSpacePath:
+        try:
+            searchSpaceSpec = SearchSpaceSpec.readSearchSpaceSpec(args.searchSpacePath)
+        except (IOError, ValueError) as e:
+            ap.error(str(e))
     backend = Structs.Backend()
     generatedPath = os.path.join(args.buildPath, "Generated")
-    mkdir(args.buildPath)
-    mkdir(args.solutionsPath)
-    mkdir(generatedPath)
+    if not args.dryRun:
+        mkdir(args.buildPath)
+        mkdir(args.solutionsPath)
+        mkdir(generatedPath)
     if args.backend.lower() in ["opencl_1.2", "opencl", "ocl", "cl"]: backend.value = 0
     elif args.backend.lower() == "hip": backend.value = 1
 
@@ -95,31 +110,99 @@ def benchmark(cargs):
         generatedPath, \
         backend,
         args.optimizeAlphaStr=="On" or args.optimizeAlphaStr=="ON",
-        args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON" )
-
+        args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON",
+        args.numProcesses,
+        searchSpaceSpec,
+        args.dryRun,
+        args.candidateShardPath,
+        args.maxNumSolutions )
+    if args.dryRun:
+        return
+
+    buildAndRunBenchmark(args.buildPath, args.solutionsPath, generatedPath, backend, args.generator, args.define, args.validate)
+
+def buildAndRunBenchmark(buildPath, solutionsPath, generatedPath, backend, generator, defines, validate):
     # Build exe
     cmake_args = [BENCHMARK_PATH]
-    if args.generator: cmake_args.append('-G ' + args.generator)
+    if generator: cmake_args.append('-G ' + generator)
     cmake_args.append('-DTensile_BACKEND='+str(backend).replace(' ', '_'))
-    cmake_args.append('-DTensileBenchmark_DIR_SOLUTIONS=' + args.solutionsPath)
+    cmake_args.append('-DTensileBenchmark_DIR_SOLUTIONS=' + solutionsPath)
     cmake_args.append('-DTensileBenchmark_DIR_GENERATED=' + generatedPath)
 
-    for d in args.define:
+    for d in defines:
         cmake_args.append('-D{0}'.format(d))
-    cmake(cmake_args, cwd=args.buildPath)
+    cmake(cmake_args, cwd=buildPath)
 
-    build_args = ['--build', args.buildPath, '--config', 'Release']
-    if os.path.exists(os.path.join(args.buildPath, 'Makefile')):
+    build_args = ['--build', buildPath, '--config', 'Release']
+    if os.path.exists(os.path.join(buildPath, 'Makefile')):
         build_args.extend(['--', '-j', str(multiprocessing.cpu_count())])
         #build_args.extend(['VERBOSE=1'])
     cmake(build_args)
 
     validateArgs = []
-    if args.validate:
+    if validate:
       validateArgs = ["--validate"]
 
 
-    cmd([os.path.join(args.buildPath, 'bin', 'TensileBenchmark')]+validateArgs)
+    cmd([os.path.join(buildPath, 'bin', 'TensileBenchmark')]+validateArgs)
+
+def tune(cargs):
+    # arguments
+    ap = argparse.ArgumentParser(description="TensileGenTune")
+    ap.add_argument('-D', '--define', nargs='+', default=[])
+    ap.add_argument('-G', '--generator', default=None)
+    ap.add_argument("--problems-path", "-p", dest="problemsPath", default=os.path.join(os.getcwd(),"ProblemXMLs") )
+    ap.add_argument("--build-path", "-B", dest="buildPath", default=os.path.join(os.getcwd(),"TensileTune") )
+    ap.add_argument("--output-file", "-o", dest="outputFile", default=os.path.join(os.getcwd(),"TensileTune.xml"), help="solution log of every time measured")
+    ap.add_argument("--backend", "-b", dest="backend", required=True)
+    ap.add_argument("--optimize-alpha", dest="optimizeAlphaStr")
+    ap.add_argument("--optimize-beta", dest="optimizeBetaStr")
+    ap.add_argument("--validate", "-v", dest="validate", action="store_true")
+    ap.add_argument("--num-processes", "-j", dest="numProcesses", type=int, default=multiprocessing.cpu_count())
+    ap.add_argument("--search-space", dest="searchSpacePath", help="json (or yaml) search space spec; see SearchSpaceSpec")
+    ap.add_argument("--initial", dest="numInitial", type=int, default=16, help="candidates per problem in the first round")
+    ap.add_argument("--keep-fraction", dest="keepFraction", type=float, default=0.5, help="fraction of each round's candidates kept and expanded")
+    ap.add_argument("--rounds", dest="numRounds", type=int, default=8)
+    ap.add_argument("--max-benchmarks", dest="maxBenchmarks", type=int, default=0, help="benchmarks per problem; 0 means no limit")
+    ap.add_argument("--time-aggregate", dest="timeAggregate", choices=Structs.SolutionBenchmark.aggregates, default="mean")
+    ap.set_defaults(optimizeAlphaStr="Off")
+    ap.set_defaults(optimizeBetaStr="Off")
+    ap.set_defaults(validate=False)
+
+    # parse arguments
+    args = ap.parse_args(args=cargs)
+    inputFiles = FileReader.getXMLFiles(args.problemsPath)
+    searchSpaceSpec = None
+    if args.searchSpacePath:
+        try:
+            searchSpaceSpec = SearchSpaceSpec.readSearchSpaceSpec(args.searchSpacePath)
+        except (IOError, ValueError) as e:
+            ap.error(str(e))
+    backend = Structs.Backend()
+    if args.backend.lower() in ["opencl_1.2", "opencl", "ocl", "cl"]: backend.value = 0
+    elif args.backend.lower() == "hip": backend.value = 1
+    mkdir(args.buildPath)
+    optimizeAlpha = args.optimizeAlphaStr=="On" or args.optimizeAlphaStr=="ON"
+    optimizeBeta = args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON"
+
+    # each round is one benchmark, built and run like "tensile benchmark"
+    def runBenchmark(generatedPath, solutionsPath):
+        buildAndRunBenchmark(args.buildPath, solutionsPath, generatedPath, backend, args.generator, args.define, args.validate)
+    oracle = TensileGenTune.BenchmarkTimingOracle(backend, args.buildPath, runBenchmark, optimizeAlpha, optimizeBeta, args.timeAggregate)
+
+    TensileGenTune.TuneFromFiles( \
+        inputFiles, \
+        args.outputFile, \
+        oracle, \
+        backend, \
+        optimizeAlpha, \
+        optimizeBeta, \
+        args.numInitial, \
+        args.keepFraction, \
+        args.numRounds, \
+        args.maxBenchmarks, \
+        args.numProcesses, \
+        searchSpaceSpec )
 
 
 
@@ -133,5 +216,7 @@ if __name__ == "__main__":
 
     if command == 'benchmark':
         benchmark(sys.argv[2:])
+    elif command == 'tune':
+        tune(sys.argv[2:])
     else:
-        print "Usage: tensile benchmark [args]"
+        print "Usage: tensile benchmark|tune [args]"
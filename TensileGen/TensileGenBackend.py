@@ -22,35 +22,24 @@
 import glob
 import argparse
 import os
+import sys
+import multiprocessing
+import cPickle
 
 import FileReader
 import FileWriter
 import Structs
+import ResultsDatabase
 
 
 ################################################################################
-# Generate Backend Files
+# addAverageTimes - psTimes[deviceProfile][exactMatch] = [[rangePSPs],[exactPSPs]]
+# - timeAggregate is one of Structs.SolutionBenchmark.aggregates
 ################################################################################
-def GenBackendFromFiles( \
-    inputFiles, \
-    outputPath, \
-    backend, \
-    optimizeAlpha, \
-    optimizeBeta ):
-  
-  # read raw solution times
-  psTimesRaw = {}
-  for inputFile in inputFiles:
-    print "TensileGen: Reading " + os.path.basename(inputFile)
-    FileReader.getSolutionsFromXML( inputFile, psTimesRaw, optimizeAlpha, optimizeBeta )
-  # print "status: created dictionary - " + str(psTimes)
-  
-  # structures needed to write backend
-  psTimes = {}
-  kernelSet = set()
-  solutionSet = set()
+def addAverageTimes( psTimes, psTimesRaw, timeAggregate="mean" ):
   for deviceProfile, exactMatches in psTimesRaw.iteritems():
-    psTimes[deviceProfile] = {}
+    if deviceProfile not in psTimes:
+      psTimes[deviceProfile] = {}
     #print "DeviceProfile: " + str(deviceProfile)
     for exactMatch, problems in exactMatches.iteritems():
       rangeProblems = problems[0]
@@ -62,15 +51,15 @@ def GenBackendFromFiles( \
       for rangeProblem, solutionCandidates in rangeProblems.iteritems():
         for solution, solutionBenchmark in solutionCandidates.iteritems():
           avgTime = 1e100
-          if len(solutionBenchmark.times) > 0 and solutionBenchmark.validationStatus != -1:
-            avgTime = sum(solutionBenchmark.times) / len(solutionBenchmark.times)
+          if solutionBenchmark.numSamples > 0 and solutionBenchmark.validationStatus != -1:
+            avgTime = solutionBenchmark.getTime(timeAggregate)
             psTimes[deviceProfile][exactMatch][0].append([rangeProblem, solution, avgTime])
             
       for exactProblem, solutionCandidates in exactProblems.iteritems():
         for solution, solutionBenchmark in solutionCandidates.iteritems():
           avgTime = 1e100
-          if len(solutionBenchmark.times) > 0 and solutionBenchmark.validationStatus != -1:
-            avgTime = sum(solutionBenchmark.times) / len(solutionBenchmark.times)
+          if solutionBenchmark.numSamples > 0 and solutionBenchmark.validationStatus != -1:
+            avgTime = solutionBenchmark.getTime(timeAggregate)
             psTimes[deviceProfile][exactMatch][1].append([exactProblem, solution, avgTime])
 
 
@@ -79,17 +68,177 @@ def GenBackendFromFiles( \
         print "TensileGenBackend: ExactMatch %s has no benchmark times; removing." % str(exactMatch)
         psTimes[deviceProfile].pop(exactMatch, None)
 
+# up to date ExactMatches are only listed, not rewritten
+def addUnchangedExactMatches( psTimes, unchangedSolutionSets ):
+  for exactMatch in unchangedSolutionSets:
+    if exactMatch.deviceProfile not in psTimes:
+      psTimes[exactMatch.deviceProfile] = {}
+    psTimes[exactMatch.deviceProfile][exactMatch] = [[],[]]
 
+def removeEmptyDeviceProfiles( psTimes ):
+  for deviceProfile in psTimes.keys():
     # if this device profile didn't have any exact matches with times, remove
     if len(psTimes[deviceProfile]) < 1:
       print "TensileGenBackend: Device Profile %s has no benchmark times; removing." % str(deviceProfile)
       psTimes.pop(deviceProfile, None)
 
 
+################################################################################
+# Backend Manifest
+# - records each input xml's size, mtime, sha1 and ExactMatches along with
+#   the solutions each ExactMatch selected when the backend was last written
+# - an incremental run then only re-reads new or changed xmls (plus unchanged
+#   xmls sharing an ExactMatch with them) and only rewrites those ExactMatches
+################################################################################
+manifestFileName = "TensileGenBackend.manifest"
+manifestTag = "TensileGenBackendManifest"
+manifestVersion = 2
+
+def readManifest( outputPath, settings ):
+  manifestPath = os.path.join( outputPath, manifestFileName )
+  if not os.path.exists(manifestPath):
+    return None
+  try:
+    manifestFile = open(manifestPath, "rb")
+    try:
+      manifest = cPickle.load(manifestFile)
+    finally:
+      manifestFile.close()
+  except Exception as e:
+    print "TensileGen: ignoring unreadable manifest %s (%s)" % (manifestPath, str(e))
+    return None
+  if manifest.get("tag") != manifestTag or manifest.get("version") != manifestVersion:
+    return None
+  if manifest.get("settings") != settings:
+    print "TensileGen: settings changed since last run; regenerating everything."
+    return None
+  return manifest
+
+def writeManifest( outputPath, settings, inputFileStates, solutionSets ):
+  manifest = { \
+      "tag": manifestTag, \
+      "version": manifestVersion, \
+      "settings": settings, \
+      "inputFiles": inputFileStates, \
+      "exactMatches": solutionSets }
+  manifestPath = os.path.join( outputPath, manifestFileName )
+  manifestFile = open(manifestPath + ".tmp", "wb")
+  cPickle.dump(manifest, manifestFile, cPickle.HIGHEST_PROTOCOL)
+  manifestFile.close()
+  os.rename(manifestPath + ".tmp", manifestPath)
+
+# (size, mtime, sha1); sha1 only recomputed if size or mtime changed
+def getInputFileState( inputFile, previousState ):
+  stat = os.stat(inputFile)
+  if previousState is not None and previousState[0] == stat.st_size \
+      and previousState[1] == stat.st_mtime:
+    return previousState[:3]
+  return ( stat.st_size, stat.st_mtime, FileReader.getFileHash(inputFile) )
+
+################################################################################
+# readChangedInputs
+# - returns raw times of every ExactMatch touched by a new, changed or removed
+#   input, the touched ExactMatches and the manifest entries of all inputs
+################################################################################
+def readChangedInputs( inputFiles, manifest, optimizeAlpha, optimizeBeta, numProcesses, useCache ):
+  previousFiles = manifest["inputFiles"] if manifest is not None else {}
+  inputFileStates = {}
+  changedFiles = []
+  unchangedFiles = []
+  touchedExactMatches = set()
+  for inputFile in inputFiles:
+    path = os.path.abspath(inputFile)
+    previous = previousFiles.get(path)
+    state = getInputFileState( inputFile, previous )
+    if previous is not None and previous[0] == state[0] and previous[2] == state[2]:
+      inputFileStates[path] = state + (previous[3],)
+      unchangedFiles.append(inputFile)
+    else:
+      inputFileStates[path] = state
+      changedFiles.append(inputFile)
+      if previous is not None:
+        touchedExactMatches.update( previous[3] )
+  for path, previous in previousFiles.iteritems():
+    if path not in inputFileStates:
+      print "TensileGen: %s was removed." % os.path.basename(path)
+      touchedExactMatches.update( previous[3] )
+
+  psTimesRaw = {}
+  exactMatchesByFile = {}
+  FileReader.getSolutionsFromXMLFiles( changedFiles, psTimesRaw, optimizeAlpha, optimizeBeta, \
+      numProcesses, useCache, exactMatchesByFile )
+  for inputFile in changedFiles:
+    path = os.path.abspath(inputFile)
+    inputFileStates[path] += (exactMatchesByFile[inputFile],)
+    touchedExactMatches.update( exactMatchesByFile[inputFile] )
+
+  # unchanged inputs still needed for the ExactMatches being regenerated
+  rereadFiles = [ inputFile for inputFile in unchangedFiles \
+      if inputFileStates[os.path.abspath(inputFile)][3] & touchedExactMatches ]
+  FileReader.getSolutionsFromXMLFiles( rereadFiles, psTimesRaw, optimizeAlpha, optimizeBeta, \
+      numProcesses, useCache )
+  return psTimesRaw, touchedExactMatches, inputFileStates
+
+
+################################################################################
+# Generate Backend Files
+# - incremental: only regenerate ExactMatches whose inputs changed since the
+#   manifest in outputPath was written
+# - reports how many of the solutions read had their kernels built, see
+#   FileReader.LazySolution
+################################################################################
+def GenBackendFromFiles( \
+    inputFiles, \
+    outputPath, \
+    backend, \
+    optimizeAlpha, \
+    optimizeBeta, \
+    numProcesses=1, \
+    useCache=False, \
+    minimumXMLCompression="", \
+    timeAggregate="mean", \
+    incremental=False ):
+  
+  # read raw solution times
+  psTimesRaw = {}
+  unchangedSolutionSets = {}
+  FileReader.LazySolution.numBuilt = 0
+  if incremental:
+    settings = ( backend.value, optimizeAlpha, optimizeBeta, minimumXMLCompression, timeAggregate )
+    manifest = readManifest( outputPath, settings )
+    psTimesRaw, touchedExactMatches, inputFileStates = readChangedInputs( \
+        inputFiles, manifest, optimizeAlpha, optimizeBeta, numProcesses, useCache )
+    if manifest is not None:
+      if len(touchedExactMatches) < 1:
+        print "TensileGen: Backend is up to date."
+        writeManifest( outputPath, settings, inputFileStates, manifest["exactMatches"] )
+        return
+      for exactMatch, solutionSet in manifest["exactMatches"].iteritems():
+        if exactMatch not in touchedExactMatches:
+          unchangedSolutionSets[exactMatch] = solutionSet
+  else:
+    FileReader.getSolutionsFromXMLFiles( inputFiles, psTimesRaw, optimizeAlpha, optimizeBeta, numProcesses, useCache )
+  # print "status: created dictionary - " + str(psTimes)
+  
+  # structures needed to write backend
+  psTimes = {}
+  addAverageTimes( psTimes, psTimesRaw, timeAggregate )
+  addUnchangedExactMatches( psTimes, unchangedSolutionSets )
+  removeEmptyDeviceProfiles( psTimes )
 
   # kernelSet.remove(None)
-  fileWriter = FileWriter.FileWriter(outputPath, backend, False)
-  fileWriter.writeBackendFiles(psTimes)
+  fileWriter = FileWriter.FileWriter(outputPath, backend, False, minimumXMLCompression)
+  solutionSets = fileWriter.writeBackendFiles(psTimes, unchangedSolutionSets)
+  if incremental:
+    writeManifest( outputPath, settings, inputFileStates, solutionSets )
+  # by object; comparing solutions could build their kernels
+  solutionsRead = set()
+  for exactMatches in psTimesRaw.itervalues():
+    for problems in exactMatches.itervalues():
+      for solutionCandidates in problems[0].values() + problems[1].values():
+        solutionsRead.update( id(solution) for solution in solutionCandidates )
+  print "TensileGen: built kernels of %u of %u solutions read." \
+      % ( FileReader.LazySolution.numBuilt, len(solutionsRead) )
   
   # getSolution(problem) - top level
     # which device do i match, with default
@@ -102,6 +251,62 @@ def GenBackendFromFiles( \
 
 
 
+################################################################################
+# Generate Backend Files from ResultsDatabase
+# - raw times are only held for one ExactMatch at a time
+# - exactMatchNames, if given, are the ExactMatches regenerated; the others
+#   are listed with the solutions recorded in outputPath's manifest by the
+#   last database run, or regenerated too if it has none for them, so the
+#   library always holds every ExactMatch of the database
+# - raises ValueError for names of ExactMatches not in the database
+################################################################################
+def GenBackendFromDatabase( \
+    databasePath, \
+    outputPath, \
+    backend, \
+    exactMatchNames=None, \
+    minimumXMLCompression="", \
+    timeAggregate="mean" ):
+
+  settings = ( "database", backend.value, minimumXMLCompression, timeAggregate )
+  manifest = None
+  if exactMatchNames is not None:
+    manifest = readManifest( outputPath, settings )
+    if manifest is None:
+      print "TensileGen: no manifest of a database run in %s; regenerating every ExactMatch." \
+          % outputPath
+  database = ResultsDatabase.ResultsDatabase( databasePath )
+  psTimes = {}
+  unchangedSolutionSets = {}
+  try:
+    exactMatches = database.getExactMatches()
+    if exactMatchNames is not None:
+      unknownNames = set(exactMatchNames) - set( exactMatch.libString() \
+          for exactMatchId, deviceProfile, exactMatch in exactMatches )
+      if len(unknownNames) > 0:
+        raise ValueError( "ExactMatch %s not in %s" \
+            % (", ".join(sorted(unknownNames)), databasePath) )
+    for exactMatchId, deviceProfile, exactMatch in exactMatches:
+      if exactMatchNames is not None \
+          and exactMatch.libString() not in exactMatchNames \
+          and manifest is not None and exactMatch in manifest["exactMatches"]:
+        # listed in database order, as if it had been read, so the files
+        # are the same as those of a full run
+        unchangedSolutionSets[exactMatch] = manifest["exactMatches"][exactMatch]
+        addUnchangedExactMatches( psTimes, { exactMatch: None } )
+        continue
+      print "TensileGen: Reading " + exactMatch.libString()
+      addAverageTimes( psTimes, database.getSolutionMap(exactMatchId, deviceProfile, exactMatch), \
+          timeAggregate )
+  finally:
+    database.close()
+  removeEmptyDeviceProfiles( psTimes )
+
+  fileWriter = FileWriter.FileWriter(outputPath, backend, False, minimumXMLCompression)
+  solutionSets = fileWriter.writeBackendFiles(psTimes, unchangedSolutionSets)
+  writeManifest( outputPath, settings, {}, solutionSets )
+
+
 ################################################################################
 # GenLibrary - Main
 ################################################################################
@@ -109,26 +314,66 @@ if __name__ == "__main__":
 
   # arguments
   ap = argparse.ArgumentParser(description="TensileGenBackend")
-  ap.add_argument("--input-path", dest="inputPath", required=True )
+  inputGroup = ap.add_mutually_exclusive_group(required=True)
+  inputGroup.add_argument("--input-path", dest="inputPath" )
+  inputGroup.add_argument("--input-database", dest="databasePath", \
+      help="read benchmark times from a ResultsDatabase instead of xmls" )
   ap.add_argument("--output-path", dest="outputPath", required=True )
   ap.add_argument("--backend", dest="backend", required=True, \
       choices=["OpenCL_1.2", "HIP"] )
   ap.add_argument("--optimize-alpha", dest="optimizeAlphaStr" )
   ap.add_argument("--optimize-beta", dest="optimizeBetaStr" )
+  ap.add_argument("--num-processes", dest="numProcesses", type=int, \
+      default=multiprocessing.cpu_count(), help="processes used to read input xmls" )
+  ap.add_argument("--no-cache", dest="useCache", action="store_false", \
+      help="don't read or write parsed-xml caches next to input xmls" )
+  ap.add_argument("--exact-match", dest="exactMatchNames", action="append", \
+      help="only regenerate this ExactMatch from the database; may be repeated" )
+  ap.add_argument("--compress-minimum-xml", dest="minimumXMLCompression", \
+      choices=["gz", "xz"], default="", help="compress written MinimumXMLs" )
+  ap.add_argument("--time-aggregate", dest="timeAggregate", \
+      choices=Structs.SolutionBenchmark.aggregates, default="mean", \
+      help="statistic of each solution's benchmark times used to pick the fastest" )
+  ap.add_argument("--incremental", dest="incremental", action="store_true", \
+      help="only regenerate ExactMatches whose input xmls changed since the last run" )
   ap.set_defaults(optimizeAlphaStr="Off")
   ap.set_defaults(optimizeBetaStr="Off")
+  ap.set_defaults(useCache=True)
 
 
   # parse arguments
   args = ap.parse_args()
-  inputFiles = glob.glob( args.inputPath+"/*.xml" )
+  if args.exactMatchNames and not args.databasePath:
+    ap.error("--exact-match requires --input-database")
+  if args.incremental and args.databasePath:
+    ap.error("--incremental requires --input-path; use --exact-match with --input-database")
+  if args.minimumXMLCompression == "xz" and FileReader.lzma is None:
+    ap.error("--compress-minimum-xml xz requires the lzma module (backports.lzma)")
   backend = Structs.Backend();
   if args.backend == "OpenCL_1.2":
     backend.value = 0
   elif args.backend == "HIP":
     backend.value = 1
 
+  if args.databasePath:
+    print "TensileGen: backend=%s" % str(backend)
+    print "  InputDatabase=" + args.databasePath
+    print "  OutputPath=" + args.outputPath
+    try:
+      GenBackendFromDatabase( \
+          args.databasePath, \
+          args.outputPath, \
+          backend, \
+          args.exactMatchNames, \
+          args.minimumXMLCompression, \
+          args.timeAggregate )
+    except ValueError as e:
+      ap.error( str(e) )
+    print "TensileGen: DONE."
+    sys.exit(0)
+
   # print settings
+  inputFiles = FileReader.getXMLFiles( args.inputPath )
   print "TensileGen: backend=%s, numInputFiles=%u" %( str(backend), len(inputFiles) )
   print "  InputPath=" + args.inputPath
   print "  OutputPath=" + args.outputPath
@@ -142,6 +387,11 @@ if __name__ == "__main__":
       args.outputPath, \
       backend, \
       args.optimizeAlphaStr=="On" or args.optimizeAlphaStr=="ON", \
-      args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON" )
+      args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON", \
+      args.numProcesses, \
+      args.useCache, \
+      args.minimumXMLCompression, \
+      args.timeAggregate, \
+      args.incremental )
   print "TensileGen: DONE."
 
@@ -24,12 +24,17 @@ import sys
 import argparse
 import getopt
 import glob
+import multiprocessing
+import itertools
 
 import Structs
 import FileReader
 import FileWriter
 import SolutionCandidateGenerator
 import KernelWriter
+import StructsCodec
+import SearchSpaceSpec
+import SolutionCover
 
 
 
@@ -44,8 +49,316 @@ def getKernelsFromSolutions( solutionSet ):
   return kernels
 
 
+################################################################################
+# Solution Candidate Tasks
+# - the problems of each ExactMatch, sorted by name so the order doesn't
+#   depend on set order, split into about numTasksPerProcess tasks per
+#   process; problems of one ExactMatch tend to share candidates, so keeping
+#   them together keeps each worker's candidate cache useful
+################################################################################
+numTasksPerProcess = 4
+
+def getSolutionCandidateTasks( problemTree, numProcesses ):
+  problemLists = []
+  for deviceProfile in sorted(problemTree.keys(), key=lambda dp: dp.libString()):
+    exactMatches = problemTree[deviceProfile]
+    for exactMatch in sorted(exactMatches.keys(), key=lambda em: em.libString()):
+      problemLists.append( (deviceProfile, exactMatch, \
+          sorted(exactMatches[exactMatch], key=str)) )
+  numProblems = sum( len(problems) for (deviceProfile, exactMatch, problems) \
+      in problemLists )
+  taskSize = max(1, numProblems / (numProcesses*numTasksPerProcess))
+  tasks = []
+  for deviceProfile, exactMatch, problems in problemLists:
+    for start in range(0, len(problems), taskSize):
+      tasks.append( (deviceProfile, exactMatch, problems[start:start+taskSize]) )
+  return tasks
+
+# getProblemSolutionCandidates - the problem's candidates, as a set
+# - with maxCandidates or maxSeconds they are streamed, most promising tiles
+#   first, and cut off (see SolutionCandidateGenerator.
+#   iterSolutionCandidatesForProblem); fully exhaustive search spaces are
+#   then enumerated too
+def getProblemSolutionCandidates( solutionCandidateGenerator, problem, \
+    maxCandidates=None, maxSeconds=None ):
+  if maxCandidates is None and maxSeconds is None:
+    return solutionCandidateGenerator.getSolutionCandidatesForProblem( problem )
+  return set( solutionCandidateGenerator.iterSolutionCandidatesForProblem( \
+      problem, maxCandidates, maxSeconds ) )
+
+# worker entry point; module level so multiprocessing can pickle it
+# - problems in and candidates out are StructsCodec encoded; the generators
+#   are kept between tasks so their candidate caches carry over
+workerCandidateGenerators = {}
+
+def generateSolutionCandidatesWorker( args ):
+  (encodedProblems, optimizeAlpha, optimizeBeta, backend, searchSpaceSpec, \
+      maxCandidates, maxSeconds) = args
+  numSolutionCandidates = []
+  allSolutionCandidates = []
+  for problem in StructsCodec.loads( encodedProblems ):
+    solutionCandidateGenerator = SearchSpaceSpec.getSolutionCandidateGenerator( \
+        workerCandidateGenerators, problem.deviceProfile, searchSpaceSpec, \
+        optimizeAlpha, optimizeBeta, backend )
+    solutionCandidates = getProblemSolutionCandidates( \
+        solutionCandidateGenerator, problem, maxCandidates, maxSeconds )
+    numSolutionCandidates.append( len(solutionCandidates) )
+    allSolutionCandidates.extend( solutionCandidates )
+  return (numSolutionCandidates, StructsCodec.dumps(allSolutionCandidates))
+
+# kernels of candidates decoded from a worker refer to its copy of the
+# problem; point them at the parent's own, equal, problem (the kernel's
+# problem isn't hashed, so this is still part of decoding them)
+def attachProblem( solutionCandidates, problem ):
+  for solution in solutionCandidates:
+    for kernel in solution.kernels:
+      if kernel is not None:
+        Structs.setSlot(kernel, "problem", problem)
+
+
+################################################################################
+# getSolutionCandidates
+# - yields (problem, solutionCandidates) for every problem, in task order,
+#   whether generated here or by numProcesses worker processes; the parent
+#   decodes each task's candidates and attaches them to its own problems
+#   (see attachProblem), so the results don't depend on which worker did
+#   what
+# - each device profile's generator uses its settings from searchSpaceSpec,
+#   see SearchSpaceSpec
+# - maxCandidates and maxSeconds, if given, limit each problem's candidates,
+#   see getProblemSolutionCandidates
+################################################################################
+def getSolutionCandidates( problemTree, optimizeAlpha, optimizeBeta, backend, \
+    numProcesses, searchSpaceSpec=None, maxCandidates=None, maxSeconds=None ):
+  tasks = getSolutionCandidateTasks( problemTree, numProcesses )
+  pool = None
+  if numProcesses > 1 and len(tasks) > 1:
+    pool = multiprocessing.Pool( min(numProcesses, len(tasks)) )
+    workerArgs = [ (StructsCodec.dumps(problems), optimizeAlpha, optimizeBeta, \
+        backend, searchSpaceSpec, maxCandidates, maxSeconds) \
+        for (deviceProfile, exactMatch, problems) in tasks ]
+    results = pool.imap( generateSolutionCandidatesWorker, workerArgs )
+  else:
+    solutionCandidateGenerators = {}
+  try:
+    currentDeviceProfile = None
+    currentExactMatch = None
+    for deviceProfile, exactMatch, problems in tasks:
+      if deviceProfile is not currentDeviceProfile:
+        print "DeviceProfile: " + str(deviceProfile)
+        currentDeviceProfile = deviceProfile
+      if exactMatch is not currentExactMatch:
+        print "ExactMatch: " + str(exactMatch)
+        currentExactMatch = exactMatch
+      if pool is None:
+        solutionCandidateGenerator = SearchSpaceSpec.getSolutionCandidateGenerator( \
+            solutionCandidateGenerators, deviceProfile, searchSpaceSpec, \
+            optimizeAlpha, optimizeBeta, backend )
+        for problem in problems:
+          yield (problem, getProblemSolutionCandidates( \
+              solutionCandidateGenerator, problem, maxCandidates, maxSeconds ))
+      else:
+        (numSolutionCandidates, encodedSolutions) = results.next()
+        solutions = StructsCodec.loads( encodedSolutions )
+        start = 0
+        for problem, numSolutions in zip(problems, numSolutionCandidates):
+          solutionCandidates = solutions[start:start+numSolutions]
+          attachProblem( solutionCandidates, problem )
+          yield (problem, set(solutionCandidates))
+          start += numSolutions
+  finally:
+    if pool is not None:
+      pool.close()
+      pool.join()
+
+
+################################################################################
+# Solution Candidate Shards
+# - search spaces too large to hold, e.g., fully exhaustive ones, are
+#   enumerated in numShards shards (see SolutionCandidateGenerator.
+#   iterSolutionCandidatesForShard); shard i of every problem is streamed
+#   to its own file, named by getSolutionCandidateShardPath
+# - a shard file is a stream of StructsCodec dumps, each of a problem and up
+#   to spillChunkSize of its candidates, problems in task order
+# - shard files are only complete once renamed from .tmp, so any process or
+#   host may write any shard; GenBenchmarkFromFiles with candidateShardPath
+#   builds the benchmark of one shard file
+################################################################################
+spillChunkSize = 4096
+
+def getSolutionCandidateShardPath( spillPath, shardIndex, numShards ):
+  return os.path.join( spillPath, \
+      "SolutionCandidates_%u_of_%u.bin" % (shardIndex, numShards) )
+
+# worker entry point; returns the number of candidates written
+def writeSolutionCandidateShardWorker( args ):
+  (encodedProblems, shardIndex, numShards, spillPath, optimizeAlpha, \
+      optimizeBeta, backend, searchSpaceSpec) = args
+  shardPath = getSolutionCandidateShardPath( spillPath, shardIndex, numShards )
+  shardFile = open( shardPath + ".tmp", "wb" )
+  numCandidates = 0
+  for problem in StructsCodec.loads( encodedProblems ):
+    solutionCandidateGenerator = SearchSpaceSpec.getSolutionCandidateGenerator( \
+        workerCandidateGenerators, problem.deviceProfile, searchSpaceSpec, \
+        optimizeAlpha, optimizeBeta, backend )
+    chunk = []
+    for solution in solutionCandidateGenerator.iterSolutionCandidatesForShard( \
+        problem, shardIndex, numShards ):
+      chunk.append( solution )
+      if len(chunk) == spillChunkSize:
+        StructsCodec.dump( [ problem ] + chunk, shardFile )
+        numCandidates += len(chunk)
+        chunk = []
+    if len(chunk) > 0:
+      StructsCodec.dump( [ problem ] + chunk, shardFile )
+      numCandidates += len(chunk)
+  shardFile.close()
+  os.rename( shardPath + ".tmp", shardPath )
+  return numCandidates
+
+################################################################################
+# SpillSolutionCandidatesFromFiles
+# - writes the shards shardIndices (default all) of numShards, one per
+#   process at a time
+################################################################################
+def SpillSolutionCandidatesFromFiles( \
+    inputFiles, \
+    spillPath, \
+    numShards, \
+    shardIndices, \
+    backend, \
+    optimizeAlpha, \
+    optimizeBeta, \
+    numProcesses=1, \
+    searchSpaceSpec=None ):
+  problemTree = {}
+  FileReader.getProblemsFromXMLFiles( inputFiles, problemTree, optimizeAlpha, optimizeBeta, numProcesses )
+  problems = []
+  for deviceProfile, exactMatch, taskProblems in getSolutionCandidateTasks( problemTree, 1 ):
+    problems.extend( taskProblems )
+  if shardIndices is None:
+    shardIndices = range(0, numShards)
+  if not os.path.exists(spillPath):
+    os.makedirs(spillPath)
+  encodedProblems = StructsCodec.dumps( problems )
+  workerArgs = [ (encodedProblems, shardIndex, numShards, spillPath, \
+      optimizeAlpha, optimizeBeta, backend, searchSpaceSpec) \
+      for shardIndex in shardIndices ]
+  pool = None
+  if numProcesses > 1 and len(workerArgs) > 1:
+    pool = multiprocessing.Pool( min(numProcesses, len(workerArgs)) )
+    results = pool.imap( writeSolutionCandidateShardWorker, workerArgs )
+  else:
+    results = itertools.imap( writeSolutionCandidateShardWorker, workerArgs )
+  try:
+    for shardIndex, numCandidates in zip(shardIndices, results):
+      print "TensileGenBenchmark: wrote %u candidates of %u problems to %s" \
+          % ( numCandidates, len(problems), \
+          getSolutionCandidateShardPath(spillPath, shardIndex, numShards) )
+  finally:
+    if pool is not None:
+      pool.close()
+      pool.join()
+
+################################################################################
+# readSolutionCandidateShard - [ (problem, solutionCandidates) ] in task order
+# - for the problems of problemTree; those not in the shard get none
+################################################################################
+def readSolutionCandidateShard( candidateShardPath, problemTree ):
+  print "TensileGenBenchmark: reading solution candidates from " + candidateShardPath
+  problemSolutionCandidates = []
+  benchmarkList = {}
+  for deviceProfile, exactMatch, problems in getSolutionCandidateTasks( problemTree, 1 ):
+    for problem in problems:
+      benchmarkList[problem] = set()
+      problemSolutionCandidates.append( (problem, benchmarkList[problem]) )
+  shardFile = open( candidateShardPath, "rb" )
+  for objects in StructsCodec.iterLoad( shardFile ):
+    if objects[0] not in benchmarkList:
+      print "TensileGenBenchmark: skipping candidates of unknown problem " + str(objects[0])
+      continue
+    benchmarkList[objects[0]].update( objects[1:] )
+  shardFile.close()
+  return problemSolutionCandidates
+
+
+################################################################################
+# printDryRun
+# - per ExactMatch, the problems, candidates (benchmarks to run) and unique
+#   solutions and kernels; then the totals and the files which would be
+#   written
+# - getGenerator(deviceProfile), if given, is the generator candidates were
+#   made by; its fully exhaustive search spaces weren't enumerated, so they
+#   are counted (countSolutionCandidates) and, as candidates may be shared
+#   by problems and kernels by candidates, their solutions and kernels are
+#   upper bounds, marked "at most"
+################################################################################
+def printDryRun( problemTree, benchmarkList, allSolutions, allKernels, \
+    getGenerator=None ):
+  print "TensileGenBenchmark: dry run; nothing written"
+  numExactMatches = 0
+  numProblems = 0
+  numCandidates = 0
+  numSolutions = len(allSolutions)
+  numKernels = len(allKernels)
+  anyCounted = False
+  for deviceProfile in sorted(problemTree.keys(), key=lambda dp: dp.libString()):
+    exactMatches = problemTree[deviceProfile]
+    generator = None
+    if getGenerator is not None and getGenerator(deviceProfile).isFullyExhaustive():
+      generator = getGenerator(deviceProfile)
+    for exactMatch in sorted(exactMatches.keys(), key=lambda em: em.libString()):
+      problems = exactMatches[exactMatch]
+      exactMatchSolutions = set()
+      exactMatchKernels = set()
+      exactMatchNumCandidates = 0
+      exactMatchNumCounted = 0
+      exactMatchNumCountedKernels = 0
+      for problem in problems:
+        solutionCandidates = benchmarkList[problem]
+        if generator is not None and len(solutionCandidates) == 0:
+          searchSpace = generator.getSearchSpace( problem )
+          exactMatchNumCounted += generator.countSolutionCandidates( searchSpace )
+          exactMatchNumCountedKernels += \
+              generator.countSolutionCandidateKernels( searchSpace )
+          continue
+        exactMatchNumCandidates += len(solutionCandidates)
+        exactMatchSolutions.update( solutionCandidates )
+        for kernel in getKernelsFromSolutions(solutionCandidates):
+          if kernel != None:
+            exactMatchKernels.add( kernel )
+      bound = ""
+      if exactMatchNumCounted > 0:
+        bound = "at most "
+        anyCounted = True
+      print "  %s: %u problems, %u candidates, %s%u solutions, %s%u kernels" \
+          % ( exactMatch.libString(), len(problems), \
+          exactMatchNumCandidates + exactMatchNumCounted, \
+          bound, len(exactMatchSolutions) + exactMatchNumCounted, \
+          bound, len(exactMatchKernels) + exactMatchNumCountedKernels )
+      numExactMatches += 1
+      numProblems += len(problems)
+      numCandidates += exactMatchNumCandidates + exactMatchNumCounted
+      numSolutions += exactMatchNumCounted
+      numKernels += exactMatchNumCountedKernels
+  bound = "at most " if anyCounted else ""
+  print "  Total: %u problems, %u candidates, %s%u solutions, %s%u kernels" \
+      % ( numProblems, numCandidates, bound, numSolutions, bound, numKernels )
+  print "  Files: %s%u" % ( bound, FileWriter.getNumBenchmarkFiles( numKernels, \
+      numSolutions, numExactMatches, numProblems ) )
+
+
 ################################################################################
 # GenBenchmark
+# - searchSpaceSpec is a spec read by SearchSpaceSpec.readSearchSpaceSpec, or
+#   None for the generator's defaults
+# - candidateShardPath, if given, is a shard file whose candidates are
+#   benchmarked instead of generating them, see Solution Candidate Shards
+# - maxNumSolutions, if not 0, limits the unique solutions written, picked
+#   for all problems together, see SolutionCover
+# - maxCandidates and maxSeconds, if not 0, limit the candidates generated
+#   per problem, see getProblemSolutionCandidates
+# - dryRun only reports what would be generated, see printDryRun
 ################################################################################
 def GenBenchmarkFromFiles( \
     inputFiles, \
@@ -53,7 +366,14 @@ def GenBenchmarkFromFiles( \
     generatedPath, \
     backend, \
     optimizeAlpha, \
-    optimizeBeta):
+    optimizeBeta, \
+    numProcesses=1, \
+    searchSpaceSpec=None, \
+    dryRun=False, \
+    candidateShardPath=None, \
+    maxNumSolutions=0, \
+    maxCandidates=0, \
+    maxSeconds=0):
   print "\nGenBenchmarkFromFiles:"
   print "  problemFiles=" + str(inputFiles)
   print "  solutionsPath=" + str(solutionsPath)
@@ -66,58 +386,75 @@ def GenBenchmarkFromFiles( \
   problemTree = {}
   #problemTree[deviceProfile][ExactMatch] = Set() of problems
   # for each input file, accumulate problems
-  for inputFile in inputFiles:
-    # print "TensileGenBenchmark: reading problems from " + os.path.basename(inputFile)
-    FileReader.getProblemsFromXML( inputFile, problemTree, optimizeAlpha, optimizeBeta )
+  FileReader.getProblemsFromXMLFiles( inputFiles, problemTree, optimizeAlpha, optimizeBeta, numProcesses )
   #print "TensileGenBenchmark: " + str(len(problemSet)) + " unique problem(s) found"
   #for problem in problemSet:
   #  print str(problem)
 
   ##############################################################################
   # (2) list candidate solutions for each problem
-  solutionCandidateGenerator = \
-      SolutionCandidateGenerator.SolutionCandidateGenerator(optimizeAlpha, optimizeBeta, backend )
+  # - in numProcesses processes; merged in problem order, so which equal
+  #   solution or kernel is kept (and written) is the same as in one process
   allSolutions = set() # all solutions to be written
   allKernels = set() # all gpu kernels to be written
   benchmarkList = {} # problems and associated solution candidates
   print "TensileGenBenchmark: generating solution candidates for problems"
   problemIdx = 0
-  for deviceProfile, exactMatches in problemTree.iteritems():
-    print "DeviceProfile: " + str(deviceProfile)
-    for exactMatch, problemSet in exactMatches.iteritems():
-      print "ExactMatch: " + str(exactMatch)
-
-      for problem in problemSet:
-        solutionCandidates = \
-            solutionCandidateGenerator.getSolutionCandidatesForProblem( \
-            problem )
-        #if len(solutionCandidates) < 61:
-        #  print problem
-        #  for solution in solutionCandidates:
-        #    print solution
-
-        benchmarkList[problem] = solutionCandidates
-        # print solutionCandidates
-        for solution in solutionCandidates:
-          # for s in allSolutions:
-            # if s == solution:
-            #   print "match"
-            #   print s
-            #   print solution
-          allSolutions.add( solution )
-          # print len(allSolutions)
-          # print len(allSolutions)
-        kernelsInSolutionCandidates = getKernelsFromSolutions(solutionCandidates)
-        for kernel in kernelsInSolutionCandidates:
+  if candidateShardPath is None:
+    problemSolutionCandidates = getSolutionCandidates( problemTree, \
+        optimizeAlpha, optimizeBeta, backend, numProcesses, searchSpaceSpec, \
+        maxCandidates or None, maxSeconds or None )
+  else:
+    problemSolutionCandidates = readSolutionCandidateShard( \
+        candidateShardPath, problemTree )
+  for problem, solutionCandidates in problemSolutionCandidates:
+    #if len(solutionCandidates) < 61:
+    #  print problem
+    #  for solution in solutionCandidates:
+    #    print solution
+
+    benchmarkList[problem] = solutionCandidates
+    # print solutionCandidates
+    for solution in solutionCandidates:
+      allSolutions.add( solution )
+    kernelsInSolutionCandidates = getKernelsFromSolutions(solutionCandidates)
+    for kernel in kernelsInSolutionCandidates:
+      if kernel != None:
+        allKernels.add( kernel )
+        # print kernel
+    print "Prob[" + str(problemIdx) + "] \"" + str(problem) + "\": " + str(len(solutionCandidates)) + "/" + str(len(allSolutions)) + " solutions"
+    problemIdx += 1
+
+  # only the solutions of the cover are written; re-collected in problem
+  # order, as above
+  if maxNumSolutions > 0:
+    benchmarkList = SolutionCover.getSolutionCover( problemTree, \
+        benchmarkList, maxNumSolutions )
+    allSolutions = set()
+    allKernels = set()
+    for deviceProfile, exactMatch, problems in \
+        getSolutionCandidateTasks( problemTree, 1 ):
+      for problem in problems:
+        allSolutions.update( benchmarkList[problem] )
+        for kernel in getKernelsFromSolutions(benchmarkList[problem]):
           if kernel != None:
             allKernels.add( kernel )
-            # print kernel
-        print "Prob[" + str(problemIdx) + "] \"" + str(problem) + "\": " + str(len(solutionCandidates)) + "/" + str(len(allSolutions)) + " solutions"
-        problemIdx += 1
   kernelWriter = KernelWriter.KernelWriter(backend)
   #for kernel in allKernels:
   #  print kernelWriter.getName(kernel) + ":" + str(kernel) + ":" + str(hash(kernel))
 
+  if dryRun:
+    getGenerator = None
+    if candidateShardPath is None:
+      solutionCandidateGenerators = {}
+      getGenerator = lambda deviceProfile: \
+          SearchSpaceSpec.getSolutionCandidateGenerator( \
+          solutionCandidateGenerators, deviceProfile, searchSpaceSpec, \
+          optimizeAlpha, optimizeBeta, backend )
+    printDryRun( problemTree, benchmarkList, allSolutions, allKernels, \
+        getGenerator )
+    return
+
   ##############################################################################
   # (3) write benchmark files
   fileWriter = FileWriter.FileWriter(generatedPath, backend, True)
@@ -139,12 +476,43 @@ if __name__ == "__main__":
       choices=["OpenCL_1.2", "HIP"] )
   ap.add_argument("--optimize-alpha", dest="optimizeAlphaStr" )
   ap.add_argument("--optimize-beta", dest="optimizeBetaStr" )
+  ap.add_argument("--num-processes", dest="numProcesses", type=int, \
+      default=multiprocessing.cpu_count(), help="processes used to read input xmls and generate solution candidates" )
+  ap.add_argument("--search-space", dest="searchSpacePath", \
+      help="json (or yaml) search space spec; see SearchSpaceSpec" )
+  ap.add_argument("--max-solutions", dest="maxNumSolutions", type=int, default=0, \
+      help="unique solutions to write, picked for all problems together; 0 means all" )
+  ap.add_argument("--max-candidates", dest="maxCandidates", type=int, default=0, \
+      help="candidates generated per problem, most promising tiles first; 0 means all" )
+  ap.add_argument("--max-seconds", dest="maxSeconds", type=float, default=0, \
+      help="seconds spent generating each problem's candidates; 0 means no limit" )
+  ap.add_argument("--dry-run", dest="dryRun", action="store_true", \
+      help="only report candidates, solutions, kernels and files per ExactMatch" )
+  ap.add_argument("--spill-path", dest="spillPath", \
+      help="write candidate shard files here instead of a benchmark" )
+  ap.add_argument("--num-shards", dest="numShards", type=int, default=1, \
+      help="shards each problem's candidates are split into for --spill-path" )
+  ap.add_argument("--shard", dest="shardIndices", type=int, action="append", \
+      help="shard to write with --spill-path; may be repeated; default all" )
+  ap.add_argument("--candidate-shard", dest="candidateShardPath", \
+      help="benchmark the candidates of this shard file instead of generating them" )
   ap.set_defaults(optimizeAlphaStr="Off")
   ap.set_defaults(optimizeBetaStr="Off")
 
   # parse arguments
   args = ap.parse_args()
-  inputFiles = glob.glob(args.inputPath + "/*.xml")
+  if args.maxCandidates < 0 or args.maxSeconds < 0:
+    ap.error("--max-candidates and --max-seconds must not be negative")
+  if (args.maxCandidates or args.maxSeconds) \
+      and (args.spillPath or args.candidateShardPath):
+    ap.error("--max-candidates and --max-seconds don't apply to candidate shards")
+  inputFiles = FileReader.getXMLFiles( args.inputPath )
+  searchSpaceSpec = None
+  if args.searchSpacePath:
+    try:
+      searchSpaceSpec = SearchSpaceSpec.readSearchSpaceSpec( args.searchSpacePath )
+    except (IOError, ValueError) as e:
+      ap.error( str(e) )
   backend = Structs.Backend();
   if args.backend == "OpenCL_1.2":
     backend.value = 0
@@ -158,11 +526,36 @@ if __name__ == "__main__":
   print "  inputPath=" + args.inputPath
   print "  inputFiles=" + str(inputFiles)
 
+  # write candidate shards
+  if args.spillPath:
+    for shardIndex in args.shardIndices or []:
+      if shardIndex < 0 or shardIndex >= args.numShards:
+        ap.error("--shard %d not in [0, %d)" % (shardIndex, args.numShards))
+    SpillSolutionCandidatesFromFiles( \
+        inputFiles, \
+        args.spillPath, \
+        args.numShards, \
+        args.shardIndices, \
+        backend, \
+        args.optimizeAlphaStr=="On" or args.optimizeAlphaStr=="ON", \
+        args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON", \
+        args.numProcesses, \
+        searchSpaceSpec )
+    sys.exit(0)
+
   # generate benchmark
   GenBenchmarkFromFiles( \
       inputFiles, \
       args.buildPath, \
+      args.buildPath, \
       backend,
       args.optimizeAlphaStr=="On" or args.optimizeAlphaStr=="ON",
-      args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON" )
+      args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON",
+      numProcesses=args.numProcesses,
+      searchSpaceSpec=searchSpaceSpec,
+      dryRun=args.dryRun,
+      candidateShardPath=args.candidateShardPath,
+      maxNumSolutions=args.maxNumSolutions,
+      maxCandidates=args.maxCandidates,
+      maxSeconds=args.maxSeconds )
 
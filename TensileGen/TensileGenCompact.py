@@ -0,0 +1,157 @@
+################################################################################
+# Copyright (C) 2016 Advanced Micro Devices, Inc. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell cop-
+# ies of the Software, and to permit persons to whom the Software is furnished
+# to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IM-
+# PLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNE-
+# CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+################################################################################
+
+import argparse
+import multiprocessing
+
+import FileReader
+import FileWriter
+import SolutionSelectionWriter
+import Structs
+
+
+################################################################################
+# getTopSolutions - [ (time, solution, solutionBenchmark) ] fastest first
+# - solutions which failed validation are dropped
+# - besides the topK fastest, keeps the fastest exact tile and the fastest
+#   fallback of each tile and branch type, as classified by
+#   SolutionSelectionWriter.PSPTable, since selection writes a rule per tile
+#   and needs a fallback even if they are slower; without a fallback it
+#   would make an exact tile the fallback
+################################################################################
+def getTopSolutions( problem, solutionCandidates, topK, timeAggregate ):
+  rankedSolutions = []
+  for solution, solutionBenchmark in solutionCandidates.iteritems():
+    if solutionBenchmark.numSamples > 0 and solutionBenchmark.validationStatus != -1:
+      rankedSolutions.append( (solutionBenchmark.getTime(timeAggregate), \
+          solution, solutionBenchmark) )
+  # ties broken by name so the output doesn't depend on dict order
+  solutionWriter = FileWriter.SolutionWriter.SolutionWriter(Structs.Backend())
+  rankedSolutions.sort( key=lambda entry: (entry[0], solutionWriter.getName(entry[1])) )
+  table = SolutionSelectionWriter.PSPTable( [ [problem, solution, time] \
+      for (time, solution, solutionBenchmark) in rankedSolutions ] )
+  topSolutions = []
+  keptCategories = set()
+  for i in table.getRows():
+    category = ( table.isExactTile[i], table.isFallback[i], table.branch0[i], \
+        rankedSolutions[i][1].getTileAttributes() )
+    if i < topK or ( (table.isExactTile[i] or table.isFallback[i]) \
+        and category not in keptCategories ):
+      topSolutions.append( rankedSolutions[i] )
+      keptCategories.add( category )
+  return topSolutions
+
+
+################################################################################
+# Compact Logs
+# - merges any number of solution logs into one log holding, for each
+#   (device, ExactMatch, problem), only the topK fastest solutions and the
+#   fallbacks selection needs, see getTopSolutions
+# - each kept solution gets one <B> per centroid of its timing sketch (see
+#   Structs.SolutionBenchmark), with the number of samples it stands for, so
+#   its statistics survive merging with later logs; plus its <V> if it was
+#   validated
+################################################################################
+def CompactLogsFromFiles( \
+    inputFiles, \
+    outputFile, \
+    topK, \
+    optimizeAlpha, \
+    optimizeBeta, \
+    numProcesses=1, \
+    useCache=False, \
+    timeAggregate="mean" ):
+
+  psMap = {}
+  FileReader.getSolutionsFromXMLFiles( inputFiles, psMap, optimizeAlpha, optimizeBeta, numProcesses, useCache )
+
+  numEntriesRead = 0
+  numEntriesWritten = 0
+  compactFile = FileReader.openXMLFile( outputFile, "wb" )
+  compactFile.write( "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n" )
+  compactFile.write( "<TensileLog>\n" )
+  for deviceProfile in sorted(psMap.keys(), key=lambda dp: dp.libString()):
+    exactMatches = psMap[deviceProfile]
+    for exactMatch in sorted(exactMatches.keys(), key=lambda em: em.libString()):
+      numExactMatchEntries = 0
+      for sizeType in exactMatches[exactMatch]:
+        for problem in sorted(sizeType.keys(), key=str):
+          solutionCandidates = sizeType[problem]
+          numEntriesRead += len(solutionCandidates)
+          for time, solution, solutionBenchmark in getTopSolutions( \
+              problem, solutionCandidates, topK, timeAggregate ):
+            compactFile.write( FileWriter.getTraceEntryXML( problem, solution, \
+                [ value for (value, weight) in solutionBenchmark.sketch ], \
+                solutionBenchmark.validationStatus, \
+                [ weight for (value, weight) in solutionBenchmark.sketch ] ) )
+            numExactMatchEntries += 1
+      print "TensileGen: Kept %u entries for %s." % (numExactMatchEntries, exactMatch.libString())
+      numEntriesWritten += numExactMatchEntries
+  compactFile.write( "</TensileLog>\n" )
+  compactFile.close()
+  print "TensileGen: Compacted %u problem/solution pairs to %u." % (numEntriesRead, numEntriesWritten)
+
+
+################################################################################
+# TensileGenCompact - Main
+################################################################################
+if __name__ == "__main__":
+
+  # arguments
+  ap = argparse.ArgumentParser(description="TensileGenCompact")
+  ap.add_argument("--input-path", dest="inputPath", required=True )
+  ap.add_argument("--output-file", dest="outputFile", required=True, \
+      help="compacted log; compressed if name ends in .gz or .xz" )
+  ap.add_argument("--top-k", dest="topK", type=int, default=4, \
+      help="fastest solutions kept per problem, besides the fallbacks selection needs" )
+  ap.add_argument("--optimize-alpha", dest="optimizeAlphaStr" )
+  ap.add_argument("--optimize-beta", dest="optimizeBetaStr" )
+  ap.add_argument("--num-processes", dest="numProcesses", type=int, \
+      default=multiprocessing.cpu_count(), help="processes used to read input xmls" )
+  ap.add_argument("--no-cache", dest="useCache", action="store_false", \
+      help="don't read or write parsed-xml caches next to input xmls" )
+  ap.add_argument("--time-aggregate", dest="timeAggregate", \
+      choices=Structs.SolutionBenchmark.aggregates, default="mean", \
+      help="statistic of each solution's benchmark times used to rank it" )
+  ap.set_defaults(optimizeAlphaStr="Off")
+  ap.set_defaults(optimizeBetaStr="Off")
+  ap.set_defaults(useCache=True)
+
+  # parse arguments
+  args = ap.parse_args()
+  inputFiles = FileReader.getXMLFiles( args.inputPath )
+
+  # print settings
+  print "TensileGen: numInputFiles=%u, topK=%u" % ( len(inputFiles), args.topK )
+  print "  InputPath=" + args.inputPath
+  print "  OutputFile=" + args.outputFile
+
+  # compact
+  CompactLogsFromFiles( \
+      inputFiles, \
+      args.outputFile, \
+      args.topK, \
+      args.optimizeAlphaStr=="On" or args.optimizeAlphaStr=="ON", \
+      args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON", \
+      args.numProcesses, \
+      args.useCache, \
+      args.timeAggregate )
+  print "TensileGen: DONE."
@@ -0,0 +1,127 @@
+################################################################################
+# Copyright (C) 2016 Advanced Micro Devices, Inc. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell cop-
+# ies of the Software, and to permit persons to whom the Software is furnished
+# to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IM-
+# PLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNE-
+# CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+################################################################################
+
+import argparse
+import multiprocessing
+
+import FileReader
+import PerformanceModel
+import Structs
+
+
+################################################################################
+# Evaluate Model
+# - checks, against benchmarked solution logs, whether keeping only the
+#   numCandidates solutions the model ranks fastest per problem would still
+#   have kept the fastest benchmarked one
+# - reports, per numCandidates, the problems whose fastest solution would be
+#   lost, how much slower the best kept one is, and the benchmarks avoided
+################################################################################
+def EvaluateModelFromFiles( \
+    inputFiles, \
+    listNumCandidates, \
+    optimizeAlpha, \
+    optimizeBeta, \
+    numProcesses=1, \
+    useCache=False, \
+    timeAggregate="mean" ):
+
+  psMap = {}
+  FileReader.getSolutionsFromXMLFiles( inputFiles, psMap, optimizeAlpha, optimizeBeta, numProcesses, useCache )
+
+  numProblems = 0
+  numBenchmarks = 0
+  numModelBenchmarks = [ 0 for numCandidates in listNumCandidates ]
+  numProblemsLost = [ 0 for numCandidates in listNumCandidates ]
+  maxSlowdowns = [ 1.0 for numCandidates in listNumCandidates ]
+  for deviceProfile in sorted(psMap.keys(), key=lambda dp: dp.libString()):
+    exactMatches = psMap[deviceProfile]
+    for exactMatch in sorted(exactMatches.keys(), key=lambda em: em.libString()):
+      for sizeType in exactMatches[exactMatch]:
+        for problem in sorted(sizeType.keys(), key=str):
+          times = {}
+          for solution, solutionBenchmark in sizeType[problem].iteritems():
+            if solutionBenchmark.numSamples > 0 and solutionBenchmark.validationStatus != -1:
+              times[solution] = solutionBenchmark.getTime(timeAggregate)
+          if len(times) < 1:
+            continue
+          numProblems += 1
+          numBenchmarks += len(times)
+          fastestTime = min(times.values())
+          rankedSolutions = PerformanceModel.getFastestSolutions( problem, times.keys(), len(times) )
+          for i in range(0, len(listNumCandidates)):
+            keptSolutions = rankedSolutions[:listNumCandidates[i]]
+            numModelBenchmarks[i] += len(keptSolutions)
+            keptTime = min( times[solution] for solution in keptSolutions )
+            if keptTime > fastestTime:
+              numProblemsLost[i] += 1
+              maxSlowdowns[i] = max(maxSlowdowns[i], keptTime/fastestTime)
+
+  print "TensileGen: Evaluated model on %u problems, %u benchmarks." % (numProblems, numBenchmarks)
+  for i in range(0, len(listNumCandidates)):
+    print "  numCandidates=%u: fastest lost for %u problems (max slowdown %.3f), %.1f%% of benchmarks avoided" \
+        % ( listNumCandidates[i], numProblemsLost[i], maxSlowdowns[i], \
+        100.0*(numBenchmarks-numModelBenchmarks[i])/max(1, numBenchmarks) )
+
+
+################################################################################
+# TensileGenModel - Main
+################################################################################
+if __name__ == "__main__":
+
+  # arguments
+  ap = argparse.ArgumentParser(description="TensileGenModel")
+  ap.add_argument("--input-path", dest="inputPath", required=True, \
+      help="benchmarked solution logs to evaluate the model against" )
+  ap.add_argument("--num-candidates", dest="listNumCandidates", type=int, \
+      nargs="+", default=[4, 8, 16, 32], \
+      help="candidates kept per problem; each is evaluated" )
+  ap.add_argument("--optimize-alpha", dest="optimizeAlphaStr" )
+  ap.add_argument("--optimize-beta", dest="optimizeBetaStr" )
+  ap.add_argument("--num-processes", dest="numProcesses", type=int, \
+      default=multiprocessing.cpu_count(), help="processes used to read input xmls" )
+  ap.add_argument("--no-cache", dest="useCache", action="store_false", \
+      help="don't read or write parsed-xml caches next to input xmls" )
+  ap.add_argument("--time-aggregate", dest="timeAggregate", \
+      choices=Structs.SolutionBenchmark.aggregates, default="mean", \
+      help="statistic of each solution's benchmark times used to rank it" )
+  ap.set_defaults(optimizeAlphaStr="Off")
+  ap.set_defaults(optimizeBetaStr="Off")
+  ap.set_defaults(useCache=True)
+
+  # parse arguments
+  args = ap.parse_args()
+  inputFiles = FileReader.getXMLFiles( args.inputPath )
+
+  # print settings
+  print "TensileGen: numInputFiles=%u" % len(inputFiles)
+  print "  InputPath=" + args.inputPath
+
+  # evaluate
+  EvaluateModelFromFiles( \
+      inputFiles, \
+      args.listNumCandidates, \
+      args.optimizeAlphaStr=="On" or args.optimizeAlphaStr=="ON", \
+      args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON", \
+      args.numProcesses, \
+      args.useCache, \
+      args.timeAggregate )
+  print "TensileGen: DONE."
@@ -0,0 +1,443 @@
+################################################################################
+# Copyright (C) 2016 Advanced Micro Devices, Inc. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell cop-
+# ies of the Software, and to permit persons to whom the Software is furnished
+# to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IM-
+# PLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNE-
+# CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+################################################################################
+
+import argparse
+import hashlib
+import math
+import multiprocessing
+import os
+
+import FileReader
+import FileWriter
+import PerformanceModel
+import SearchSpaceSpec
+import SolutionWriter
+import Structs
+import TensileGenBenchmark
+
+
+################################################################################
+# Tuning Space
+# - the candidates of one problem, made a tile at a time as the tuner visits
+#   them, so even fully exhaustive search spaces can be tuned
+# - a candidate is named by its generator key, (unroll, workGroup,
+#   microTile, numLoadsParaA, numLoadsParaB, ppd, branchType)
+# - neighbours of a candidate are those of the adjacent tiles (one unroll,
+#   work-group or micro-tile value up or down) with the nearest load, ppd
+#   and branch parameters, and those of its own tile with an adjacent load
+#   value or another ppd or branch
+################################################################################
+class TuningSpace:
+
+  # adjacent tiles: steps in (unroll, workGroup0, workGroup1, microTile0, microTile1)
+  tileSteps = [ \
+      ( 1, 0, 0, 0, 0), (-1, 0, 0, 0, 0), \
+      ( 0, 1, 0, 0, 0), ( 0,-1, 0, 0, 0), ( 0, 0, 1, 0, 0), ( 0, 0,-1, 0, 0), \
+      ( 0, 1, 1, 0, 0), ( 0,-1,-1, 0, 0), \
+      ( 0, 0, 0, 1, 0), ( 0, 0, 0,-1, 0), ( 0, 0, 0, 0, 1), ( 0, 0, 0, 0,-1), \
+      ( 0, 0, 0, 1, 1), ( 0, 0, 0,-1,-1) ]
+
+  def __init__(self, solutionCandidateGenerator, problem):
+    self.problem = problem
+    self.solutionCandidateGenerator = solutionCandidateGenerator
+    self.searchSpace = solutionCandidateGenerator.getSearchSpace( problem )
+    self.tiles = {} # tile key -> tile
+    self.tileKeys = [] # in getTiles order
+    for tile in solutionCandidateGenerator.getTiles( self.searchSpace ):
+      tileKey = self.getTileKey( tile )
+      self.tiles[tileKey] = tile
+      self.tileKeys.append( tileKey )
+    # values of each tile axis, in order
+    self.axes = [ [ tuple(unroll) for unroll in self.searchSpace.universeUnrolls ] ]
+    for i in range(0, 4):
+      self.axes.append( sorted(set( (tileKey[1]+tileKey[2])[i] \
+          for tileKey in self.tileKeys )) )
+    self.tileCandidates = {} # tile key -> [ (key, solution) ], once visited
+    self.solutions = {} # key -> solution, of visited tiles
+
+  def getTileKey(self, tile):
+    (unroll, workGroup, microTile) = tile
+    return (tuple(unroll), tuple(workGroup), tuple(microTile))
+
+  def getSolution(self, key):
+    return self.solutions[key]
+
+  # candidates of a tile, in generator order
+  def getTileCandidates(self, tileKey):
+    candidates = self.tileCandidates.get(tileKey)
+    if candidates is None:
+      candidates = []
+      for key, solution in self.solutionCandidateGenerator.generateSolutionCandidates( \
+          self.searchSpace, [ self.tiles[tileKey] ] ):
+        if key not in self.solutions:
+          self.solutions[key] = solution
+          candidates.append( (key, solution) )
+      self.tileCandidates[tileKey] = candidates
+    return candidates
+
+  # first candidate of numSamples tiles spread evenly over getTiles order
+  def getInitialSample(self, numSamples):
+    sample = []
+    numSamples = min(numSamples, len(self.tileKeys))
+    for i in range(0, numSamples):
+      tileKey = self.tileKeys[ i * len(self.tileKeys) / numSamples ]
+      candidates = self.getTileCandidates( tileKey )
+      if len(candidates) > 0:
+        sample.append( candidates[0][0] )
+    return sample
+
+  # candidate of tileKey nearest to key
+  def getNearestCandidate(self, tileKey, key):
+    nearestKey = None
+    nearestDistance = None
+    for candidateKey, solution in self.getTileCandidates(tileKey):
+      distance = ( candidateKey[5] != key[5], candidateKey[6] != key[6], \
+          abs(candidateKey[3]-key[3]) + abs(candidateKey[4]-key[4]) )
+      if nearestDistance is None or distance < nearestDistance:
+        nearestKey = candidateKey
+        nearestDistance = distance
+    return nearestKey
+
+  def getNeighbours(self, key):
+    neighbours = []
+    tileKey = key[:3]
+    # adjacent tiles
+    indices = [ self.axes[0].index(tileKey[0]) ]
+    for i in range(0, 4):
+      indices.append( self.axes[i+1].index( (tileKey[1]+tileKey[2])[i] ) )
+    for step in self.tileSteps:
+      values = []
+      for axis, index, delta in zip(self.axes, indices, step):
+        if index + delta < 0 or index + delta >= len(axis):
+          break
+        values.append( axis[index+delta] )
+      else:
+        neighbourTileKey = (values[0], tuple(values[1:3]), tuple(values[3:5]))
+        if neighbourTileKey in self.tiles:
+          neighbourKey = self.getNearestCandidate( neighbourTileKey, key )
+          if neighbourKey is not None:
+            neighbours.append( neighbourKey )
+    # same tile, one other load value, ppd or branch
+    candidates = self.getTileCandidates( tileKey )
+    loadsA = sorted(set( candidateKey[3] for candidateKey, solution in candidates ))
+    loadsB = sorted(set( candidateKey[4] for candidateKey, solution in candidates ))
+    for candidateKey, solution in candidates:
+      differences = [ i for i in range(3, 7) if candidateKey[i] != key[i] ]
+      if len(differences) != 1:
+        continue
+      if differences == [3] and abs(loadsA.index(candidateKey[3]) \
+          - loadsA.index(key[3])) != 1:
+        continue
+      if differences == [4] and abs(loadsB.index(candidateKey[4]) \
+          - loadsB.index(key[4])) != 1:
+        continue
+      neighbours.append( candidateKey )
+    return neighbours
+
+
+################################################################################
+# Timing Oracles
+# - getTimes( [ (exactMatch, problem, [solution]) ] ) returns { problem:
+#   { solution: time in ms } }; solutions which couldn't be timed are left
+#   out
+# - one call is one benchmark build, so the tuner asks for every problem's
+#   candidates of a round at once
+################################################################################
+
+################################################################################
+# Synthetic Timing Oracle
+# - PerformanceModel's estimate, off by up to +/-noise by a hash of problem
+#   and solution names; deterministic, for testing the tuner without a GPU
+################################################################################
+class SyntheticTimingOracle:
+
+  def __init__(self, backend, noise=0.1):
+    self.solutionWriter = SolutionWriter.SolutionWriter(backend)
+    self.noise = noise
+    self.numBuilds = 0
+
+  def getTimes(self, problemSolutions):
+    self.numBuilds += 1
+    times = {}
+    for exactMatch, problem, solutions in problemSolutions:
+      problemTimes = {}
+      for solution in solutions:
+        digest = hashlib.md5( str(problem) + self.solutionWriter.getName(solution) ).hexdigest()
+        offset = 2.0 * int(digest[:8], 16) / 0xffffffff - 1.0
+        problemTimes[solution] = 1e3 * PerformanceModel.getSolutionTime( \
+            problem, solution ) * (1.0 + self.noise*offset)
+      times[problem] = problemTimes
+    return times
+
+################################################################################
+# Benchmark Timing Oracle
+# - writes a TensileBenchmark of the candidates into generatedPath and calls
+#   runBenchmark(generatedPath, solutionsPath) to build and run it, e.g.,
+#   Tensile.py's; then reads the times from the solution xmls it wrote
+# - each build gets its own solutionsPath under workPath; generatedPath is
+#   reused so unchanged files aren't rewritten or recompiled
+################################################################################
+class BenchmarkTimingOracle:
+
+  def __init__(self, backend, workPath, runBenchmark, optimizeAlpha, \
+      optimizeBeta, timeAggregate="mean"):
+    self.backend = backend
+    self.solutionWriter = SolutionWriter.SolutionWriter(backend)
+    self.workPath = workPath
+    self.runBenchmark = runBenchmark
+    self.optimizeAlpha = optimizeAlpha
+    self.optimizeBeta = optimizeBeta
+    self.timeAggregate = timeAggregate
+    self.numBuilds = 0
+
+  def getTimes(self, problemSolutions):
+    generatedPath = os.path.join( self.workPath, "Generated" )
+    solutionsPath = os.path.join( self.workPath, "Solutions_%u" % self.numBuilds )
+    self.numBuilds += 1
+    if not os.path.exists(solutionsPath):
+      os.makedirs(solutionsPath)
+
+    # write and run benchmark
+    problemTree = {}
+    benchmarkList = {}
+    allSolutions = set()
+    allKernels = set()
+    for exactMatch, problem, solutions in problemSolutions:
+      FileReader.addProblemToTree( problemTree, exactMatch, problem )
+      benchmarkList[problem] = set(solutions)
+      allSolutions.update( solutions )
+      for kernel in TensileGenBenchmark.getKernelsFromSolutions( solutions ):
+        if kernel != None:
+          allKernels.add( kernel )
+    fileWriter = FileWriter.FileWriter(generatedPath, self.backend, True)
+    fileWriter.writeKernelFiles( allKernels )
+    fileWriter.writeSolutionFiles( allSolutions )
+    fileWriter.writeBenchmarkFiles( problemTree, benchmarkList )
+    self.runBenchmark( generatedPath, solutionsPath )
+
+    # read times, matched to solutions by name
+    psMap = {}
+    FileReader.getSolutionsFromXMLFiles( FileReader.getXMLFiles(solutionsPath), \
+        psMap, self.optimizeAlpha, self.optimizeBeta, 1 )
+    loggedTimes = {} # problem -> { solution name: time }
+    for deviceProfile, exactMatches in psMap.iteritems():
+      for exactMatch, sizeTypes in exactMatches.iteritems():
+        for sizeType in sizeTypes:
+          for problem, solutionCandidates in sizeType.iteritems():
+            problemTimes = loggedTimes.setdefault( problem, {} )
+            for solution, solutionBenchmark in solutionCandidates.iteritems():
+              if solutionBenchmark.numSamples > 0 and solutionBenchmark.validationStatus != -1:
+                problemTimes[self.solutionWriter.getName(solution)] = \
+                    solutionBenchmark.getTime(self.timeAggregate)
+    times = {}
+    for exactMatch, problem, solutions in problemSolutions:
+      problemTimes = loggedTimes.get( problem, {} )
+      times[problem] = dict( (solution, problemTimes[self.solutionWriter.getName(solution)]) \
+          for solution in solutions \
+          if self.solutionWriter.getName(solution) in problemTimes )
+    return times
+
+
+################################################################################
+# Tune
+# - successive halving over all problems at once: each round benchmarks the
+#   problems' new candidates with one oracle call, keeps the fastest
+#   keepFraction of each problem's round and adds their untimed neighbours
+# - starts from numInitial candidates per problem (see getInitialSample);
+#   stops after numRounds rounds, once no problem has new candidates, or
+#   per problem once it has maxBenchmarks times
+# - exactMatchProblems is [ (exactMatch, problem) ]; returns [ (problem,
+#   tuningSpace, { key: time }) ] in the same order
+################################################################################
+def Tune( exactMatchProblems, solutionCandidateGenerators, oracle, numInitial, \
+    keepFraction, numRounds, maxBenchmarks, searchSpaceSpec=None, \
+    optimizeAlpha=False, optimizeBeta=False, backend=None ):
+  problems = [ problem for exactMatch, problem in exactMatchProblems ]
+  tuningSpaces = []
+  populations = []
+  for problem in problems:
+    solutionCandidateGenerator = SearchSpaceSpec.getSolutionCandidateGenerator( \
+        solutionCandidateGenerators, problem.deviceProfile, searchSpaceSpec, \
+        optimizeAlpha, optimizeBeta, backend )
+    tuningSpace = TuningSpace( solutionCandidateGenerator, problem )
+    tuningSpaces.append( tuningSpace )
+    populations.append( tuningSpace.getInitialSample(numInitial) )
+  times = [ {} for problem in problems ]
+
+  for roundIdx in range(0, numRounds):
+    # benchmark new candidates
+    problemSolutions = []
+    newKeys = []
+    for (exactMatch, problem), tuningSpace, population, problemTimes in \
+        zip(exactMatchProblems, tuningSpaces, populations, times):
+      keys = [ key for key in population if key not in problemTimes ]
+      if maxBenchmarks > 0:
+        keys = keys[:max(0, maxBenchmarks - len(problemTimes))]
+      newKeys.append( keys )
+      if len(keys) > 0:
+        problemSolutions.append( (exactMatch, problem, \
+            [ tuningSpace.getSolution(key) for key in keys ]) )
+    if len(problemSolutions) == 0:
+      break
+    roundTimes = oracle.getTimes( problemSolutions )
+    numTimed = 0
+    for problem, tuningSpace, keys, problemTimes in \
+        zip(problems, tuningSpaces, newKeys, times):
+      solutionTimes = roundTimes.get( problem, {} )
+      for key in keys:
+        # untimed candidates count as infinitely slow, so aren't retried
+        problemTimes[key] = solutionTimes.get( tuningSpace.getSolution(key), \
+            float("inf") )
+        numTimed += 1
+    print "TensileGenTune: round %u benchmarked %u candidates of %u problems" \
+        % ( roundIdx, numTimed, len(problemSolutions) )
+
+    # keep fastest, add their neighbours
+    for i in range(0, len(problems)):
+      population = [ key for key in populations[i] if key in times[i] ]
+      population.sort( key=lambda key: (times[i][key], key) )
+      numKept = max(1, int(math.ceil(len(population)*keepFraction)))
+      nextPopulation = population[:numKept]
+      seen = set(nextPopulation)
+      for key in population[:numKept]:
+        for neighbour in tuningSpaces[i].getNeighbours( key ):
+          if neighbour not in seen and neighbour not in times[i]:
+            seen.add( neighbour )
+            nextPopulation.append( neighbour )
+      populations[i] = nextPopulation
+
+  return zip( problems, tuningSpaces, times )
+
+
+################################################################################
+# Tune From Files
+# - tunes the problems of inputFiles and writes every time measured to
+#   outputFile, a solution log TensileGenBackend can read
+################################################################################
+def TuneFromFiles( \
+    inputFiles, \
+    outputFile, \
+    oracle, \
+    backend, \
+    optimizeAlpha, \
+    optimizeBeta, \
+    numInitial=16, \
+    keepFraction=0.5, \
+    numRounds=8, \
+    maxBenchmarks=0, \
+    numProcesses=1, \
+    searchSpaceSpec=None ):
+
+  problemTree = {}
+  FileReader.getProblemsFromXMLFiles( inputFiles, problemTree, optimizeAlpha, optimizeBeta, numProcesses )
+  exactMatchProblems = []
+  for deviceProfile, exactMatch, problems in \
+      TensileGenBenchmark.getSolutionCandidateTasks( problemTree, 1 ):
+    for problem in problems:
+      exactMatchProblems.append( (exactMatch, problem) )
+
+  results = Tune( exactMatchProblems, {}, oracle, numInitial, keepFraction, numRounds, \
+      maxBenchmarks, searchSpaceSpec, optimizeAlpha, optimizeBeta, backend )
+
+  numBenchmarks = 0
+  logFile = FileReader.openXMLFile( outputFile, "wb" )
+  logFile.write( "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n" )
+  logFile.write( "<TensileLog>\n" )
+  for problem, tuningSpace, problemTimes in results:
+    numBenchmarks += len(problemTimes)
+    for key in sorted(problemTimes.keys()):
+      if problemTimes[key] < float("inf"):
+        logFile.write( FileWriter.getTraceEntryXML( problem, \
+            tuningSpace.getSolution(key), [ problemTimes[key] ] ) )
+  logFile.write( "</TensileLog>\n" )
+  logFile.close()
+  print "TensileGenTune: %u benchmarks of %u problems in %u builds" \
+      % ( numBenchmarks, len(results), oracle.numBuilds )
+  return results
+
+
+################################################################################
+# TensileGenTune - Main
+# - with the synthetic oracle, for trying tuning settings without a GPU; see
+#   "Tensile.py tune" for tuning with TensileBenchmark
+################################################################################
+if __name__ == "__main__":
+
+  # arguments
+  ap = argparse.ArgumentParser(description="TensileGenTune")
+  ap.add_argument("--input-path", dest="inputPath", required=True )
+  ap.add_argument("--output-file", dest="outputFile", required=True, \
+      help="solution log of every time measured" )
+  ap.add_argument("--backend", dest="backend", required=True, \
+      choices=["OpenCL_1.2", "HIP"] )
+  ap.add_argument("--optimize-alpha", dest="optimizeAlphaStr" )
+  ap.add_argument("--optimize-beta", dest="optimizeBetaStr" )
+  ap.add_argument("--num-processes", dest="numProcesses", type=int, \
+      default=multiprocessing.cpu_count(), help="processes used to read input xmls" )
+  ap.add_argument("--search-space", dest="searchSpacePath", \
+      help="json (or yaml) search space spec; see SearchSpaceSpec" )
+  ap.add_argument("--initial", dest="numInitial", type=int, default=16, \
+      help="candidates per problem in the first round" )
+  ap.add_argument("--keep-fraction", dest="keepFraction", type=float, default=0.5, \
+      help="fraction of each round's candidates kept and expanded" )
+  ap.add_argument("--rounds", dest="numRounds", type=int, default=8 )
+  ap.add_argument("--max-benchmarks", dest="maxBenchmarks", type=int, default=0, \
+      help="benchmarks per problem; 0 means no limit" )
+  ap.add_argument("--noise", dest="noise", type=float, default=0.1, \
+      help="relative noise of the synthetic oracle" )
+  ap.set_defaults(optimizeAlphaStr="Off")
+  ap.set_defaults(optimizeBetaStr="Off")
+
+  # parse arguments
+  args = ap.parse_args()
+  inputFiles = FileReader.getXMLFiles( args.inputPath )
+  backend = Structs.Backend();
+  if args.backend == "OpenCL_1.2":
+    backend.value = 0
+  elif args.backend == "HIP":
+    backend.value = 1
+  searchSpaceSpec = None
+  if args.searchSpacePath:
+    try:
+      searchSpaceSpec = SearchSpaceSpec.readSearchSpaceSpec( args.searchSpacePath )
+    except (IOError, ValueError) as e:
+      ap.error( str(e) )
+
+  # print settings
+  print "TensileGen: numInputFiles=%u" % len(inputFiles)
+  print "  InputPath=" + args.inputPath
+  print "  OutputFile=" + args.outputFile
+
+  # tune
+  TuneFromFiles( \
+      inputFiles, \
+      args.outputFile, \
+      SyntheticTimingOracle( backend, args.noise ), \
+      backend, \
+      args.optimizeAlphaStr=="On" or args.optimizeAlphaStr=="ON", \
+      args.optimizeBetaStr=="On" or args.optimizeBetaStr=="ON", \
+      args.numInitial, \
+      args.keepFraction, \
+      args.numRounds, \
+      args.maxBenchmarks, \
+      args.numProcesses, \
+      searchSpaceSpec )
+  print "TensileGen: DONE."